@@ -0,0 +1,121 @@
+"""
+Local game detection for a batch of new videos.
+
+Compares two ways of matching each video's folder name and cleaned
+filename against the game_metadata table:
+
+  per-video query  load every game and score the queries with extractOne,
+                   once per video, as detection did before GameMatcher
+  matcher          one shared GameMatcher, as scan_videos uses
+
+The per-video query path is only run on the first --baseline-videos videos
+and reported per video. Best scores must agree between the two. The default
+batch has more distinct queries than the matcher remembers, so evictions
+are part of the measurement.
+
+    python benchmarks/bench_game_matcher.py [--games 2000] [--videos 5000]
+"""
+import argparse
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common import Timer, app_context
+
+WORDS = ("call duty war zone apex legends rocket league counter strike global offensive "
+         "elden ring dark souls hollow knight battle field royale fortnite valorant "
+         "overwatch minecraft terraria portal halo infinite destiny forza horizon "
+         "grand theft auto city skylines star wars jedi survivor sea thieves").split()
+
+
+def game_names(n, rng):
+    names = set()
+    while len(names) < n:
+        name = " ".join(rng.sample(WORDS, rng.randint(2, 4))).title()
+        if rng.random() < 0.3:
+            name += f" {rng.randint(2, 5)}"
+        names.add(name)
+    return sorted(names)
+
+
+def video_paths(n, names, rng):
+    paths = []
+    for i in range(n):
+        game = rng.choice(names)
+        stamp = f"{rng.randint(2019, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        kind = rng.random()
+        if kind < 0.4:
+            paths.append(f"{game}/{game} {stamp} {i}")
+        elif kind < 0.7:
+            paths.append(f"uploads/{game.replace(' ', '_')}_{stamp}_clip_{i}")
+        else:
+            words = " ".join(rng.sample(WORDS, 2))
+            paths.append(f"{words} highlights {stamp} {i}")
+    return paths
+
+
+def per_video_query(query):
+    from rapidfuzz import fuzz, process, utils
+    from fireshare.models import GameMetadata
+    games = GameMetadata.query.all()
+    result = process.extractOne(query, [g.name for g in games], scorer=fuzz.token_set_ratio,
+                                processor=utils.default_process)
+    return round(result[1], 3) if result and result[1] > 0 else None
+
+
+def queries_for(path):
+    from fireshare import util
+    return [q for q in (util._game_folder(path), util._clean_game_filename(Path(path).name)) if q]
+
+
+def score(result):
+    return round(result[3], 3) if result else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--videos', type=int, default=5000)
+    parser.add_argument('--baseline-videos', type=int, default=200,
+                        help="videos to run through the per-video query path")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with app_context():
+        from fireshare import db, util
+        from fireshare.models import GameMetadata
+        now = datetime.utcnow()
+        db.session.execute(db.insert(GameMetadata), [
+            {'name': name, 'steamgriddb_id': i, 'created_at': now, 'updated_at': now}
+            for i, name in enumerate(game_names(args.games, rng))])
+        db.session.commit()
+        names = [g.name for g in GameMetadata.query.all()]
+        paths = video_paths(args.videos, names, rng)
+        queries = [queries_for(p) for p in paths]
+
+        baseline = queries[:args.baseline_videos]
+        with Timer() as t_query:
+            expected = [[per_video_query(q) for q in qs] for qs in baseline]
+
+        util.invalidate_game_matcher()
+        with Timer() as t_matcher:
+            matcher = util.get_game_matcher()
+            scored = [[score(matcher.match(q)) for q in qs] for qs in queries]
+
+    per_query = t_query.seconds / len(baseline)
+    print(f"{args.games:,} games, {args.videos:,} videos "
+          f"({len({q for qs in queries for q in qs}):,} distinct queries)")
+    print(f"{'per-video query':<16} {per_query * 1e3:>9.2f} ms/video  "
+          f"(~{per_query * args.videos:.1f}s for all, measured on {len(baseline)})")
+    print(f"{'matcher':<16} {t_matcher.seconds / args.videos * 1e3:>9.3f} ms/video  ({t_matcher.seconds:.2f}s for all)")
+
+    if scored[:len(expected)] != expected:
+        sys.exit("best scores differ between the two paths")
+
+
+if __name__ == '__main__':
+    main()
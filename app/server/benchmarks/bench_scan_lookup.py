@@ -0,0 +1,118 @@
+"""
+Scan reconciliation lookups against a large library.
+
+For each library size this loads the Video and file_index rows the way
+scan_videos does, then reconciles one scanned file per row: a file index
+match, a lookup by content id and a check against the ids found so far.
+One file in a hundred has moved and one in a hundred is new. The cost per
+row should stay flat as the library grows; the old linear searches made it
+grow with the library size.
+
+    python benchmarks/bench_scan_lookup.py [--sizes 25000,50000,100000,200000]
+"""
+import argparse
+import hashlib
+import sys
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common import Timer, app_context, reset_tables
+
+Stat = namedtuple('Stat', 'st_size st_mtime_ns st_ino')
+
+# Per-row cost at the largest size may be at most this many times the cost at
+# the smallest before the run is reported as not scaling linearly
+MAX_PER_ROW_GROWTH = 2.5
+
+
+def content_id(i):
+    return hashlib.md5(str(i).encode()).hexdigest()
+
+
+def populate(n):
+    from fireshare import db
+    from fireshare.models import FileIndex, Video
+    now = datetime.utcnow()
+    db.session.execute(db.insert(Video), [
+        {'video_id': content_id(i), 'extension': '.mp4', 'path': f"Game{i % 50}/clip{i}.mp4",
+         'available': True, 'created_at': now, 'updated_at': now}
+        for i in range(n)])
+    db.session.execute(db.insert(FileIndex), [
+        {'kind': 'video', 'path': f"Game{i % 50}/clip{i}.mp4", 'size': i, 'mtime_ns': i, 'inode': i,
+         'content_id': content_id(i), 'updated_at': now}
+        for i in range(n)])
+    db.session.commit()
+    db.session.remove()
+
+
+def scanned_files(n):
+    for i in range(n):
+        if i % 100 == 1:
+            # Moved: same content under a new path, so the index misses
+            yield f"Moved/clip{i}.mp4", Stat(i, i, i), content_id(i)
+        elif i % 100 == 2:
+            yield f"New/clip{i + n}.mp4", Stat(i + n, i + n, i + n), content_id(i + n)
+        else:
+            yield f"Game{i % 50}/clip{i}.mp4", Stat(i, i, i), content_id(i)
+
+
+def reconcile(n):
+    from fireshare.fileindex import FileIdIndex
+    from fireshare.models import Video
+    with Timer() as load:
+        videos_by_id = {vr.video_id: vr for vr in Video.query.all()}
+        file_index = FileIdIndex('video')
+    files = list(scanned_files(n))
+    counts = {'existing': 0, 'moved': 0, 'new': 0}
+    with Timer() as lookup:
+        scanned_paths = set()
+        new_video_ids = set()
+        for path, st, cid in files:
+            scanned_paths.add(path)
+            video_id = file_index.match(path, st)
+            hit = video_id is not None
+            if not hit:
+                video_id = cid  # stands in for hashing the file
+            file_index.record(path, st, video_id, hit)
+            existing = videos_by_id.get(video_id)
+            if video_id in new_video_ids:
+                continue
+            if existing:
+                counts['moved' if existing.path != path else 'existing'] += 1
+            else:
+                new_video_ids.add(video_id)
+                counts['new'] += 1
+    return load.seconds, lookup.seconds, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='25000,50000,100000,200000',
+                        help="comma-separated library sizes to measure")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    from fireshare.models import FileIndex, Video
+    results = []
+    with app_context():
+        print(f"{'rows':>8} {'load s':>8} {'lookup s':>9} {'us/row':>7}  moved/new")
+        for n in sizes:
+            reset_tables(FileIndex, Video)
+            populate(n)
+            load, lookup, counts = reconcile(n)
+            per_row = (load + lookup) / n * 1e6
+            results.append(per_row)
+            print(f"{n:>8} {load:>8.2f} {lookup:>9.3f} {per_row:>7.1f}  {counts['moved']}/{counts['new']}")
+            assert counts['moved'] == counts['new'] == len(range(1, n, 100))
+
+    growth = results[-1] / results[0]
+    print(f"per-row cost grew {growth:.2f}x from {sizes[0]:,} to {sizes[-1]:,} rows")
+    if growth > MAX_PER_ROW_GROWTH:
+        sys.exit(f"scan lookups do not scale linearly (limit {MAX_PER_ROW_GROWTH}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Shared setup for the benchmarks: a worker-mode app on a throwaway data directory."""
+import contextlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# Keep directory creation and config validation out of the results
+os.environ.setdefault('FS_LOGLEVEL', 'WARNING')
+
+
+@contextlib.contextmanager
+def app_context():
+    with tempfile.TemporaryDirectory(prefix="fireshare-bench-") as tmp:
+        tmp = Path(tmp)
+        for name in ('data', 'videos', 'processed'):
+            (tmp / name).mkdir()
+        os.environ['DATA_DIRECTORY'] = str(tmp / 'data')
+        os.environ['VIDEO_DIRECTORY'] = str(tmp / 'videos')
+        os.environ['PROCESSED_DIRECTORY'] = str(tmp / 'processed')
+        os.environ.pop('IMAGE_DIRECTORY', None)
+
+        from fireshare import create_app, db, models  # noqa: F401 (registers the tables)
+        app = create_app(mode="worker")
+        with app.app_context():
+            db.create_all()
+            yield app
+            db.session.remove()
+
+
+def reset_tables(*models):
+    from fireshare import db
+    db.session.remove()
+    for model in models:
+        db.session.query(model).delete()
+    db.session.commit()
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
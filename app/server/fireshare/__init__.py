@@ -1,14 +1,7 @@
 import os, sys, re, copy, tempfile
 import os.path
-try:
-    import ldap
-except ImportError:
-    ldap = None
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_login import LoginManager
-from flask_cors import CORS
 from pathlib import Path
 import logging
 import json
@@ -58,7 +51,12 @@ def set_sqlite_pragma(dbapi_conn, connection_record):
         
 # init SQLAlchemy so we can use it later in our models
 db = SQLAlchemy()
-migrate = Migrate()
+
+# create_app() modes: 'web' is the full server; 'worker' is for CLI commands and
+# background processes and skips the one-off startup tasks the web server already
+# performs (config.json rewrites, schema probe, admin account sync, LDAP bind,
+# upload chunk cleanup) as well as the blueprints and their imports.
+APP_MODES = ('web', 'worker')
 
 def update_config(path):
     logger.debug("Validating configuration file...")
@@ -112,9 +110,14 @@ def update_config(path):
         updated = combine(copy.deepcopy(DEFAULT_CONFIG), current)
         atomic_write(path, json.dumps(updated, indent=2))
 
-def create_app(init_schedule=False):
+def create_app(init_schedule=False, mode="web"):
+    if mode not in APP_MODES:
+        raise ValueError(f"Unknown app mode {mode!r}")
+    web = mode == "web"
     app = Flask(__name__, static_url_path='', static_folder='build', template_folder='build')
-    CORS(app, supports_credentials=True)
+    if web:
+        from flask_cors import CORS
+        CORS(app, supports_credentials=True)
     if 'DATA_DIRECTORY' not in os.environ:
         raise Exception("DATA_DIRECTORY not found in environment")
 
@@ -154,6 +157,12 @@ def create_app(init_schedule=False):
     )
     app.config['SERVE_GAME_ASSETS_NGINX'] = os.getenv('ENVIRONMENT', '') == 'production'
     app.config['TRANSCODE_TIMEOUT'] = int(os.getenv('TRANSCODE_TIMEOUT', '7200'))  # Default: 2 hours
+    # Encode every missing resolution of a video from a single decode of the source
+    app.config['TRANSCODE_LADDER'] = os.getenv('TRANSCODE_LADDER', 'true').lower() in ('true', '1', 'yes')
+    # Encodes run at once across all processes (0 = one per four cores, one with TRANSCODE_GPU)
+    app.config['TRANSCODE_CONCURRENCY'] = max(0, int(os.getenv('TRANSCODE_CONCURRENCY', '0') or '0'))
+    # Split long videos into segments of this many seconds and encode them in parallel (0 = off)
+    app.config['TRANSCODE_SEGMENT_SECONDS'] = max(0, int(os.getenv('TRANSCODE_SEGMENT_SECONDS', '0') or '0'))
 
     #Integrations
     app.config['DISCORD_WEBHOOK_URL'] = os.getenv('DISCORD_WEBHOOK_URL', '')
@@ -182,9 +191,35 @@ def create_app(init_schedule=False):
     app.config['SCHEDULED_JOBS_DATABASE_URI'] = f'sqlite:///{app.config["DATA_DIRECTORY"]}/jobs.sqlite'
     app.config['INIT_SCHEDULE'] = init_schedule
     app.config['MINUTES_BETWEEN_VIDEO_SCANS'] = int(os.getenv('MINUTES_BETWEEN_VIDEO_SCANS', '5'))
+    # Worker threads used by the scanners to overlap hashing I/O with ffprobe calls
+    app.config['SCAN_WORKERS'] = max(1, int(os.getenv('FS_SCAN_WORKERS', '4') or '4'))
+    app.config['CONTENT_ID_MODE'] = os.getenv('FS_CONTENT_ID', 'head').strip().lower()
+    if app.config['CONTENT_ID_MODE'] not in ('head', 'sparse'):
+        logger.warning(f"Unknown FS_CONTENT_ID '{app.config['CONTENT_ID_MODE']}', using 'head'")
+        app.config['CONTENT_ID_MODE'] = 'head'
+    # Bytes per second content-id hashing may read from disk, e.g. 50M (unset = unlimited)
+    from . import util as _util
+    try:
+        app.config['SCAN_IO_LIMIT'] = _util.parse_byte_size(os.getenv('FS_SCAN_IO_LIMIT') or '0')
+    except ValueError:
+        logger.warning(f"Invalid FS_SCAN_IO_LIMIT '{os.getenv('FS_SCAN_IO_LIMIT')}', scans will not be throttled")
+        app.config['SCAN_IO_LIMIT'] = 0
+    _util.set_scan_io_limit(app.config['SCAN_IO_LIMIT'])
+    # Comma-separated glob patterns (names or paths relative to the media root) the scanners skip
+    app.config['SCAN_IGNORE'] = [p.strip() for p in os.getenv('FS_SCAN_IGNORE', '').split(',') if p.strip()]
+    # Long-lived process that runs upload and scheduled scans without a CLI spawn each time
+    app.config['ENABLE_INGEST_WORKER'] = os.getenv('ENABLE_INGEST_WORKER', 'true').lower() in ('true', '1', 'yes')
+    app.config['ENABLE_FILE_WATCHER'] = os.getenv('ENABLE_FILE_WATCHER', '').lower() in ('true', '1', 'yes')
+    app.config['FILE_WATCHER_MODE'] = os.getenv('FILE_WATCHER_MODE', 'auto').lower()
+    # With the watcher running, the full scan only reconciles anything it missed
+    app.config['MINUTES_BETWEEN_RECONCILE_SCANS'] = int(os.getenv('MINUTES_BETWEEN_RECONCILE_SCANS', '60'))
+    # Webhook requests sent at once, and how many new clips for one Discord webhook
+    # are collapsed into a single "N new clips" message (0 = never)
+    app.config['NOTIFY_CONCURRENCY'] = max(1, int(os.getenv('FS_NOTIFY_CONCURRENCY', '4') or '4'))
+    app.config['NOTIFY_DIGEST_THRESHOLD'] = max(0, int(os.getenv('FS_NOTIFY_DIGEST_THRESHOLD', '5') or '0'))
     app.config['WARNINGS'] = []
 
-    if (app.config['ADMIN_PASSWORD'] and app.config['ADMIN_USERNAME'] == "admin") and app.config["DISABLE_ADMINCREATE"] == False:
+    if web and (app.config['ADMIN_PASSWORD'] and app.config['ADMIN_USERNAME'] == "admin") and app.config["DISABLE_ADMINCREATE"] == False:
         stdPasswordWarning = "You are using the Default Login-Credentials, please consider changing it."
         app.config['WARNINGS'].append(stdPasswordWarning)
         logger.warning(stdPasswordWarning)
@@ -192,7 +227,7 @@ def create_app(init_schedule=False):
     # Check for SteamGridDB API key
     config_path = Path(app.config['DATA_DIRECTORY']) / 'config.json'
     steamgrid_api_key = os.environ.get('STEAMGRIDDB_API_KEY', '')
-    if config_path.exists():
+    if web and config_path.exists():
         with open(config_path, 'r') as configfile:
             try:
                 config_data = json.load(configfile)
@@ -202,7 +237,7 @@ def create_app(init_schedule=False):
             except:
                 pass
 
-    if not steamgrid_api_key:
+    if web and not steamgrid_api_key:
         steamgridWarning = "SteamGridDB API key not configured. Game metadata features are unavailable. Click here to set it up."
         app.config['WARNINGS'].append(steamgridWarning)
         logger.warning(steamgridWarning)
@@ -251,10 +286,11 @@ def create_app(init_schedule=False):
     _CLEANUP_SENTINEL = os.path.join(_SHM_DIR, "fireshare_cleanup.lock")
     _should_cleanup = False
     try:
-        fd = os.open(_CLEANUP_SENTINEL, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
-        os.write(fd, str(os.getpid()).encode())
-        os.close(fd)
-        _should_cleanup = True
+        if web:
+            fd = os.open(_CLEANUP_SENTINEL, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            _should_cleanup = True
     except FileExistsError:
         pass  # Another worker already claimed cleanup for this startup
     except Exception as e:
@@ -276,9 +312,11 @@ def create_app(init_schedule=False):
         logger.info(f"Creating game_assets directory at {str(game_assets_dir.absolute())}")
         game_assets_dir.mkdir(parents=True, exist_ok=True)
     
-    update_config(paths['data'] / 'config.json')
+    # Worker processes only need a config.json to exist; the web server keeps it up to date
+    if web or not (paths['data'] / 'config.json').exists():
+        update_config(paths['data'] / 'config.json')
 
-    if app.config['DEMO_MODE']:
+    if web and app.config['DEMO_MODE']:
         _demo_config_path = paths['data'] / 'config.json'
         with open(_demo_config_path, 'r+') as _f:
             _cfg = json.load(_f)
@@ -290,7 +328,12 @@ def create_app(init_schedule=False):
             _f.truncate()
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    if not web:
+        return app
+
+    # flask_migrate pulls in alembic, which only `flask db` and the web server need
+    from flask_migrate import Migrate
+    Migrate(app, db)
 
     # Reset any transcode jobs that were marked 'running' when the container
     # last shut down — those processes are gone, so the jobs need to be retried.
@@ -321,6 +364,10 @@ def create_app(init_schedule=False):
         logger.warning(f"Could not reset stale transcode jobs: {e}")
 
     if app.config["LDAP_ENABLE"]:
+        try:
+            import ldap
+        except ImportError:
+            ldap = None
         if ldap is None:
             app.logger.error("LDAP is enabled but python-ldap is not installed. "
                              "Install system dependencies (libldap2-dev libsasl2-dev on Linux, "
@@ -334,6 +381,7 @@ def create_app(init_schedule=False):
         app.ldap_conn.simple_bind_s(app.config["LDAP_BINDDN"] + "," + app.config["LDAP_BASEDN"], app.config["LDAP_PASSWORD"])
         app.logger.info("LDAP connection successful")
     
+    from flask_login import LoginManager
     login_manager = LoginManager()
     login_manager.init_app(app)
 
@@ -357,8 +405,14 @@ def create_app(init_schedule=False):
 
     if init_schedule and os.environ.get('FIRESHARE_START_SCHEDULER') == '1':
         from .schedule import init_schedule as _init_schedule
-        _init_schedule(app.config['SCHEDULED_JOBS_DATABASE_URI'],
-            app.config['MINUTES_BETWEEN_VIDEO_SCANS'])
+        if app.config['ENABLE_FILE_WATCHER']:
+            mins_between_scan = app.config['MINUTES_BETWEEN_RECONCILE_SCANS']
+        else:
+            mins_between_scan = app.config['MINUTES_BETWEEN_VIDEO_SCANS']
+        _init_schedule(app.config['SCHEDULED_JOBS_DATABASE_URI'], mins_between_scan,
+            data_path=paths['data'],
+            file_watcher=app.config['ENABLE_FILE_WATCHER'],
+            ingest_worker=app.config['ENABLE_INGEST_WORKER'])
     
     #Integrations Validation
     if app.config.get('DISCORD_WEBHOOK_URL'):
@@ -13,7 +13,7 @@ from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
 
 from .. import db, logger, util
-from ..models import Video, VideoInfo, VideoView, GameMetadata, VideoGameLink, VideoTagLink, Image, ImageInfo, ImageGameLink, ImageTagLink, ImageView, TranscodeJob
+from ..models import Video, VideoInfo, VideoView, GameMetadata, GameSuggestion, VideoGameLink, VideoTagLink, Image, ImageInfo, ImageGameLink, ImageTagLink, ImageView, TranscodeJob, MediaProbe, MetadataRetry, CorruptVideo, Notification, ScanRun
 from . import api
 from .transcoding import _is_pid_running
 from .scan import _game_scan_state
@@ -74,6 +74,57 @@ def get_warnings():
             return jsonify(warnings)
 
 
+@api.route('/api/admin/scan-runs', methods=["GET"])
+@login_required
+def get_scan_runs():
+    """The last N library scans with phase durations and file counts, newest first (admin only)"""
+    if not current_user.admin:
+        return Response(status=403, response='Admin access required.')
+    limit = max(1, min(request.args.get('limit', 20, type=int), 500))
+    runs = ScanRun.query.order_by(ScanRun.id.desc()).limit(limit).all()
+    return jsonify([run.json() for run in runs])
+
+
+@api.route('/api/admin/notifications', methods=["GET"])
+@login_required
+def get_notifications():
+    """Pending notification count and the dead-letter list (admin only)"""
+    if not current_user.admin:
+        return Response(status=403, response='Admin access required.')
+    pending = Notification.query.filter(Notification.status.in_(['pending', 'sending'])).count()
+    dead = Notification.query.filter_by(status='dead').order_by(Notification.created_at.desc()).all()
+    return jsonify({'pending': pending, 'dead': [n.json() for n in dead]})
+
+
+@api.route('/api/admin/notifications/retry', methods=["POST"])
+@login_required
+@demo_restrict
+def retry_notifications():
+    """Requeue dead notifications; all of them unless a list of ids is given (admin only)"""
+    if not current_user.admin:
+        return Response(status=403, response='Admin access required.')
+    ids = (request.get_json(silent=True) or {}).get('ids')
+    query = Notification.query.filter_by(status='dead')
+    if ids:
+        query = query.filter(Notification.id.in_(ids))
+    count = query.update({'status': 'pending', 'attempts': 0, 'next_attempt_at': datetime.utcnow()},
+                         synchronize_session=False)
+    db.session.commit()
+    return jsonify({'requeued': count})
+
+
+@api.route('/api/admin/notifications/dead', methods=["DELETE"])
+@login_required
+@demo_restrict
+def delete_dead_notifications():
+    """Discard the dead-letter list (admin only)"""
+    if not current_user.admin:
+        return Response(status=403, response='Admin access required.')
+    count = Notification.query.filter_by(status='dead').delete(synchronize_session=False)
+    db.session.commit()
+    return jsonify({'deleted': count})
+
+
 @api.route('/api/admin/stream')
 @login_required
 def admin_event_stream():
@@ -103,8 +154,8 @@ def admin_event_stream():
                         util.clear_transcoding_status(paths['data'])
                         progress = {"current": 0, "total": 0, "current_video": None}
 
-                    pending_jobs = TranscodeJob.query.filter_by(status='pending').all()
-                    completed_count = TranscodeJob.query.filter_by(status='complete').count()
+                    queue_tasks = TranscodeJob.query.filter(TranscodeJob.status == 'pending', TranscodeJob.kind != 'plan').count()
+                    completed_count = TranscodeJob.query.filter(TranscodeJob.status == 'complete', TranscodeJob.kind != 'plan').count()
                     transcoding_state = {
                         "enabled": enabled,
                         "gpu_enabled": gpu_enabled,
@@ -115,7 +166,7 @@ def admin_event_stream():
                         "percent": progress.get('percent'),
                         "eta_seconds": progress.get('eta_seconds'),
                         "resolution": progress.get('resolution'),
-                        "queue_tasks": sum(j.task_count for j in pending_jobs),
+                        "queue_tasks": queue_tasks,
                         "completed_tasks": completed_count,
                     }
 
@@ -205,10 +256,12 @@ def reset_database():
         reset_game_suggestions = bool(options.get("game_suggestions"))
 
         if reset_game_suggestions:
+            GameSuggestion.query.delete()
+            current_app.logger.info("Deleted all game suggestions")
+            # Left behind by versions that kept suggestions in a file
             suggestions_file = paths['data'] / 'game_suggestions.json'
             if suggestions_file.exists():
                 suggestions_file.unlink()
-                current_app.logger.info("Deleted game_suggestions.json")
 
         if reset_game_links:
             VideoGameLink.query.delete()
@@ -235,10 +288,15 @@ def reset_database():
         if reset_videos:
             VideoInfo.query.delete()
             current_app.logger.info("Deleted all video info")
+            MediaProbe.query.delete()
+            MetadataRetry.query.delete()
+            CorruptVideo.query.delete()
             Video.query.delete()
             current_app.logger.info("Deleted all videos")
 
         db.session.commit()
+        if reset_game_metadata:
+            util.invalidate_game_matcher()
 
         if reset_processed:
             video_links_dir = paths['processed'] / 'video_links'
@@ -407,6 +465,9 @@ def bulk_delete_files():
             VideoGameLink.query.filter_by(video_id=vid_id).delete()
             VideoTagLink.query.filter_by(video_id=vid_id).delete()
             VideoView.query.filter_by(video_id=vid_id).delete()
+            MediaProbe.query.filter_by(video_id=vid_id).delete()
+            MetadataRetry.query.filter_by(video_id=vid_id).delete()
+            CorruptVideo.query.filter_by(video_id=vid_id).delete()
             Video.query.filter_by(video_id=vid_id).delete()
             db.session.commit()
 
@@ -7,8 +7,8 @@ from pathlib import Path
 from flask import current_app, jsonify, request, Response, send_file
 from flask_login import login_required, current_user
 
-from .. import db, logger
-from ..models import Video, VideoInfo, VideoView, GameMetadata, VideoGameLink, Image, ImageInfo, ImageGameLink, ImageView
+from .. import db, logger, util
+from ..models import Video, VideoInfo, VideoView, GameMetadata, VideoGameLink, Image, ImageInfo, ImageGameLink, ImageView, MediaProbe, MetadataRetry, CorruptVideo
 from ..steamgrid import SteamGridDBClient
 from . import api
 from .helpers import get_steamgriddb_api_key, login_required_unless_public_game_tag
@@ -228,6 +228,7 @@ def create_game():
         if updated:
             existing_game.updated_at = datetime.utcnow()
             db.session.commit()
+            util.invalidate_game_matcher()
         return jsonify(existing_game.json()), 200
 
     # Get API key and initialize client
@@ -266,6 +267,7 @@ def create_game():
 
     db.session.add(game)
     db.session.commit()
+    util.invalidate_game_matcher()
 
     current_app.logger.info(f"Created game {data['name']} with assets: {result['assets']}")
 
@@ -513,6 +515,9 @@ def delete_game(steamgriddb_id):
             VideoGameLink.query.filter_by(video_id=video.video_id).delete()
             VideoView.query.filter_by(video_id=video.video_id).delete()
             VideoInfo.query.filter_by(video_id=video.video_id).delete()
+            MediaProbe.query.filter_by(video_id=video.video_id).delete()
+            MetadataRetry.query.filter_by(video_id=video.video_id).delete()
+            CorruptVideo.query.filter_by(video_id=video.video_id).delete()
             Video.query.filter_by(video_id=video.video_id).delete()
 
             # Delete files
@@ -546,6 +551,7 @@ def delete_game(steamgriddb_id):
     # Delete game from database
     db.session.delete(game)
     db.session.commit()
+    util.invalidate_game_matcher()
 
     logger.info(f"Successfully deleted game {game.name}")
     return Response(status=200)
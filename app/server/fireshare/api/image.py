@@ -6,14 +6,12 @@ import re
 import string
 from datetime import datetime
 from pathlib import Path
-from subprocess import Popen
-import threading
 
 from flask import current_app, jsonify, request, Response, send_file, render_template, redirect
 from flask_login import login_required, current_user
 from sqlalchemy.sql import text
 
-from .. import db, logger, util
+from .. import db, ingest, logger, util
 from ..models import Image, ImageInfo, ImageView, ImageGameLink, ImageTagLink, GameMetadata
 from . import api
 from .helpers import secure_filename
@@ -24,21 +22,19 @@ SUPPORTED_IMAGE_TYPES = {'jpg', 'jpeg', 'png', 'webp', 'gif'}
 
 
 def _launch_scan_image(save_path, config, game_id=None, tag_ids=None, title=None):
-    """Launch scan-image in the background after an image upload."""
+    """Run scan-image on the ingest worker (or in the background) after an image upload."""
     image_directory = current_app.config.get('IMAGE_DIRECTORY')
     if not image_directory:
         return None
     rel_path = os.path.relpath(save_path, image_directory)
-    cmd = ["fireshare", "scan-image", f"--path={rel_path}"]
+    args = [f"--path={rel_path}"]
     if game_id:
-        cmd.append(f"--game-id={game_id}")
+        args.append(f"--game-id={game_id}")
     if tag_ids:
-        cmd.append(f"--tag-ids={','.join(str(t) for t in tag_ids)}")
+        args.append(f"--tag-ids={','.join(str(t) for t in tag_ids)}")
     if title:
-        cmd.append(f"--title={title}")
-    proc = Popen(cmd, shell=False, start_new_session=True)
-    threading.Thread(target=proc.wait, daemon=True).start()
-    return proc
+        args.append(f"--title={title}")
+    return ingest.run_command(current_app.config['PATHS']['data'], "scan-image", args)
 
 
 # ---------------------------------------------------------------------------
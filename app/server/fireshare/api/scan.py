@@ -4,12 +4,11 @@ import time
 from collections import Counter
 from datetime import datetime
 from pathlib import Path
-from subprocess import Popen
 
 from flask import current_app, jsonify, request, Response
 from flask_login import login_required, current_user
 
-from .. import db, logger, util
+from .. import db, ingest, logger, util
 from ..constants import DEFAULT_CONFIG
 from ..models import Video, VideoInfo, VideoGameLink, GameMetadata, FolderRule, Image, ImageGameLink, ImageFolderRule
 from . import api
@@ -90,7 +89,7 @@ def folder_size():
 @demo_restrict
 def manual_scan():
     current_app.logger.info(f"Executed manual scan")
-    Popen(["fireshare", "bulk-import"], shell=False, start_new_session=True)
+    ingest.run_command(current_app.config['PATHS']['data'], "bulk-import")
     return Response(status=200)
 
 
@@ -99,7 +98,7 @@ def manual_scan():
 @demo_restrict
 def manual_scan_images():
     current_app.logger.info(f"Executed manual image scan")
-    Popen(["fireshare", "scan-images"], shell=False, start_new_session=True)
+    ingest.run_command(current_app.config['PATHS']['data'], "scan-images")
     return Response(status=200)
 
 
@@ -151,10 +150,8 @@ def get_game_scan_status():
 @login_required
 def get_folder_suggestions():
     """Get all pending folder suggestions"""
-    from fireshare.cli import _load_suggestions
-    suggestions = _load_suggestions()
-    logger.info(f"Loaded suggestions file, keys: {len(suggestions.keys())}")
-    folders = suggestions.get('_folders', {})
+    from fireshare.cli import get_folder_suggestions as load_folder_suggestions
+    folders = load_folder_suggestions()
     logger.info(f"Returning {len(folders)} folder suggestions: {list(folders.keys())}")
     return jsonify(folders)
 
@@ -163,19 +160,14 @@ def get_folder_suggestions():
 @login_required
 def dismiss_folder_suggestion(folder_name):
     """Dismiss a folder suggestion"""
-    from fireshare.cli import _load_suggestions, _save_suggestions
+    from fireshare.cli import delete_folder_suggestion
 
-    suggestions = _load_suggestions()
-    folder_suggestions = suggestions.get('_folders', {})
-
-    if folder_name not in folder_suggestions:
+    suggestion = delete_folder_suggestion(folder_name)
+    if suggestion is None:
         logger.warning(f"Folder suggestion not found: {folder_name}")
         return jsonify({'error': 'Folder suggestion not found'}), 404
 
-    video_count = len(folder_suggestions[folder_name].get('video_ids', []))
-    del folder_suggestions[folder_name]
-    suggestions['_folders'] = folder_suggestions
-    _save_suggestions(suggestions)
+    video_count = len(suggestion.get('video_ids', []))
 
     logger.info(f"Dismissed folder suggestion: {folder_name} ({video_count} videos)")
     return jsonify({'dismissed': True})
@@ -238,7 +230,7 @@ def get_folder_rules():
 @demo_restrict
 def create_folder_rule():
     """Create a folder rule and backfill existing untagged videos"""
-    from ..cli import _load_suggestions, _save_suggestions
+    from ..cli import delete_game_suggestions
     data = request.get_json()
 
     if not data or not data.get('folder_path') or not data.get('game_id'):
@@ -293,16 +285,8 @@ def create_folder_rule():
         logger.info(f"Folder '{folder_path}': updated {updated}, created {created} link(s) to game {game_id}")
 
     # Clear individual suggestions for videos in this folder only
-    suggestions = _load_suggestions()
-    cleared_suggestions = 0
-    video_ids_in_folder = {v.video_id for v in videos_in_folder}
-    for video_id in list(suggestions.keys()):
-        if video_id in video_ids_in_folder and video_id != '_folders':
-            del suggestions[video_id]
-            cleared_suggestions += 1
-            logger.info(f"[Backfill] Cleared suggestion for {video_id}")
+    cleared_suggestions = delete_game_suggestions(v.video_id for v in videos_in_folder)
     if cleared_suggestions:
-        _save_suggestions(suggestions)
         logger.info(f"Cleared {cleared_suggestions} individual suggestion(s) for folder '{folder_path}'")
 
     response = rule.json()
@@ -475,7 +459,7 @@ def delete_image_folder_rule(rule_id):
 @demo_restrict
 def manual_scan_games():
     """Start game scan in background thread"""
-    from fireshare.cli import save_game_suggestions_batch, _load_suggestions
+    from fireshare.cli import save_game_suggestions_batch, save_folder_suggestion, get_folder_suggestions, get_suggested_video_ids
 
     # Check if already running
     with _game_scan_state['lock']:
@@ -500,10 +484,10 @@ def manual_scan_games():
                 logger.info(f"Found {len(videos)} total videos in database")
 
                 # Load existing suggestions and linked videos upfront (single queries)
-                existing_suggestions = _load_suggestions()
+                suggested_video_ids = get_suggested_video_ids()
                 linked_video_ids = {link.video_id for link in VideoGameLink.query.all()}
-                existing_folder_suggestions = existing_suggestions.get('_folders', {})
-                logger.info(f"Existing suggestions: {len(existing_suggestions) - 1 if '_folders' in existing_suggestions else len(existing_suggestions)} individual, {len(existing_folder_suggestions)} folders")
+                folder_suggestions = get_folder_suggestions()
+                logger.info(f"Existing suggestions: {len(suggested_video_ids)} individual, {len(folder_suggestions)} folders")
                 logger.info(f"Already linked videos: {len(linked_video_ids)}")
 
                 # Get all unlinked videos for folder grouping
@@ -513,7 +497,7 @@ def manual_scan_games():
                 # Videos needing individual suggestions (not linked and no existing suggestion)
                 videos_needing_suggestions = [
                     video for video in unlinked_videos
-                    if video.video_id not in existing_suggestions
+                    if video.video_id not in suggested_video_ids
                 ]
                 logger.info(f"Videos needing individual suggestions: {len(videos_needing_suggestions)}")
 
@@ -542,7 +526,6 @@ def manual_scan_games():
                     logger.info(f"  Folder '{folder}': {len(vids)} videos")
 
                 # Process folder suggestions (folders with 2+ videos)
-                folder_suggestions = existing_suggestions.get('_folders', {})
                 processed_video_ids = set()
 
                 # Skip upload folders
@@ -551,6 +534,8 @@ def manual_scan_games():
                     DEFAULT_CONFIG['app_config']['public_upload_folder_name'].lower(),
                 }
 
+                game_matcher = util.get_game_matcher()
+
                 for folder, folder_vids in folder_videos.items():
                     # Skip upload folders
                     if folder.lower() in upload_folders:
@@ -559,7 +544,7 @@ def manual_scan_games():
                     logger.info(f"Processing folder '{folder}': {len(folder_vids)} videos, already in suggestions: {folder in folder_suggestions}")
                     if len(folder_vids) >= 2 and folder not in folder_suggestions:
                         logger.info(f"Attempting game detection for folder: '{folder}'")
-                        detected_game = util.detect_game_from_filename(folder, steamgriddb_api_key, path=f"{folder}/")
+                        detected_game = util.detect_game_from_filename(folder, steamgriddb_api_key, path=f"{folder}/", matcher=game_matcher)
 
                         if detected_game:
                             logger.info(f"Detection result for '{folder}': {detected_game['game_name']} (confidence: {detected_game['confidence']:.2f})")
@@ -577,6 +562,7 @@ def manual_scan_games():
                                 'video_ids': video_ids,
                                 'video_count': len(video_ids)
                             }
+                            save_folder_suggestion(folder, folder_suggestions[folder])
                             processed_video_ids.update(video_ids)
                             suggestions_created += 1
                             _game_scan_state['suggestions_created'] = suggestions_created
@@ -584,12 +570,6 @@ def manual_scan_games():
                         elif detected_game:
                             logger.info(f"Skipping folder '{folder}' - confidence {detected_game['confidence']:.2f} below threshold 0.65")
 
-                # Save folder suggestions
-                if folder_suggestions:
-                    existing_suggestions['_folders'] = folder_suggestions
-                    from fireshare.cli import _save_suggestions
-                    _save_suggestions(existing_suggestions)
-
                 # Process remaining individual videos (not in folder suggestions and no existing suggestion)
                 pending_suggestions = {}
                 for i, video in enumerate(videos_needing_suggestions):
@@ -599,7 +579,7 @@ def manual_scan_games():
                         continue
 
                     filename = Path(video.path).stem
-                    detected_game = util.detect_game_from_filename(filename, steamgriddb_api_key, path=video.path)
+                    detected_game = util.detect_game_from_filename(filename, steamgriddb_api_key, path=video.path, matcher=game_matcher)
 
                     if detected_game and detected_game['confidence'] >= 0.65:
                         pending_suggestions[video.video_id] = detected_game
@@ -1,17 +1,15 @@
-import json
 import logging
 import os
 import signal
 import subprocess
 import threading
-from datetime import datetime
+import time
 
-import sqlalchemy as sa
 from flask import current_app, jsonify, Response
 from flask_login import login_required
 
 from .. import db, util
-from ..models import TranscodeJob, VideoInfo
+from ..models import TranscodeJob
 from . import api
 from .decorators import demo_restrict
 
@@ -22,31 +20,14 @@ _transcoding_process = None
 _queue_lock = threading.Lock()
 _queue_thread = None
 
-
-def _count_expected_tasks(video_id, data_path):
-    """Estimate transcode task count for a video (requires app context)."""
-    if video_id is None:
-        return 0  # bulk: unknown until CLI starts; status.total takes over once running
-    config_path = data_path / 'config.json'
-    resolutions = []
-    if config_path.exists():
-        with open(config_path) as f:
-            tc = json.load(f).get('transcoding', {})
-        if tc.get('enable_1080p', True): resolutions.append(1080)
-        if tc.get('enable_720p', True): resolutions.append(720)
-        if tc.get('enable_480p', True): resolutions.append(480)
-    else:
-        resolutions = [1080, 720, 480]
-    vi = VideoInfo.query.filter_by(video_id=video_id).first()
-    original_height = vi.height or 0 if vi else 0
-    count = sum(1 for h in resolutions if original_height > h)
-    return count if count > 0 else len(resolutions)
+_TRANSCODE_LOCK = "fireshare_transcode.lock"
+# How often a drain thread checks back while another process holds the transcode lock
+_DRAIN_POLL_SECONDS = 5
 
 
 def _recover_stale_jobs(data_path):
     """Reset any 'running' jobs whose subprocess is no longer alive back to 'pending'.
     Called once when the drain thread starts, before processing any jobs."""
-    _TRANSCODE_LOCK = "fireshare_transcode.lock"
     if not util.lock_exists(data_path, _TRANSCODE_LOCK):
         stale = TranscodeJob.query.filter_by(status='running').all()
         if stale:
@@ -58,10 +39,11 @@ def _recover_stale_jobs(data_path):
 
 
 def _drain_queue(app, data_path):
-    """Background thread: claim and process DB-queued transcode jobs one at a time.
+    """Background thread: keep a `fireshare transcode-videos --queued` process running while jobs are pending.
 
-    Uses an optimistic UPDATE WHERE status='pending' to atomically claim each job,
-    so multiple workers' drain threads can safely race without double-processing.
+    That process claims the rows itself, highest priority first, with an UPDATE
+    WHERE status='pending', so drain threads in several workers can race safely:
+    only one process gets the transcode lock, and the others exit right away.
     """
     global _transcoding_process, _queue_thread
 
@@ -69,53 +51,36 @@ def _drain_queue(app, data_path):
         _recover_stale_jobs(data_path)
 
         while True:
-            # Find the oldest pending job
-            job = (TranscodeJob.query
-                   .filter_by(status='pending')
-                   .order_by(TranscodeJob.created_at)
-                   .first())
+            pending = TranscodeJob.query.filter_by(status='pending').first()
+            # Don't keep a read transaction open while waiting on the transcode process
+            db.session.remove()
 
-            if job is None:
+            if pending is None:
                 # Queue is empty — purge completed/failed rows so counts start
                 # fresh next time rather than accumulating across sessions.
-                TranscodeJob.query.filter(
-                    TranscodeJob.status.in_(['complete', 'failed'])
-                ).delete()
-                db.session.commit()
+                if not TranscodeJob.query.filter_by(status='running').first():
+                    TranscodeJob.query.filter(
+                        TranscodeJob.status.in_(['complete', 'failed'])
+                    ).delete()
+                    db.session.commit()
                 with _queue_lock:
                     _queue_thread = None
                     _transcoding_process = None
                 break
 
-            # Atomically claim it — if another worker's drain thread beats us, rowcount == 0
-            result = db.session.execute(
-                sa.update(TranscodeJob)
-                .where(sa.and_(TranscodeJob.id == job.id, TranscodeJob.status == 'pending'))
-                .values(status='running', started_at=datetime.utcnow())
-            )
-            db.session.commit()
-
-            if result.rowcount == 0:
-                continue  # Another worker claimed it; loop to find the next one
+            if util.lock_exists(data_path, _TRANSCODE_LOCK):
+                # Another process is working through the queue and will get to these jobs
+                time.sleep(_DRAIN_POLL_SECONDS)
+                continue
 
             try:
-                cmd = ['fireshare', 'transcode-videos']
-                if job.video_id is not None:
-                    cmd += ['--video', job.video_id]
-                _transcoding_process = subprocess.Popen(cmd, env=os.environ.copy(), start_new_session=True)
+                _transcoding_process = subprocess.Popen(['fireshare', 'transcode-videos', '--queued'],
+                                                        env=os.environ.copy(), start_new_session=True)
                 util.write_transcoding_status(data_path, 0, 0, None, _transcoding_process.pid)
-                returncode = _transcoding_process.wait()
-                job.status = 'complete' if returncode == 0 else 'failed'
-                job.completed_at = datetime.utcnow()
-                db.session.commit()
+                _transcoding_process.wait()
             except Exception as e:
-                logging.error(f'Transcoding drain failed for job {job.id} (video_id={job.video_id}): {e}')
-                try:
-                    job.status = 'failed'
-                    job.completed_at = datetime.utcnow()
-                    db.session.commit()
-                except Exception:
-                    pass
+                logging.error(f'Transcoding drain failed: {e}')
+                time.sleep(_DRAIN_POLL_SECONDS)
 
 
 def _ensure_drain_running(app, data_path):
@@ -134,21 +99,27 @@ def _ensure_drain_running(app, data_path):
 
 
 def _enqueue_transcode(video_id, data_path):
-    """Insert a job into the DB queue and ensure the drain thread is running."""
+    """Queue the missing renditions of a video, or a plan of the whole library, and ensure the drain thread is running."""
     global _queue_thread
-
-    # Dedup: don't queue if an identical job is already pending or running
-    existing = TranscodeJob.query.filter(
-        TranscodeJob.video_id == video_id,
-        TranscodeJob.status.in_(['pending', 'running'])
-    ).first()
-    if existing:
-        return 'already_queued'
-
-    task_count = _count_expected_tasks(video_id, data_path)
-    job = TranscodeJob(video_id=video_id, task_count=task_count)
-    db.session.add(job)
-    db.session.commit()
+    from fireshare.cli import plan_transcodes, TRANSCODE_PRIORITY_BACKLOG, TRANSCODE_PRIORITY_MANUAL
+
+    if video_id is not None:
+        if not plan_transcodes([video_id], TRANSCODE_PRIORITY_MANUAL):
+            queued = TranscodeJob.query.filter(
+                TranscodeJob.video_id == video_id,
+                TranscodeJob.status.in_(['pending', 'running'])
+            ).first()
+            return 'already_queued' if queued else 'up_to_date'
+    else:
+        # Planning the library stats files, so it runs in the transcode process
+        existing = TranscodeJob.query.filter(
+            TranscodeJob.video_id == None, TranscodeJob.kind == 'plan',
+            TranscodeJob.status.in_(['pending', 'running'])
+        ).first()
+        if existing:
+            return 'already_queued'
+        db.session.add(TranscodeJob(video_id=None, kind='plan', priority=TRANSCODE_PRIORITY_BACKLOG))
+        db.session.commit()
 
     app = current_app._get_current_object()
     with _queue_lock:
@@ -203,8 +174,8 @@ def get_transcoding_status():
     if not subprocess_running and _transcoding_process is not None:
         _transcoding_process = None
 
-    pending_jobs = TranscodeJob.query.filter_by(status='pending').all()
-    completed_count = TranscodeJob.query.filter_by(status='complete').count()
+    queue_tasks = TranscodeJob.query.filter(TranscodeJob.status == 'pending', TranscodeJob.kind != 'plan').count()
+    completed_count = TranscodeJob.query.filter(TranscodeJob.status == 'complete', TranscodeJob.kind != 'plan').count()
 
     return jsonify({
         "enabled": enabled,
@@ -216,7 +187,7 @@ def get_transcoding_status():
         "percent": progress.get('percent'),
         "eta_seconds": progress.get('eta_seconds'),
         "resolution": progress.get('resolution'),
-        "queue_tasks": sum(j.task_count for j in pending_jobs),
+        "queue_tasks": queue_tasks,
         "completed_tasks": completed_count,
     })
 
@@ -10,7 +10,7 @@ from subprocess import Popen
 from flask import current_app, jsonify, request, Response
 from flask_login import login_required
 
-from .. import logger, util
+from .. import ingest, logger, util
 from ..constants import SUPPORTED_FILE_TYPES
 from . import api
 from .helpers import secure_filename
@@ -43,22 +43,41 @@ def _parse_upload_metadata():
 
 def _launch_scan_video(save_path, config, tag_ids=None, game_id=None, title=None):
     """
-    Launch scan-video and publish an initial transcoding-running status when
-    auto-transcode is enabled so SSE subscribers can reflect upload-triggered work.
+    Hand scan-video to the ingest worker (or launch it when no worker is running)
+    and publish an initial transcoding-running status when auto-transcode is
+    enabled so SSE subscribers can reflect upload-triggered work.
     Optionally apply tag_ids and game_id to the video after the scan completes.
     """
     paths = current_app.config['PATHS']
     data_path = paths['data']
-    videos_path = paths['video']
-    app = current_app._get_current_object()
-    cmd = ["fireshare", "scan-video", f"--path={save_path}"]
+    args = [f"--path={save_path}"]
     if tag_ids:
-        cmd.append(f"--tag-ids={','.join(str(t) for t in tag_ids)}")
+        args.append(f"--tag-ids={','.join(str(t) for t in tag_ids)}")
     if game_id:
-        cmd.append(f"--game-id={game_id}")
+        args.append(f"--game-id={game_id}")
     if title:
-        cmd.append(f"--title={title}")
-    scan_proc = Popen(cmd, shell=False, start_new_session=True)
+        args.append(f"--title={title}")
+
+    transcoding_enabled = current_app.config.get('ENABLE_TRANSCODING', False)
+    auto_transcode = config.get('transcoding', {}).get('auto_transcode', True)
+    transcode_already_running = _transcoding_mod._transcoding_process is not None and _transcoding_mod._transcoding_process.poll() is None
+    publish_status = transcoding_enabled and auto_transcode and not transcode_already_running
+
+    def publish(pid):
+        try:
+            util.write_transcoding_status(data_path, 0, 0, None, pid)
+        except Exception as e:
+            logger.warning(f"Failed to write initial upload transcoding status: {e}")
+
+    # The worker clears a placeholder carrying its PID once the scan is done, so
+    # publish before submitting in case the scan finishes first.
+    worker_pid = ingest.worker_pid(data_path)
+    if publish_status and worker_pid:
+        publish(worker_pid)
+    if ingest.submit(data_path, "scan-video", args) is not None:
+        return None
+
+    scan_proc = Popen(["fireshare", "scan-video", *args], shell=False, start_new_session=True)
 
     def reap_and_cleanup():
         try:
@@ -71,14 +90,8 @@ def _launch_scan_video(save_path, config, tag_ids=None, game_id=None, title=None
 
     threading.Thread(target=reap_and_cleanup, daemon=True).start()
 
-    transcoding_enabled = current_app.config.get('ENABLE_TRANSCODING', False)
-    auto_transcode = config.get('transcoding', {}).get('auto_transcode', True)
-    transcode_already_running = _transcoding_mod._transcoding_process is not None and _transcoding_mod._transcoding_process.poll() is None
-    if transcoding_enabled and auto_transcode and not transcode_already_running:
-        try:
-            util.write_transcoding_status(data_path, 0, 0, None, scan_proc.pid)
-        except Exception as e:
-            logger.warning(f"Failed to write initial upload transcoding status: {e}")
+    if publish_status:
+        publish(scan_proc.pid)
 
     return scan_proc
 
@@ -127,6 +140,7 @@ def public_upload_video():
         name_no_type = ".".join(filename.split('.')[0:-1])
         uid = ''.join(random.choice(string.ascii_lowercase + string.digits) for _ in range(6))
         save_path = os.path.join(paths['video'], upload_folder, f"{name_no_type}-{uid}.{filetype}")
+    ingest.mark_upload(paths['data'], save_path)
     file.save(save_path)
     _launch_scan_video(save_path, config, *_parse_upload_metadata())
     return Response(status=201)
@@ -205,6 +219,7 @@ def public_upload_videoChunked():
         uid = ''.join(random.choice(string.ascii_lowercase + string.digits) for _ in range(6))
         save_path = os.path.join(paths['video'], upload_folder, f"{name_no_type}-{uid}.{filetype}")
 
+    ingest.mark_upload(paths['data'], save_path)
     try:
         with open(save_path, 'wb') as output_file:
             for i in range(1, totalChunks + 1):
@@ -215,6 +230,7 @@ def public_upload_videoChunked():
 
         if os.path.getsize(save_path) != fileSize:
             os.remove(save_path)
+            ingest.release_upload(paths['data'], save_path)
             return Response(status=500, response="File size mismatch after reassembly")
 
     except Exception:
@@ -223,6 +239,7 @@ def public_upload_videoChunked():
                 os.remove(chunk_path)
         if os.path.exists(save_path):
             os.remove(save_path)
+        ingest.release_upload(paths['data'], save_path)
         return Response(status=500, response="Error reassembling file")
 
     _launch_scan_video(save_path, config, *_parse_upload_metadata())
@@ -323,6 +340,7 @@ def upload_video():
         name_no_type = ".".join(filename.split('.')[0:-1])
         uid = ''.join(random.choice(string.ascii_lowercase + string.digits) for _ in range(6))
         save_path = os.path.join(paths['video'], upload_folder, f"{name_no_type}-{uid}.{filetype}")
+    ingest.mark_upload(paths['data'], save_path)
     file.save(save_path)
     _launch_scan_video(save_path, config, *_parse_upload_metadata())
     return Response(status=201)
@@ -403,6 +421,7 @@ def upload_videoChunked():
         uid = ''.join(random.choice(string.ascii_lowercase + string.digits) for _ in range(6))
         save_path = os.path.join(upload_directory, f"{name_no_type}-{uid}.{filetype}")
 
+    ingest.mark_upload(paths['data'], save_path)
     # Reassemble chunks in correct order
     try:
         with open(save_path, 'wb') as output_file:
@@ -416,6 +435,7 @@ def upload_videoChunked():
         # Verify file size
         if os.path.getsize(save_path) != fileSize:
             os.remove(save_path)
+            ingest.release_upload(paths['data'], save_path)
             return Response(status=500, response="File size mismatch after reassembly")
 
     except Exception as e:
@@ -425,6 +445,7 @@ def upload_videoChunked():
                 os.remove(chunk_path)
         if os.path.exists(save_path):
             os.remove(save_path)
+        ingest.release_upload(paths['data'], save_path)
         return Response(status=500, response="Error reassembling file")
 
     _launch_scan_video(save_path, config, *_parse_upload_metadata())
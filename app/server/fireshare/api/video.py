@@ -17,7 +17,7 @@ from sqlalchemy import func
 from sqlalchemy.sql import text
 
 from .. import db, logger, util
-from ..models import Video, VideoInfo, VideoView, VideoGameLink, VideoTagLink, FolderRule
+from ..models import Video, VideoInfo, VideoView, VideoGameLink, VideoTagLink, FolderRule, MediaProbe, MetadataRetry, CorruptVideo
 from . import api
 from .helpers import get_video_path, add_cache_headers, add_poster_cache_headers
 from .decorators import demo_restrict
@@ -137,14 +137,22 @@ def _retranscode_async(video_id, source_path, paths, do_480p, do_720p, do_1080p)
     if do_1080p:
         heights.append(1080)
 
+    # Shares the encode slots with transcode-videos and the other workers
+    concurrency = util.transcode_concurrency(current_app.config.get('TRANSCODE_CONCURRENCY', 0))
+    targets = [(height, derived_dir / f"{video_id}-{height}p.mp4") for height in heights]
+    jobs = [targets] if current_app.config.get('TRANSCODE_LADDER', True) else [[t] for t in targets]
+    segment_seconds = current_app.config.get('TRANSCODE_SEGMENT_SECONDS', 0)
+
     def run():
-        for height in heights:
-            out_path = derived_dir / f"{video_id}-{height}p.mp4"
-            success, _ = util.transcode_video_quality(source_path, out_path, height)
+        for job in jobs:
+            with util.transcode_slot(paths["data"], concurrency):
+                success, _ = util.transcode_video_ladder(source_path, job, threads=util.transcode_threads(concurrency),
+                                                         segment_seconds=segment_seconds, slots=concurrency)
             with app.app_context():
                 vi = VideoInfo.query.filter_by(video_id=video_id).first()
                 if vi and success:
-                    setattr(vi, f'has_{height}p', True)
+                    for height, _ in job:
+                        setattr(vi, f'has_{height}p', True)
                     db.session.commit()
 
     import threading
@@ -445,6 +453,9 @@ def delete_video(id):
         VideoGameLink.query.filter_by(video_id=id).delete()
         VideoTagLink.query.filter_by(video_id=id).delete()
         VideoView.query.filter_by(video_id=id).delete()
+        MediaProbe.query.filter_by(video_id=id).delete()
+        MetadataRetry.query.filter_by(video_id=id).delete()
+        CorruptVideo.query.filter_by(video_id=id).delete()
         Video.query.filter_by(video_id=id).delete()
         db.session.commit()
 
@@ -840,32 +851,25 @@ def get_video():
 @login_required
 def get_corrupt_videos():
     """Get a list of all videos marked as corrupt"""
-    from fireshare.cli import get_all_corrupt_videos
-
-    corrupt_video_ids = get_all_corrupt_videos()
+    corrupt_rows = CorruptVideo.query.order_by(CorruptVideo.id).all()
 
     # Get video details for all corrupt videos in a single query
     video_info_map = {}
-    if corrupt_video_ids:
-        video_infos = VideoInfo.query.filter(VideoInfo.video_id.in_(corrupt_video_ids)).all()
+    if corrupt_rows:
+        video_infos = VideoInfo.query.filter(VideoInfo.video_id.in_([c.video_id for c in corrupt_rows])).all()
         video_info_map = {vi.video_id: vi for vi in video_infos}
 
     corrupt_videos = []
-    for video_id in corrupt_video_ids:
-        vi = video_info_map.get(video_id)
-        if vi:
-            corrupt_videos.append({
-                'video_id': video_id,
-                'title': vi.title,
-                'path': vi.video.path if vi.video else None
-            })
-        else:
+    for row in corrupt_rows:
+        vi = video_info_map.get(row.video_id)
+        corrupt_videos.append({
+            'video_id': row.video_id,
             # Video may have been deleted but still in corrupt list
-            corrupt_videos.append({
-                'video_id': video_id,
-                'title': None,
-                'path': None
-            })
+            'title': vi.title if vi else None,
+            'path': vi.video.path if vi and vi.video else None,
+            'reason': row.reason,
+            'probed_at': row.probed_at.isoformat() if row.probed_at else None,
+        })
     return jsonify(corrupt_videos)
 
 
@@ -2,145 +2,176 @@
 import os
 import json
 import signal
-import sys
 import click
-from datetime import datetime
-from flask import current_app, request
-from fireshare import create_app, db, util, logger
-from fireshare.models import User, Video, VideoInfo, FolderRule, VideoGameLink, VideoTagLink, Image, ImageInfo, ImageGameLink, ImageTagLink, ImageFolderRule
+import contextlib
+import threading
+from datetime import datetime, timedelta
+from flask import current_app, request, has_app_context
+from fireshare import create_app, db, notify, util, logger
+from fireshare.fileindex import FileIdIndex
+from fireshare.models import CorruptVideo, FileIndex, GameSuggestion, MetadataRetry, ScanRun, TranscodeJob, User, Video, VideoInfo, FolderRule, VideoGameLink, VideoTagLink, Image, ImageInfo, ImageGameLink, ImageTagLink, ImageFolderRule
 from werkzeug.security import generate_password_hash
 from pathlib import Path
-from sqlalchemy import func
+from sqlalchemy import and_, func, or_, update
 import time
-import requests
 import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from subprocess import Popen
 
 from .constants import SUPPORTED_FILE_EXTENSIONS
 
 # Helper functions for persistent game suggestions storage
-def _get_suggestions_file():
-    """Get path to the suggestions JSON file"""
-    from flask import current_app
-    data_dir = Path(current_app.config.get('DATA_DIRECTORY', '/data'))
-    return data_dir / 'game_suggestions.json'
-
-def _load_suggestions():
-    """Load suggestions from JSON file"""
-    suggestions_file = _get_suggestions_file()
-    if suggestions_file.exists():
-        try:
-            with open(suggestions_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {}
-    return {}
-
-def _save_suggestions(suggestions):
-    """Save suggestions to JSON file"""
-    suggestions_file = _get_suggestions_file()
-    suggestions_file.parent.mkdir(parents=True, exist_ok=True)
-    try:
-        with open(suggestions_file, 'w') as f:
-            json.dump(suggestions, f)
-    except IOError as e:
-        logger.error(f"Failed to save game suggestions: {e}")
+_SUGGESTION_CHUNK = 500
+
+def _apply_suggestion(row, suggestion):
+    row.game_id = suggestion.get('game_id')
+    row.game_name = suggestion.get('game_name')
+    row.steamgriddb_id = suggestion.get('steamgriddb_id')
+    row.confidence = suggestion.get('confidence')
+    row.source = suggestion.get('source')
+    release_date = suggestion.get('release_date')
+    row.release_date = str(release_date) if release_date is not None else None
+    if row.folder_path is not None:
+        row.video_ids = json.dumps(suggestion.get('video_ids') or [])
 
 def get_game_suggestion(video_id):
     """Get a game suggestion for a video"""
-    suggestions = _load_suggestions()
-    return suggestions.get(video_id)
+    row = GameSuggestion.query.filter_by(video_id=video_id).first()
+    return row.json() if row else None
+
+def get_suggested_video_ids():
+    """Ids of all videos that have a pending game suggestion"""
+    return {video_id for (video_id,) in db.session.query(GameSuggestion.video_id).filter(GameSuggestion.video_id.isnot(None))}
 
 def save_game_suggestion(video_id, suggestion):
     """Save a game suggestion for a video"""
-    suggestions = _load_suggestions()
-    suggestions[video_id] = suggestion
-    _save_suggestions(suggestions)
+    save_game_suggestions_batch({video_id: suggestion})
 
 def save_game_suggestions_batch(new_suggestions):
     """Save multiple game suggestions at once"""
     if not new_suggestions:
         return
-    suggestions = _load_suggestions()
-    suggestions.update(new_suggestions)
-    _save_suggestions(suggestions)
+    ids = list(new_suggestions)
+    existing = {}
+    for i in range(0, len(ids), _SUGGESTION_CHUNK):
+        for row in GameSuggestion.query.filter(GameSuggestion.video_id.in_(ids[i:i + _SUGGESTION_CHUNK])):
+            existing[row.video_id] = row
+    for video_id, suggestion in new_suggestions.items():
+        row = existing.get(video_id)
+        if row is None:
+            row = GameSuggestion(video_id=video_id, created_at=datetime.utcnow())
+            db.session.add(row)
+        _apply_suggestion(row, suggestion)
+    db.session.commit()
 
 def delete_game_suggestion(video_id):
     """Delete a game suggestion for a video"""
-    suggestions = _load_suggestions()
-    if video_id in suggestions:
-        del suggestions[video_id]
-        _save_suggestions(suggestions)
-        return True
-    return False
+    deleted = GameSuggestion.query.filter_by(video_id=video_id).delete(synchronize_session=False)
+    db.session.commit()
+    return bool(deleted)
+
+def delete_game_suggestions(video_ids):
+    """Delete the game suggestions for several videos, returns how many were removed"""
+    ids = list(video_ids)
+    deleted = 0
+    for i in range(0, len(ids), _SUGGESTION_CHUNK):
+        deleted += GameSuggestion.query.filter(GameSuggestion.video_id.in_(ids[i:i + _SUGGESTION_CHUNK])).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+def get_folder_suggestions():
+    """Folder suggestions keyed by folder path"""
+    rows = GameSuggestion.query.filter(GameSuggestion.folder_path.isnot(None)).order_by(GameSuggestion.id)
+    return {row.folder_path: row.json() for row in rows}
+
+def save_folder_suggestion(folder_path, suggestion):
+    """Save a game suggestion for every video in a folder"""
+    row = GameSuggestion.query.filter_by(folder_path=folder_path).first()
+    if row is None:
+        row = GameSuggestion(folder_path=folder_path, created_at=datetime.utcnow())
+        db.session.add(row)
+    _apply_suggestion(row, suggestion)
+    db.session.commit()
+
+def delete_folder_suggestion(folder_path):
+    """Delete a folder suggestion, returns it or None if there was none"""
+    row = GameSuggestion.query.filter_by(folder_path=folder_path).first()
+    if row is None:
+        return None
+    suggestion = row.json()
+    db.session.delete(row)
+    db.session.commit()
+    return suggestion
 
 # Helper functions for persistent corrupt video tracking
-def _get_corrupt_videos_file():
-    """Get path to the corrupt videos JSON file"""
-    from flask import current_app
-    data_dir = Path(current_app.config.get('DATA_DIRECTORY', '/data'))
-    return data_dir / 'corrupt_videos.json'
-
-def _load_corrupt_videos():
-    """Load corrupt videos list from JSON file"""
-    corrupt_file = _get_corrupt_videos_file()
-    if corrupt_file.exists():
-        try:
-            with open(corrupt_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
-    return []
-
-def _save_corrupt_videos(corrupt_list):
-    """Save corrupt videos list to JSON file"""
-    corrupt_file = _get_corrupt_videos_file()
-    corrupt_file.parent.mkdir(parents=True, exist_ok=True)
-    try:
-        with open(corrupt_file, 'w') as f:
-            json.dump(corrupt_list, f)
-    except IOError as e:
-        logger.error(f"Failed to save corrupt videos list: {e}")
-
 def is_video_corrupt(video_id):
     """Check if a video is marked as corrupt"""
-    corrupt_list = _load_corrupt_videos()
-    return video_id in corrupt_list
-
-def mark_video_corrupt(video_id):
-    """Mark a video as corrupt"""
-    corrupt_list = _load_corrupt_videos()
-    if video_id not in corrupt_list:
-        corrupt_list.append(video_id)
-        _save_corrupt_videos(corrupt_list)
+    return db.session.query(CorruptVideo.id).filter_by(video_id=video_id).first() is not None
+
+def mark_video_corrupt(video_id, reason=None, source_path=None):
+    """
+    Mark a video as corrupt. source_path is stat'ed so the mark is dropped
+    automatically once the file changes (see get_corrupt_video_ids).
+    """
+    row = CorruptVideo.query.filter_by(video_id=video_id).first()
+    if row is None:
+        row = CorruptVideo(video_id=video_id, created_at=datetime.utcnow())
+        db.session.add(row)
         logger.info(f"Marked video {video_id} as corrupt")
+    row.reason = reason[:512] if reason else None
+    row.probed_at = datetime.utcnow()
+    if source_path is not None:
+        row.size, row.mtime_ns = _stat_signature(source_path)
+    db.session.commit()
 
 def clear_video_corrupt(video_id):
     """Clear the corrupt status for a video"""
-    corrupt_list = _load_corrupt_videos()
-    if video_id in corrupt_list:
-        corrupt_list.remove(video_id)
-        _save_corrupt_videos(corrupt_list)
+    deleted = CorruptVideo.query.filter_by(video_id=video_id).delete(synchronize_session=False)
+    db.session.commit()
+    if deleted:
         logger.info(f"Cleared corrupt status for video {video_id}")
-        return True
-    return False
+    return bool(deleted)
 
 def get_all_corrupt_videos():
     """Get list of all corrupt video IDs"""
-    return _load_corrupt_videos()
+    return [video_id for (video_id,) in db.session.query(CorruptVideo.video_id).order_by(CorruptVideo.id)]
+
+def get_corrupt_video_ids(source_paths):
+    """
+    Set of all corrupt video ids, loaded in one query. Marks for videos in
+    source_paths (video_id -> path) whose file changed since it failed are
+    cleared so the new file gets another try.
+    """
+    corrupt = set()
+    changed = []
+    for row in CorruptVideo.query.all():
+        path = source_paths.get(row.video_id)
+        if path is not None:
+            signature = _stat_signature(path)
+            if row.size is None and row.mtime_ns is None:
+                # Marked before sizes were recorded; this is the baseline from now on
+                row.size, row.mtime_ns = signature
+            elif signature != (None, None) and signature != (row.size, row.mtime_ns):
+                changed.append(row.video_id)
+                continue
+        corrupt.add(row.video_id)
+    for i in range(0, len(changed), _BULK_CHUNK):
+        CorruptVideo.query.filter(CorruptVideo.video_id.in_(changed[i:i + _BULK_CHUNK])).delete(synchronize_session=False)
+    db.session.commit()
+    if changed:
+        logger.info(f"Cleared corrupt status for {len(changed)} video(s) whose source file changed")
+    return corrupt
 
 def clear_all_corrupt_videos():
     """Clear all corrupt video statuses"""
-    count = len(_load_corrupt_videos())
-    _save_corrupt_videos([])
+    count = CorruptVideo.query.delete(synchronize_session=False)
+    db.session.commit()
     logger.info(f"Cleared corrupt status for {count} video(s)")
     return count
 
 def send_discord_webhook(webhook_url=None, video_url=None):
-    payload = {
-        "content": video_url,
-        "username": "Fireshare",
-        "avatar_url": "https://github.com/ShaneIsrael/fireshare/raw/develop/app/client/src/assets/logo_square.png",
-    }
+    payload = notify.discord_payload(video_url)
+    import requests
     try:
         response = requests.post(webhook_url, json=payload)
         response.raise_for_status()
@@ -154,6 +185,7 @@ def send_generic_webhook(webhook_url, video_url=None, custom_payload=None):
     payload = custom_payload if custom_payload is not None else {}
     if not payload and video_url:
         payload["content"] = video_url
+    import requests
     try:
         response = requests.post(webhook_url, json=payload)     
         response.raise_for_status()
@@ -161,26 +193,165 @@ def send_generic_webhook(webhook_url, video_url=None, custom_payload=None):
     except requests.exceptions.RequestException as e:
         return {"status": "error", "message": str(e)}
 
-def get_public_watch_url(video_id, config, host):
-    shareable_link_domain = config.get("ui_config", {}).get("shareable_link_domain", "")
-    if shareable_link_domain:
-        if not shareable_link_domain.startswith("https://") and not shareable_link_domain.startswith("http://"):
-            shareable_link_domain = f"https://{shareable_link_domain}"
-        return f"{shareable_link_domain}/w/{video_id}"
-    elif host:
-        if not host.startswith("https://") and not host.startswith("http://"):
-            host = f"https://{host}"
-        return f"{host}/w/{video_id}"
-    else:
-        return print("--Unable to post to Discord--\nPlease check that your DOMAIN env variable is set correctly or that you have a shareable link domain set in your Admin settings.")
-    
+def _app_context():
+    """
+    Context for running a command: reuses the current app context when one is
+    active (commands invoked from another command or from the ingest worker)
+    instead of running create_app() again.
+    """
+    if has_app_context():
+        return contextlib.nullcontext()
+    return create_app(mode="worker").app_context()
+
+def _spawn_transcode(data_path):
+    """Work through the transcode queue in its own process so the caller isn't held up by the encode."""
+    cmd = ["fireshare", "transcode-videos", "--queued"]
+    proc = Popen(cmd, shell=False, start_new_session=True)
+    util.write_transcoding_status(data_path, 0, 0, None, proc.pid)
+    threading.Thread(target=proc.wait, daemon=True).start()
+    return proc
+
+def _relink_source(link_path, source_path):
+    """Point a video_links/image_links symlink at a source file's new location."""
+    try:
+        if link_path.exists() or link_path.is_symlink():
+            link_path.unlink()
+        os.symlink(Path(source_path).absolute(), link_path)
+    except OSError as e:
+        logger.warning(f"Could not update link {link_path} -> {source_path}: {e}")
+
+# Rows written per commit while syncing metadata
+_METADATA_BATCH_SIZE = 100
+# Backoff for videos whose metadata could not be read: 1m, 2m, 4m, ... capped at 6h
+_METADATA_RETRY_BASE = 60
+_METADATA_RETRY_MAX = 6 * 60 * 60
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (None, None)
+    return (st.st_size, st.st_mtime_ns)
+
+def _defer_metadata(v, vpath, retries):
+    """Park a video whose metadata could not be read so it is retried later with backoff."""
+    retry = retries.get(v.video_id)
+    if retry is None:
+        retry = MetadataRetry(video_id=v.video_id, attempts=0)
+        db.session.add(retry)
+        retries[v.video_id] = retry
+    retry.attempts += 1
+    delay = min(_METADATA_RETRY_BASE * 2 ** (retry.attempts - 1), _METADATA_RETRY_MAX)
+    retry.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+    retry.size, retry.mtime_ns = _stat_signature(vpath)
+    retry.last_error = "Could not read video metadata"
+    logger.warning(f"[{v.video.path}] - There may be a corrupt file in your video directory. Or, you may be recording to the video directory and haven't finished yet.")
+    logger.warning(f"For more info and to find the offending file, run this command in your container: \"stat {vpath}\"")
+    logger.warning(f"I'll try to process this file again in {delay // 60} minute(s), or sooner if it changes (attempt {retry.attempts})")
+
+
+def _hash_io_summary(before):
+    """Describe the content-id hashing I/O since the util.scan_io_stats snapshot before."""
+    stats = util.scan_io_stats
+    read = (stats['bytes_read'] - before['bytes_read']) / (1024 * 1024)
+    cached = (stats['cached_bytes'] - before['cached_bytes']) / (1024 * 1024)
+    throttled = stats['throttled_seconds'] - before['throttled_seconds']
+    return f"hashing read {read:,.1f}MB from disk and {cached:,.1f}MB from cache, throttled for {throttled:.1f}s"
+
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_BULK_CHUNK = 500
+
+
+# A scan commits its file index progress this often, so a restarted import does
+# not have to hash the files it already got through
+_CHECKPOINT_FILES = 1000
+_CHECKPOINT_SECONDS = 60
+
+def _checkpoint():
+    """Commit without expiring loaded rows, which the scan loop keeps using."""
+    session = db.session()
+    expire_on_commit = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = expire_on_commit
+
+def _timed(iterable, totals, key):
+    """Yield from iterable, adding the time spent producing each item to totals[key]."""
+    it = iter(iterable)
+    while True:
+        s = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            totals[key] += time.perf_counter() - s
+            return
+        totals[key] += time.perf_counter() - s
+        yield item
+
+def _verify_availability(model, id_attr, rows, scanned_paths, media_root, root, ignore, walk_errors):
+    """
+    Update the available flag of existing rows in bulk after a scan.
+
+    Rows whose path the walker saw are available; rows under the scanned root
+    that it did not see are missing. Rows the walker could not have seen
+    (outside the scanned root, ignored, or in a directory that failed to read)
+    fall back to checking the filesystem. Returns (missing, reappeared) counts.
+    """
+    prefix = root.strip('/') + '/' if root else ''
+    unreadable = [str(Path(p).relative_to(media_root)) for p in walk_errors]
+    unreadable_prefixes = tuple('' if p == '.' else p + '/' for p in unreadable)
+    label = model.__name__
+    missing, reappeared = [], []
+    for row in rows:
+        if row.path in scanned_paths:
+            present = True
+        elif (row.path.startswith(prefix) and not row.path.startswith(unreadable_prefixes)
+              and not util.is_ignored_path(row.path, ignore)):
+            present = False
+        else:
+            present = (media_root / row.path).exists()
+        if present and not row.available:
+            reappeared.append(getattr(row, id_attr))
+        elif not present and row.available:
+            logger.warning(f"{label} {getattr(row, id_attr)} at {media_root / row.path} was not found")
+            missing.append(getattr(row, id_attr))
+
+    id_column = getattr(model, id_attr)
+    for ids, available in ((missing, False), (reappeared, True)):
+        for i in range(0, len(ids), _BULK_CHUNK):
+            model.query.filter(id_column.in_(ids[i:i + _BULK_CHUNK])).update({"available": available}, synchronize_session=False)
+    if missing:
+        logger.info(f"Marked {len(missing):,} missing {label.lower()}(s) unavailable")
+    if reappeared:
+        logger.info(f"Marked {len(reappeared):,} {label.lower()}(s) available again")
+    return len(missing), len(reappeared)
+
+def _use_sparse_ids():
+    """
+    Whether content ids should be computed with sparse sampling.
+    The library keeps the scheme it is keyed with until `fireshare rekey-content-ids` converts it.
+    """
+    data_path = current_app.config['PATHS']['data']
+    active = util.read_content_id_mode(data_path)
+    requested = current_app.config['CONTENT_ID_MODE']
+    if active != requested:
+        if Video.query.first() is None and Image.query.first() is None:
+            util.write_content_id_mode(data_path, requested)
+            return requested == 'sparse'
+        logger.warning(f"FS_CONTENT_ID={requested} but the library is keyed with '{active}' ids. "
+                       f"Run `fireshare rekey-content-ids` to convert it; using '{active}' until then.")
+    return active == 'sparse'
+
 @click.group()
 def cli():
     pass
 
 @cli.command()
 def init_db():
-    with create_app().app_context():
+    with _app_context():
         db.create_all()
         logger.info(f"Created database file at {current_app.config['SQLALCHEMY_DATABASE_URI']}")
 
@@ -188,7 +359,7 @@ def init_db():
 @click.option("--username", "-u", help="Username", required=True)
 @click.option("--password", "-p", help="Password", prompt=True, hide_input=True)
 def add_user(username, password):
-    with create_app().app_context():
+    with _app_context():
         new_user = User(username=username, password=generate_password_hash(password, method='pbkdf2:sha256'))
         db.session.add(new_user)
         db.session.commit()
@@ -197,7 +368,7 @@ def add_user(username, password):
 @cli.command()
 @click.option("--root", "-r", help="root video path to scan", required=False)
 def scan_videos(root):
-    with create_app().app_context():
+    with _app_context():
         paths = current_app.config['PATHS']
         domain = current_app.config['DOMAIN']
         videos_path = paths["video"]
@@ -206,74 +377,119 @@ def scan_videos(root):
         config_file = open(paths["data"] / "config.json")
         config = json.load(config_file)
         video_config = config["app_config"]["video_defaults"]
-        discord_webhook_url = config["integrations"]["discord_webhook_url"]
-        generic_webhook_url = config["integrations"]["generic_webhook_url"]
-        generic_webhook_payload = config["integrations"]["generic_webhook_payload"]
         config_file.close()
         
         if not video_links.is_dir():
             video_links.mkdir()
 
         logger.info(f"Scanning {str(videos_path)} for {', '.join(SUPPORTED_FILE_EXTENSIONS)} video files")
+        io_before = dict(util.scan_io_stats)
+        # Phase durations and file counts, returned to bulk_import for the scan_run ledger
+        stats = {'walk_seconds': 0.0, 'hash_seconds': 0.0}
+        hash_times = []
         CHUNK_FILE_PATTERN = re.compile(r'\.part\d{4}$')
         TRANSCODE_PATTERN = re.compile(r'-(?:720p|1080p)\.mp4$', re.IGNORECASE)
         
-        # Collect all video files and filter out transcoded versions
-        all_files = [f for f in (videos_path / root if root else videos_path).glob('**/*') 
-                     if f.is_file() and f.suffix.lower() in SUPPORTED_FILE_EXTENSIONS]
-        
-        video_files = []
         skipped_count = 0
-        for f in all_files:
-            if CHUNK_FILE_PATTERN.search(f.name):
-                continue  # Skip chunk files silently
-            elif f.name.startswith('._'):
-                continue  # Skip macOS sidecar files silently
-            elif TRANSCODE_PATTERN.search(f.name):
-                logger.debug(f"Skipping transcoded file: {f.name}")
+
+        def accept(name):
+            nonlocal skipped_count
+            if CHUNK_FILE_PATTERN.search(name):
+                return False  # Skip chunk files silently
+            if name.startswith('._'):
+                return False  # Skip macOS sidecar files silently
+            if TRANSCODE_PATTERN.search(name):
+                logger.debug(f"Skipping transcoded file: {name}")
                 skipped_count += 1
-            else:
-                video_files.append(f)
-        
-        if skipped_count > 0:
-            logger.info(f"Skipped {skipped_count} transcoded video file(s)")
-        
+                return False
+            return True
+
+        # Streamed straight into the hashing pool below instead of being collected first
+        walk_errors = []
+        video_files = util.walk_files(videos_path / root if root else videos_path, SUPPORTED_FILE_EXTENSIONS,
+                                      ignore=current_app.config['SCAN_IGNORE'], name_filter=accept, errors=walk_errors)
+
         video_rows = Video.query.all()
+        videos_by_id = {vr.video_id: vr for vr in video_rows}
+        file_index = FileIdIndex('video')
+        sparse_ids = _use_sparse_ids()
+        scanned_paths = set()
+
+        def identify(vf):
+            # Runs on the scan pool: stat the file and hash it only on an index miss.
+            path = str(vf.relative_to(videos_path))
+            st = vf.stat()
+            video_id = file_index.match(path, st)
+            if video_id is not None:
+                return vf, path, st, video_id, True
+            s = time.perf_counter()
+            video_id = util.video_id(vf, sparse=sparse_ids)
+            hash_times.append(time.perf_counter() - s)
+            return vf, path, st, video_id, False
 
         new_videos = []
-        for vf in video_files:
-            path = str(vf.relative_to(videos_path)) 
-            video_id = util.video_id(vf)
-            existing = next((vr for vr in video_rows if vr.video_id == video_id), None)
-            duplicate = next((dvr for dvr in new_videos if dvr.video_id == video_id), None)
-            if duplicate:
-                logger.debug(f"Found duplicate video {video_id} as {str(path)}, skipping...")
-            elif existing:
-                if not existing.available:
-                    logger.debug(f"Updating Video {video_id}, available=True")
-                    db.session.query(Video).filter_by(video_id=existing.video_id).update({ "available": True })
-                if not existing.created_at:
-                    created_at = datetime.fromtimestamp(os.path.getctime(f"{videos_path}/{path}"))
-                    logger.debug(f"Updating Video {video_id}, created_at={created_at}")
-                    db.session.query(Video).filter_by(video_id=existing.video_id).update({ "created_at": created_at })
-                if not existing.updated_at:
-                    updated_at = datetime.fromtimestamp(os.path.getmtime(f"{videos_path}/{path}"))
-                    logger.debug(f"Updating Video {video_id}, updated_at={updated_at}")
-                    db.session.query(Video).filter_by(video_id=existing.video_id).update({ "updated_at": updated_at })
-            else:
-                created_at = datetime.fromtimestamp(os.path.getctime(f"{videos_path}/{path}"))
-                updated_at = datetime.fromtimestamp(os.path.getmtime(f"{videos_path}/{path}"))
-                recorded_at = util.extract_date_from_file(vf)
+        new_video_ids = set()
+        pending_new = []
+        moved_count = 0
+        checkpoint_misses, checkpoint_at = 0, time.monotonic()
+        with ThreadPoolExecutor(max_workers=current_app.config['SCAN_WORKERS']) as pool:
+            # Results come back in scan order, so all DB work and logging below
+            # stays on this thread and is deterministic. ffprobe for new videos is
+            # submitted as soon as they are found so it overlaps remaining hashing.
+            window = current_app.config['SCAN_WORKERS'] * 4
+            for vf, path, st, video_id, hit in util.ordered_map(pool, identify, _timed(video_files, stats, 'walk_seconds'), window):
+                scanned_paths.add(path)
+                file_index.record(path, st, video_id, hit)
+                if not hit:
+                    checkpoint_misses += 1
+                    if checkpoint_misses >= _CHECKPOINT_FILES or time.monotonic() - checkpoint_at >= _CHECKPOINT_SECONDS:
+                        _checkpoint()
+                        logger.debug(f"File index checkpoint: {file_index.summary()}")
+                        checkpoint_misses, checkpoint_at = 0, time.monotonic()
+                existing = videos_by_id.get(video_id)
+                if video_id in new_video_ids:
+                    logger.debug(f"Found duplicate video {video_id} as {str(path)}, skipping...")
+                elif existing:
+                    if existing.path != path and not (videos_path / existing.path).exists():
+                        logger.info(f"Video {video_id} moved from {existing.path} to {path}")
+                        existing.path = path
+                        existing.available = True
+                        _relink_source(video_links / (existing.video_id + existing.extension), vf)
+                        moved_count += 1
+                    if not existing.created_at:
+                        created_at = datetime.fromtimestamp(st.st_ctime)
+                        logger.debug(f"Updating Video {video_id}, created_at={created_at}")
+                        existing.created_at = created_at
+                    if not existing.updated_at:
+                        updated_at = datetime.fromtimestamp(st.st_mtime)
+                        logger.debug(f"Updating Video {video_id}, updated_at={updated_at}")
+                        existing.updated_at = updated_at
+                else:
+                    new_video_ids.add(video_id)
+                    pending_new.append((vf, path, st, video_id, pool.submit(util.extract_date_from_file, vf)))
+
+            for vf, path, st, video_id, recorded_future in pending_new:
+                created_at = datetime.fromtimestamp(st.st_ctime)
+                updated_at = datetime.fromtimestamp(st.st_mtime)
+                recorded_at = recorded_future.result()
                 v = Video(video_id=video_id, extension=vf.suffix, path=path, available=True, created_at=created_at, updated_at=updated_at, recorded_at=recorded_at)
                 logger.info(f"Adding new Video {video_id} at {str(path)} (created {created_at.isoformat()}, updated {updated_at.isoformat()}, recorded {recorded_at.isoformat() if recorded_at else 'N/A'})")
                 new_videos.append(v)
-        
+        reconcile_started = time.perf_counter()
+
+        if skipped_count > 0:
+            logger.info(f"Skipped {skipped_count} transcoded video file(s)")
+        if moved_count:
+            logger.info(f"Updated the location of {moved_count} moved video(s)")
         if new_videos:
             db.session.add_all(new_videos)
         else:
-            logger.info(f"No new videos found, checked {len(video_files)} files.")
-        db.session.commit()
+            logger.info(f"No new videos found, checked {len(scanned_paths)} files.")
+        pruned = file_index.prune(root)
+        logger.info(f"File index: {file_index.summary()}, {pruned:,} stale entr{'y' if pruned == 1 else 'ies'} removed; {_hash_io_summary(io_before)}")
 
+        # New videos, their info rows and notifications are committed together: a
+        # video committed without its VideoInfo would never get one on a later scan
         fd = os.open(str(video_links.absolute()), os.O_DIRECTORY)
         for nv in new_videos:
             src = Path((paths["video"] / nv.path).absolute())
@@ -290,25 +506,10 @@ def scan_videos(root):
                     logger.info(f"{dst} exists already")
             info = VideoInfo(video_id=nv.video_id, title=Path(nv.path).stem, private=video_config["private"])
             db.session.add(info)
+        queued_notifications = notify.enqueue_new_videos([nv.video_id for nv in new_videos], config, domain)
+        if queued_notifications:
+            logger.info(f"Queued {queued_notifications} webhook notification(s)")
         db.session.commit()
-        if discord_webhook_url:
-            for nv in new_videos:
-                logger.info(f"Posting to Discord webhook")
-                video_url = get_public_watch_url(nv.video_id, config, domain)
-                send_discord_webhook(webhook_url=discord_webhook_url, video_url=video_url)
-        if generic_webhook_url:
-            for nv in new_videos:
-                logger.info(f"Posting to Generic webhook")
-                video_url = get_public_watch_url(nv.video_id, config, domain)
-                payload_str = json.dumps(generic_webhook_payload)
-                #Replaces plain text json [[video_url]] with the real video_url python var
-                processed_payload_str = payload_str.replace("[[video_url]]", video_url)
-                final_payload = json.loads(processed_payload_str)
-                send_generic_webhook(
-                    webhook_url=generic_webhook_url, 
-                    video_url=video_url, 
-                    custom_payload=final_payload
-                )
 
 
         # Auto-tag new videos based on folder rules
@@ -339,10 +540,11 @@ def scan_videos(root):
             videos_needing_detection = [nv for nv in new_videos if nv.video_id not in auto_tagged]
             logger.info(f"Running game detection for {len(videos_needing_detection)} new video(s)...")
             pending_suggestions = {}
+            game_matcher = util.get_game_matcher()
             for nv in videos_needing_detection:
                 filename = Path(nv.path).stem
                 logger.debug(f"[Game Detection] Video: {nv.video_id}, Path: {nv.path}, Filename: {filename}")
-                detected_game = util.detect_game_from_filename(filename, steamgriddb_api_key, path=nv.path)
+                detected_game = util.detect_game_from_filename(filename, steamgriddb_api_key, path=nv.path, matcher=game_matcher)
 
                 if detected_game:
                     logger.debug(f"[Game Detection] Result: {detected_game['game_name']} (confidence: {detected_game['confidence']:.2f}, source: {detected_game['source']})")
@@ -358,24 +560,38 @@ def scan_videos(root):
                 save_game_suggestions_batch(pending_suggestions)
                 logger.info(f"[Game Detection] Saved {len(pending_suggestions)} suggestion(s) in batch")
 
-        existing_videos = Video.query.filter_by(available=True).all()
-        logger.debug(f"Verifying {len(existing_videos):,} video files still exist...")
-        for ev in existing_videos:
-            file_path = Path((paths["video"] / ev.path).absolute())
-            logger.debug(f"Verifying video {ev.video_id} at {file_path} is available")
-            if not file_path.exists():
-                logger.warning(f"Video {ev.video_id} at {file_path} was not found")
-                db.session.query(Video).filter_by(video_id=ev.video_id).update({ "available": False})
+        # Reload in one query; the commits above expired the rows loaded before the walk
+        video_rows = Video.query.all()
+        logger.debug(f"Verifying {len(video_rows):,} video files still exist...")
+        _verify_availability(Video, 'video_id', video_rows, scanned_paths, videos_path, root,
+                             current_app.config['SCAN_IGNORE'], walk_errors)
         db.session.commit()
 
+        stats.update(
+            reconcile_seconds=time.perf_counter() - reconcile_started,
+            hash_seconds=sum(hash_times),
+            files_seen=len(scanned_paths),
+            files_hashed=len(hash_times),
+            files_skipped=skipped_count,
+            files_new=len(new_videos),
+        )
+
+        # Sent only now so slow webhooks can't hold up the scan; this also retries
+        # earlier notifications that are due again
+        notify.flush()
+        return stats
+
 @cli.command()
 @click.pass_context
 @click.option("--path", "-p", help="path to video to scan", required=False)
 @click.option("--tag-ids", help="comma-separated custom tag IDs to apply", required=False, default=None)
 @click.option("--game-id", type=int, help="game ID to apply", required=False, default=None)
 @click.option("--title", help="initial title for the video (defaults to filename stem)", required=False, default=None)
-def scan_video(ctx, path, tag_ids, game_id, title):
-    with create_app().app_context():
+@click.option("--background-transcode", is_flag=True, hidden=True, help="Start the auto-transcode in a separate process")
+def scan_video(ctx, path, tag_ids, game_id, title, background_transcode):
+    from fireshare import ingest
+
+    with _app_context():
         paths = current_app.config['PATHS']
         domain = current_app.config['DOMAIN']
         videos_path = paths["video"]
@@ -389,9 +605,6 @@ def scan_video(ctx, path, tag_ids, game_id, title):
         config_file = open(paths["data"] / "config.json")
         config = json.load(config_file)
         video_config = config["app_config"]["video_defaults"]
-        discord_webhook_url = config["integrations"]["discord_webhook_url"]
-        generic_webhook_url = config["integrations"]["generic_webhook_url"]
-        generic_webhook_payload = config["integrations"]["generic_webhook_payload"]
 
         config_file.close()
         
@@ -412,24 +625,30 @@ def scan_video(ctx, path, tag_ids, game_id, title):
                      and not TRANSCODE_PATTERN.search((videos_path / path).name)
                      and not (videos_path / path).name.startswith('._') else None)
         if video_file:
-            video_rows = Video.query.all()
             logger.info(f"Scanning {str(video_file)}")
 
             path = str(video_file.relative_to(videos_path)) 
-            video_id = util.video_id(video_file)
-            existing = next((vr for vr in video_rows if vr.video_id == video_id), None)
+            sparse_ids = _use_sparse_ids()
+            video_id = FileIdIndex('video', paths=[path]).content_id(video_file, path, lambda p: util.video_id(p, sparse=sparse_ids))
+            existing = Video.query.filter_by(video_id=video_id).first()
             if existing:
+                if existing.path != path and not (videos_path / existing.path).exists():
+                    logger.info(f"Video {video_id} moved from {existing.path} to {path}")
+                    existing.path = path
+                    _relink_source(video_links / (existing.video_id + existing.extension), video_file)
                 if not existing.available:
                     logger.debug(f"Updating Video {video_id}, available=True")
-                    db.session.query(Video).filter_by(video_id=existing.video_id).update({ "available": True })
+                    existing.available = True
                 if not existing.created_at:
                     created_at = datetime.fromtimestamp(os.path.getctime(f"{videos_path}/{path}"))
                     logger.debug(f"Updating Video {video_id}, created_at={created_at}")
-                    db.session.query(Video).filter_by(video_id=existing.video_id).update({ "created_at": created_at })
+                    existing.created_at = created_at
                 if not existing.updated_at:
                     updated_at = datetime.fromtimestamp(os.path.getmtime(f"{videos_path}/{path}"))
                     logger.debug(f"Updating Video {video_id}, updated_at={updated_at}")
-                    db.session.query(Video).filter_by(video_id=existing.video_id).update({ "updated_at": updated_at })
+                    existing.updated_at = updated_at
+                db.session.commit()
+                ingest.release_upload(paths['data'], video_file)
             else:
                 created_at = datetime.fromtimestamp(os.path.getctime(f"{videos_path}/{path}"))
                 updated_at = datetime.fromtimestamp(os.path.getmtime(f"{videos_path}/{path}"))
@@ -463,6 +682,8 @@ def scan_video(ctx, path, tag_ids, game_id, title):
                 if game_id and not VideoGameLink.query.filter_by(video_id=v.video_id).first():
                     db.session.add(VideoGameLink(video_id=v.video_id, game_id=game_id, created_at=datetime.utcnow()))
                     db.session.commit()
+                # The row now carries the upload's metadata, so the file watcher may scan it
+                ingest.release_upload(paths['data'], video_file)
 
                 # Check folder rules for auto-tagging
                 auto_tagged = False
@@ -516,37 +737,29 @@ def scan_video(ctx, path, tag_ids, game_id, title):
                         if not boomerang_path.exists():
                             util.create_boomerang_preview(video_path, boomerang_path)
 
-                    if discord_webhook_url:
-                        logger.info(f"Posting to Discord webhook")
-                        video_url = get_public_watch_url(video_id, config, domain)
-                        send_discord_webhook(webhook_url=discord_webhook_url, video_url=video_url)
-                    
-                    if generic_webhook_url:
-                        logger.info(f"Posting to Generic webhook")
-                        video_url = get_public_watch_url(video_id, config, domain)
-                        payload_str = json.dumps(generic_webhook_payload)
-                        #Replaces plain text json [[video_url]] with the real video_url python var
-                        processed_payload_str = payload_str.replace("[[video_url]]", video_url)
-                        final_payload = json.loads(processed_payload_str)
-                        send_generic_webhook(
-                            webhook_url=generic_webhook_url, 
-                            video_url=video_url, 
-                            custom_payload=final_payload
-                        )
+                    if notify.enqueue_new_videos([video_id], config, domain):
+                        db.session.commit()
+                        notify.flush()
 
                     if current_app.config.get('ENABLE_TRANSCODING'):
                         auto_transcode = config.get('transcoding', {}).get('auto_transcode', True)
                         if auto_transcode:
                             logger.info(f"Auto-transcoding uploaded video {video_id}")
-                            ctx.invoke(transcode_videos, video=video_id)
+                            # Uploads go ahead of any library backlog already queued
+                            plan_transcodes([video_id], TRANSCODE_PRIORITY_UPLOAD)
+                            if background_transcode:
+                                _spawn_transcode(paths['data'])
+                            else:
+                                ctx.invoke(transcode_videos, queued=True)
                 else:
                     logger.warning(f"Skipping creation of poster for video {info.video_id} because the video at {str(video_path)} does not exist or is not accessible")
         else:
             logger.info(f"Invalid video file, unable to scan: {str(videos_path / path)}")
+            ingest.release_upload(paths['data'], videos_path / path)
 
 @cli.command()
 def repair_symlinks():
-    with create_app().app_context():
+    with _app_context():
         paths = current_app.config['PATHS']
         video_links = paths["processed"] / "video_links"
 
@@ -569,61 +782,200 @@ def repair_symlinks():
                 except FileExistsError:
                     logger.info(f"{dst} exists already")
 
+def _rekey_derived(derived_root, old_id, new_id):
+    """Move derived/<old_id> to derived/<new_id>, renaming files inside that embed the id."""
+    old_dir = derived_root / old_id
+    if not old_dir.is_dir():
+        return
+    new_dir = derived_root / new_id
+    if new_dir.exists():
+        logger.warning(f"Not moving {old_dir}: {new_dir} already exists")
+        return
+    os.rename(old_dir, new_dir)
+    for f in new_dir.iterdir():
+        if old_id in f.name:
+            f.rename(new_dir / f.name.replace(old_id, new_id))
+
+def _rekey_kind(kind, model, id_attr, related, media_root, links_dir, hasher, dry_run):
+    """Recompute the content id of every row of one media kind and move it to the new id."""
+    derived_root = current_app.config['PATHS']['processed'] / "derived"
+    rows = model.query.all()
+    taken = {getattr(r, id_attr) for r in rows}
+    mapping = {}
+    unchanged = unreadable = collisions = 0
+    for row in rows:
+        old_id = getattr(row, id_attr)
+        try:
+            new_id = hasher(media_root / row.path)
+        except OSError as e:
+            logger.warning(f"Keeping {kind} {old_id}: could not read {media_root / row.path} ({e})")
+            unreadable += 1
+            continue
+        if new_id == old_id:
+            unchanged += 1
+        elif new_id in taken:
+            logger.warning(f"Keeping {kind} {old_id}: its new id {new_id} is already in use")
+            collisions += 1
+        else:
+            taken.discard(old_id)
+            taken.add(new_id)
+            mapping[old_id] = (new_id, row.extension)
+
+    logger.info(f"{kind.capitalize()}s: {len(mapping):,} to re-key, {unchanged:,} unchanged, "
+                f"{unreadable:,} unreadable, {collisions:,} collision(s)")
+    if dry_run:
+        return mapping
+
+    for n, (old_id, (new_id, extension)) in enumerate(mapping.items(), 1):
+        _rekey_derived(derived_root, old_id, new_id)
+        old_link = links_dir / (old_id + extension)
+        if os.path.lexists(old_link):
+            os.rename(old_link, links_dir / (new_id + extension))
+        for m in [model] + related:
+            m.query.filter(getattr(m, id_attr) == old_id).update({id_attr: new_id}, synchronize_session=False)
+        db.session.commit()
+        if n % 500 == 0:
+            logger.info(f"Re-keyed {n:,}/{len(mapping):,} {kind}(s)")
+
+    # Index entries for duplicates and colliding files can't be mapped reliably;
+    # the next scan rehashes them with the new scheme.
+    FileIndex.query.filter_by(kind=kind).delete(synchronize_session=False)
+    db.session.commit()
+    return mapping
+
+@cli.command()
+@click.option("--mode", type=click.Choice(util.CONTENT_ID_MODES), default=None, help="Id scheme to convert to (default: FS_CONTENT_ID)")
+@click.option("--dry-run", is_flag=True, help="Only report what would change")
+@click.option("--yes", "-y", is_flag=True, help="Do not ask for confirmation")
+def rekey_content_ids(mode, dry_run, yes):
+    """
+    Convert the library to another content id scheme.
+
+    Database rows, derived/ folders and video_links/image_links symlinks are
+    moved to the new ids so nothing is re-transcoded. Links shared with the
+    old ids stop working.
+    """
+    from fireshare.models import VideoView, ImageView, MediaProbe
+    from fireshare.watcher import LOCK_FILE as WATCH_LOCK_FILE
+    with _app_context():
+        paths = current_app.config['PATHS']
+        mode = mode or current_app.config['CONTENT_ID_MODE']
+        active = util.read_content_id_mode(paths['data'])
+        logger.info(f"Re-keying library from '{active}' to '{mode}' content ids{' (dry run)' if dry_run else ''}")
+        if any(util.lock_exists(paths['data'], lock) for lock in ("fireshare.lock", "fireshare_transcode.lock", WATCH_LOCK_FILE)):
+            logger.info("A scan, transcode or file watcher is currently running... Aborting.")
+            return
+        if not dry_run and not yes:
+            click.confirm("Existing share links will stop working. Continue?", abort=True)
+
+        util.create_lock(paths['data'])
+        try:
+            sparse = mode == 'sparse'
+            video_mapping = _rekey_kind(
+                'video', Video, 'video_id',
+                [VideoInfo, VideoGameLink, VideoTagLink, VideoView, TranscodeJob, MediaProbe, MetadataRetry, GameSuggestion, CorruptVideo],
+                paths['video'], paths['processed'] / "video_links",
+                lambda p: util.video_id(p, sparse=sparse), dry_run)
+            image_directory = current_app.config.get('IMAGE_DIRECTORY')
+            if image_directory and Path(image_directory).is_dir():
+                _rekey_kind(
+                    'image', Image, 'image_id',
+                    [ImageInfo, ImageGameLink, ImageTagLink, ImageView],
+                    Path(image_directory), paths['processed'] / "image_links",
+                    lambda p: util.image_id(p, sparse=sparse), dry_run)
+            if dry_run:
+                return
+
+            renamed = {old_id: new_id for old_id, (new_id, _) in video_mapping.items()}
+            for row in GameSuggestion.query.filter(GameSuggestion.folder_path.isnot(None)):
+                video_ids = json.loads(row.video_ids or "[]")
+                if any(vid in renamed for vid in video_ids):
+                    row.video_ids = json.dumps([renamed.get(vid, vid) for vid in video_ids])
+            db.session.commit()
+
+            util.write_content_id_mode(paths['data'], mode)
+            logger.info(f"Library is now keyed with '{mode}' content ids")
+        finally:
+            util.remove_lock(paths['data'])
+
 @cli.command()
 @click.option("--video", "-v", help="The video to sync metadata from", default=None)
 def sync_metadata(video):
-    with create_app().app_context():
+    with _app_context():
         paths = current_app.config['PATHS']
         videos = VideoInfo.query.filter(VideoInfo.video_id==video).all() if video else VideoInfo.query.filter(VideoInfo.info==None).all()
         logger.info(f'Found {len(videos):,} videos without metadata')
+
+        # Unreadable files are parked with a backoff instead of blocking the batch.
+        # A parked file is retried early if it has changed since the last attempt.
+        now = datetime.utcnow()
+        retries = {r.video_id: r for r in MetadataRetry.query.filter(
+            MetadataRetry.video_id.in_([v.video_id for v in videos])).all()} if videos else {}
+        pending = []
+        deferred = 0
         for v in videos:
             vpath = paths["processed"] / "video_links" / str(v.video_id + v.video.extension)
-            if Path(vpath).is_file():
-                info = None
-                while info == None:
-                    info = util.get_media_info(vpath)
+            if not Path(vpath).is_file():
+                logger.warning(f"Missing or invalid symlink at {vpath} to video {v.video_id} (original location: {v.video.path})")
+                continue
+            retry = retries.get(v.video_id)
+            if retry and not video and retry.next_attempt_at > now and _stat_signature(vpath) == (retry.size, retry.mtime_ns):
+                deferred += 1
+                continue
+            pending.append((v, vpath))
+        if deferred:
+            logger.info(f"Deferring {deferred:,} video(s) that could not be read recently")
+
+        corruptVideoWarning = "There may be a corrupt video in your video Directory. See your logs for more info!"
+        failed = 0
+        with ThreadPoolExecutor(max_workers=current_app.config['SCAN_WORKERS']) as pool:
+            for start in range(0, len(pending), _METADATA_BATCH_SIZE):
+                batch = pending[start:start + _METADATA_BATCH_SIZE]
+                # Probe the batch in parallel; results land in util's probe memo and are
+                # read back below on this thread, which also persists them to the DB.
+                # The prefetch is the lookup that counts in the cache stats, not the re-read.
+                list(pool.map(lambda item: util.probe_media(item[1]), batch))
+                for v, vpath in batch:
+                    info = util.get_media_info(vpath, count=False)
                     if info == None:
-                        corruptVideoWarning = "There may be a corrupt video in your video Directory. See your logs for more info!"
-                        if not corruptVideoWarning in current_app.config['WARNINGS']:
-                            current_app.config['WARNINGS'].append(corruptVideoWarning)
-                        logger.warning(f"[{v.video.path}] - There may be a corrupt file in your video directory. Or, you may be recording to the video directory and haven't finished yet.")
-                        logger.warning(f"For more info and to find the offending file, run this command in your container: \"stat {vpath}\"")
-                        logger.warning("I'll try to process this file again in 60 seconds...")
-                        time.sleep(60)
-                
-                corruptVideoWarning = "There may be a corrupt video in your video Directory. See your logs for more info!"
-                if corruptVideoWarning in current_app.config['WARNINGS']:
-                    position = current_app.config['WARNINGS'].index(corruptVideoWarning)
-                    current_app.config['WARNINGS'].pop(position)
-
-                video_codecs = [i for i in info if i['codec_type'] == 'video']
-                if not video_codecs:
-                    logger.warning(f"No video stream found in {v.video.path} (video_id={v.video_id}). Skipping metadata sync.")
-                    mark_video_corrupt(v.video_id)
-                    continue
-                vcodec = video_codecs[0]
-                duration = 0
-                if 'duration' in vcodec:
-                    duration = float(vcodec['duration'])
-                elif 'tags' in vcodec:
-                    if 'DURATION' in vcodec['tags']:
-                        duration = util.dur_string_to_seconds(vcodec['tags']['DURATION'])
-                    else:
-                        duration = 0
-                width, height = int(vcodec['width']), int(vcodec['height'])
-                logger.debug(f'Scanned {v.video_id} duration={duration}s, resolution={width}x{height}: {v.video.path}')
-                v.info = json.dumps(info)
-                v.duration = duration
-                v.width = width
-                v.height = height
-                db.session.add(v)
+                        failed += 1
+                        _defer_metadata(v, vpath, retries)
+                        continue
+                    retry = retries.pop(v.video_id, None)
+                    if retry:
+                        db.session.delete(retry)
+
+                    video_codecs = [i for i in info if i['codec_type'] == 'video']
+                    if not video_codecs:
+                        logger.warning(f"No video stream found in {v.video.path} (video_id={v.video_id}). Skipping metadata sync.")
+                        mark_video_corrupt(v.video_id, "No video stream found", vpath)
+                        continue
+                    vcodec = video_codecs[0]
+                    duration = 0
+                    if 'duration' in vcodec:
+                        duration = float(vcodec['duration'])
+                    elif 'tags' in vcodec:
+                        if 'DURATION' in vcodec['tags']:
+                            duration = util.dur_string_to_seconds(vcodec['tags']['DURATION'])
+                        else:
+                            duration = 0
+                    width, height = int(vcodec['width']), int(vcodec['height'])
+                    logger.debug(f'Scanned {v.video_id} duration={duration}s, resolution={width}x{height}: {v.video.path}')
+                    v.info = json.dumps(info)
+                    v.duration = duration
+                    v.width = width
+                    v.height = height
                 db.session.commit()
-            else:
-                logger.warning(f"Missing or invalid symlink at {vpath} to video {v.video_id} (original location: {v.video.path})")
+
+        if failed:
+            if not corruptVideoWarning in current_app.config['WARNINGS']:
+                current_app.config['WARNINGS'].append(corruptVideoWarning)
+        elif corruptVideoWarning in current_app.config['WARNINGS']:
+            current_app.config['WARNINGS'].remove(corruptVideoWarning)
 
 @cli.command()
 def create_web_videos():
-    with create_app().app_context():
+    with _app_context():
         paths = current_app.config['PATHS']
         video_links = paths["processed"] / "video_links"
         videos = Video.query.filter(func.lower(Video.extension)=='.mkv').all()
@@ -634,9 +986,11 @@ def create_web_videos():
                 logger.info(f"Found mkv video to process {v.video_id}: {v.path}")
                 out_mp4_fn = paths["processed"] / "derived" / v.video_id / f"{v.video_id}-1.mp4"
                 if not out_mp4_fn.exists():
-                    # TODO check video codec and if it's h264 already, just do a simple ffmpeg -i input.mkv -c copy output.mp4
-                    # Otherwise, transcode it
-                    util.transcode_video(vpath, out_mp4_fn)
+                    # H.264 only needs copying into an mp4; anything else is transcoded
+                    streams = util.get_media_info(vpath) or []
+                    out_mp4_fn.parent.mkdir(parents=True, exist_ok=True)
+                    if not (util.can_remux(streams) and util.remux_video(vpath, out_mp4_fn, util.can_copy_audio(streams))):
+                        util.transcode_video(vpath, out_mp4_fn)
 
                     dst = Path(paths["processed"] / "video_links" / f"{v.video_id}-1.mp4")
                     common_root = Path(*os.path.commonprefix([out_mp4_fn.parts, dst.parts]))
@@ -660,7 +1014,7 @@ def create_web_videos():
 @click.option("--regenerate", "-r", help="Overwrite existing posters", is_flag=True)
 @click.option("--skip", "-s", help="Amount to skip into the video before extracting a poster image, as a %, e.g. 0.05 for 5%", type=float, default=0)
 def create_posters(regenerate, skip):
-    with create_app().app_context():
+    with _app_context():
         processed_root = Path(current_app.config['PROCESSED_DIRECTORY'])
         vinfos = VideoInfo.query.all()
         logger.debug(f"Checking for videos with missing posters...")
@@ -670,6 +1024,10 @@ def create_posters(regenerate, skip):
             if not video_path.exists():
                 logger.warning(f"Skipping creation of poster for video {vi.video_id} because the video at {str(video_path)} does not exist or is not accessible")
                 continue
+            if vi.duration is None:
+                # Metadata has not been read yet (e.g. still recording); retried on a later scan
+                logger.debug(f"Skipping creation of poster for video {vi.video_id} until its metadata has been synced")
+                continue
             poster_path = Path(derived_path, "poster.jpg")
             should_create_poster = (not poster_path.exists() or regenerate)
             if should_create_poster:
@@ -683,7 +1041,7 @@ def create_posters(regenerate, skip):
 @cli.command()
 @click.option("--regenerate", "-r", help="Overwrite existing posters", is_flag=True)
 def create_boomerang_posters(regenerate):
-    with create_app().app_context():
+    with _app_context():
         processed_root = Path(current_app.config['PROCESSED_DIRECTORY'])
         vinfos = (
             VideoInfo.query
@@ -706,15 +1064,248 @@ def create_boomerang_posters(regenerate):
             else:
                 logger.debug(f"Skipping creation of boomerang poster for video {vi.video_id} because it already exists")
 
+TRANSCODE_LOCK = "fireshare_transcode.lock"
+
+# TranscodeJob priorities; higher runs first
+TRANSCODE_PRIORITY_BACKLOG = 0
+TRANSCODE_PRIORITY_MANUAL = 50
+TRANSCODE_PRIORITY_UPLOAD = 100
+
+def _transcoding_settings(data_path):
+    """The transcoding section of config.json."""
+    config_path = data_path / 'config.json'
+    if config_path.exists():
+        with open(config_path, 'r') as f:
+            return json.load(f).get('transcoding', {})
+    return {}
+
+def _enabled_resolutions(transcoding_config):
+    """Enabled rendition heights, highest to lowest."""
+    return [height for height in (1080, 720, 480) if transcoding_config.get(f'enable_{height}p', True)]
+
+def plan_transcodes(video_ids=None, priority=TRANSCODE_PRIORITY_BACKLOG, regenerate=False, include_corrupt=False):
+    """
+    Queue a TranscodeJob row for every missing rendition of video_ids, or of the
+    whole library when None, and return the number of rows queued. Renditions
+    that are already queued are only raised to priority. Library-wide planning
+    trusts the has_*p flags and only checks the disk for renditions that are not
+    flagged yet, instead of statting every derived file.
+
+    A rendition whose source is already web-compatible H.264 at (or just above)
+    its height is queued as a 'remux', a stream copy that takes seconds, instead
+    of a 'transcode'; the decision uses the probe data stored in VideoInfo.info.
+    """
+    paths = current_app.config['PATHS']
+    processed_root = Path(current_app.config['PROCESSED_DIRECTORY'])
+    resolutions = _enabled_resolutions(_transcoding_settings(paths['data']))
+    single = video_ids is not None and len(video_ids) == 1
+
+    query = VideoInfo.query
+    if video_ids is not None:
+        query = query.filter(VideoInfo.video_id.in_(video_ids))
+    elif not regenerate:
+        # Only videos with an unflagged rendition their source is tall enough for
+        query = query.filter(or_(*[
+            and_(or_(VideoInfo.height == None, VideoInfo.height <= 0, VideoInfo.height > height),
+                 or_(getattr(VideoInfo, f'has_{height}p') == None, getattr(VideoInfo, f'has_{height}p') == False))
+            for height in resolutions
+        ] or [False]))
+    vinfos = query.all()
+
+    # Filter out corrupt videos unless explicitly included
+    corrupt_videos = get_corrupt_video_ids({
+        vi.video_id: Path(processed_root, "video_links", vi.video_id + vi.video.extension) for vi in vinfos
+    })
+    if not include_corrupt and video_ids is None:
+        original_count = len(vinfos)
+        vinfos = [vi for vi in vinfos if vi.video_id not in corrupt_videos]
+        skipped_count = original_count - len(vinfos)
+        if skipped_count > 0:
+            logger.info(f"Skipping {skipped_count} video(s) previously marked as corrupt. Use --include-corrupt to retry them.")
+
+    queued = {}
+    for job in TranscodeJob.query.filter(TranscodeJob.kind.in_(['transcode', 'remux']), TranscodeJob.status.in_(['pending', 'running'])):
+        queued[(job.video_id, job.height)] = job
+
+    # Also reconcile has_* flags if outputs already exist on disk.
+    new_jobs = []
+    raised = 0
+    skipped_missing_source = 0
+    skipped_missing_metadata = 0
+    skipped_source_too_small = 0
+    skipped_existing_output = 0
+    reconciled_flag_updates = 0
+    reconciled_videos = set()
+    for vi in vinfos:
+        video_path = Path(processed_root, "video_links", vi.video_id + vi.video.extension)
+        if not video_path.exists():
+            skipped_missing_source += 1
+            if single:
+                logger.warning(f"Skipping video {vi.video_id}: source file not found at {video_path}")
+            continue
+        if vi.info is None:
+            # Not readable yet (sync_metadata parks it for a retry); don't mark it corrupt
+            skipped_missing_metadata += 1
+            if single:
+                logger.warning(f"Skipping video {vi.video_id}: metadata has not been synced yet")
+            continue
+        derived_path = Path(processed_root, "derived", vi.video_id)
+        original_height = vi.height or 0
+        streams = json.loads(vi.info)
+        for height in resolutions:
+            if original_height > 0 and original_height <= height:
+                skipped_source_too_small += 1
+                if single:
+                    logger.debug(
+                        f"Skipping {vi.video_id} {height}p: source height ({original_height}p) "
+                        f"is not greater than target"
+                    )
+                continue
+            has_attr = f'has_{height}p'
+            if not regenerate:
+                if getattr(vi, has_attr, False) is True and video_ids is None:
+                    skipped_existing_output += 1
+                    continue
+                transcode_path = derived_path / f"{vi.video_id}-{height}p.mp4"
+                if transcode_path.exists():
+                    if getattr(vi, has_attr, False) is not True:
+                        setattr(vi, has_attr, True)
+                        reconciled_flag_updates += 1
+                        reconciled_videos.add(vi.video_id)
+                        if single:
+                            logger.debug(f"Detected existing {height}p output on disk; updating {has_attr}=True for {vi.video_id}")
+                    skipped_existing_output += 1
+                    if single:
+                        logger.debug(f"Skipping {vi.video_id} {height}p: output already exists at {transcode_path}")
+                    continue
+
+            existing = queued.get((vi.video_id, height))
+            if existing is not None:
+                if existing.status == 'pending' and existing.priority < priority:
+                    existing.priority = priority
+                    raised += 1
+                continue
+            kind = 'remux' if util.can_remux(streams, height) else 'transcode'
+            job = TranscodeJob(video_id=vi.video_id, height=height, kind=kind, priority=priority, task_count=1)
+            queued[(vi.video_id, height)] = job
+            new_jobs.append(job)
+
+    db.session.add_all(new_jobs)
+    db.session.commit()
+    if reconciled_flag_updates > 0:
+        logger.info(
+            f"Reconciled transcode flags from disk for {len(reconciled_videos)} video(s), "
+            f"updated {reconciled_flag_updates} flag value(s)."
+        )
+    if new_jobs or raised:
+        logger.info(f"Queued {len(new_jobs):,} rendition(s) for transcoding (priority {priority})"
+                    + (f", raised {raised:,} already queued" if raised else ""))
+    elif single:
+        vi = vinfos[0] if vinfos else None
+        logger.info(
+            f"Single-video planner summary for {video_ids[0]}: "
+            f"found_video_info={bool(vi)}, source_height={vi.height if vi else None}, "
+            f"enabled_targets={','.join(f'{h}p' for h in resolutions) if resolutions else 'none'}, "
+            f"regenerate={regenerate}, include_corrupt={include_corrupt}"
+        )
+        logger.info(
+            "Single-video planner breakdown: "
+            f"missing_source={skipped_missing_source}, "
+            f"missing_metadata={skipped_missing_metadata}, "
+            f"source_too_small={skipped_source_too_small}, "
+            f"already_exists={skipped_existing_output}"
+        )
+    return len(new_jobs)
+
+def claim_transcode_jobs(group=True):
+    """
+    Claim the highest-priority pending TranscodeJob and return the claimed rows:
+    a 'plan' or 'remux' row on its own, or a rendition together with (when group
+    is set) every other pending rendition of the same video, so they share one encode.
+    Returns [] when the queue is empty.
+    """
+    while True:
+        job = (TranscodeJob.query.filter_by(status='pending')
+               .order_by(TranscodeJob.priority.desc(), TranscodeJob.id).first())
+        if job is None:
+            return []
+        claim = TranscodeJob.id == job.id
+        if group and job.kind == 'transcode':
+            claim = or_(claim, and_(TranscodeJob.video_id == job.video_id, TranscodeJob.kind == 'transcode'))
+        # The claim timestamp identifies the rows this call won if another consumer raced us
+        claimed_at = datetime.utcnow()
+        result = db.session.execute(
+            update(TranscodeJob)
+            .where(and_(claim, TranscodeJob.status == 'pending'))
+            .values(status='running', started_at=claimed_at)
+        )
+        db.session.commit()
+        if result.rowcount:
+            return (TranscodeJob.query.filter(claim, TranscodeJob.status == 'running', TranscodeJob.started_at == claimed_at)
+                    .order_by(TranscodeJob.height.desc()).all())
+
+def _finish_transcode_jobs(ids, status):
+    TranscodeJob.query.filter(TranscodeJob.id.in_(ids)).update(
+        {'status': status, 'completed_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+
+class _TranscodeProgress:
+    """
+    Folds the progress of concurrently running transcode jobs into the single
+    status file the admin UI polls: the titles being encoded, their average
+    percent and the longest remaining ETA. current and total count the running
+    renditions; finished and queued ones are counted from the TranscodeJob table.
+    """
+
+    def __init__(self, data_path):
+        self._data_path = data_path
+        self._running = {}
+        self._lock = threading.Lock()
+        self._last_write = 0
+
+    def start(self, idx, title, resolution, renditions):
+        with self._lock:
+            self._running[idx] = {'title': title, 'resolution': resolution, 'renditions': renditions,
+                                  'percent': None, 'eta_seconds': None}
+            self._write()
+
+    def update(self, idx, percent, eta_seconds):
+        with self._lock:
+            if idx in self._running:
+                self._running[idx].update(percent=percent, eta_seconds=eta_seconds)
+            if time.time() - self._last_write >= 0.5:
+                self._write()
+
+    def finish(self, idx):
+        with self._lock:
+            self._running.pop(idx, None)
+            self._write()
+
+    def _write(self):
+        running = list(self._running.values())
+        title, resolution = None, None
+        if running:
+            title = running[0]['title']
+            if len(running) > 1:
+                title = f"{title} (+{len(running) - 1} more)"
+            resolution = running[0]['resolution'] if len(running) == 1 else f"{len(running)} jobs"
+        renditions = sum(r['renditions'] for r in running)
+        percents = [r['percent'] for r in running if r['percent'] is not None]
+        etas = [r['eta_seconds'] for r in running if r['eta_seconds'] is not None]
+        util.write_transcoding_status(
+            self._data_path, renditions, renditions, title,
+            percent=sum(percents) / len(percents) if percents else None,
+            eta_seconds=max(etas) if etas else None, resolution=resolution)
+        self._last_write = time.time()
+
 @cli.command()
 @click.option("--regenerate", "-r", help="Overwrite existing transcoded videos", is_flag=True)
 @click.option("--video", "-v", help="Transcode a specific video by id", default=None)
 @click.option("--include-corrupt", help="Include videos previously marked as corrupt", is_flag=True)
-def transcode_videos(regenerate, video, include_corrupt):
+@click.option("--queued", help="Only work through the transcode queue, without planning new work", is_flag=True)
+def transcode_videos(regenerate, video, include_corrupt, queued):
     """Transcode videos to enabled resolution variants (1080p, 720p, 480p)"""
 
-    _TRANSCODE_LOCK = "fireshare_transcode.lock"
-
     # Store data_path for signal handler access
     _transcode_state = {'data_path': None}
 
@@ -722,12 +1313,14 @@ def transcode_videos(regenerate, video, include_corrupt):
         logger.info("Transcoding cancelled by user")
         if _transcode_state['data_path']:
             util.clear_transcoding_status(_transcode_state['data_path'])
-            util.remove_lock(_transcode_state['data_path'], _TRANSCODE_LOCK)
-        sys.exit(0)
+            util.remove_lock(_transcode_state['data_path'], TRANSCODE_LOCK)
+        # Exit without waiting for the job threads: their ffmpeg was killed with
+        # us and they would otherwise retry it with the next encoder
+        os._exit(0)
 
     signal.signal(signal.SIGTERM, handle_cancel)
 
-    with create_app().app_context():
+    with _app_context():
         if not current_app.config.get('ENABLE_TRANSCODING'):
             logger.info("Transcoding is disabled. Set ENABLE_TRANSCODING=true to enable.")
             return
@@ -735,126 +1328,38 @@ def transcode_videos(regenerate, video, include_corrupt):
         paths = current_app.config['PATHS']
         _transcode_state['data_path'] = paths['data']
 
-        if util.lock_exists(paths['data'], _TRANSCODE_LOCK):
-            logger.info("A transcode process is already running. Aborting.")
+        if not queued:
+            plan_transcodes([video] if video else None,
+                            TRANSCODE_PRIORITY_MANUAL if video else TRANSCODE_PRIORITY_BACKLOG,
+                            regenerate, include_corrupt)
+
+        if util.lock_exists(paths['data'], TRANSCODE_LOCK):
+            logger.info("A transcode process is already running, it will pick up the queued work.")
             return
-        util.create_lock(paths['data'], _TRANSCODE_LOCK)
+        util.create_lock(paths['data'], TRANSCODE_LOCK)
         try:
             processed_root = Path(current_app.config['PROCESSED_DIRECTORY'])
             use_gpu = current_app.config.get('TRANSCODE_GPU', False)
             base_timeout = current_app.config.get('TRANSCODE_TIMEOUT', 7200)
-
-            # Read transcoding settings from config
-            config_path = paths['data'] / 'config.json'
-            transcoding_config = {}
-            if config_path.exists():
-                with open(config_path, 'r') as f:
-                    config = json.load(f)
-                    transcoding_config = config.get('transcoding', {})
-
-            encoder_preference = transcoding_config.get('encoder_preference', 'auto')
-
-            # Build list of enabled resolutions (highest to lowest)
-            resolutions = []
-            if transcoding_config.get('enable_1080p', True):
-                resolutions.append(1080)
-            if transcoding_config.get('enable_720p', True):
-                resolutions.append(720)
-            if transcoding_config.get('enable_480p', True):
-                resolutions.append(480)
-
-            # Get videos to transcode
-            vinfos = VideoInfo.query.filter(VideoInfo.video_id==video).all() if video else VideoInfo.query.all()
-
-            # Filter out corrupt videos unless explicitly included
-            corrupt_videos = set(get_all_corrupt_videos())
-            if not include_corrupt and not video:
-                original_count = len(vinfos)
-                vinfos = [vi for vi in vinfos if vi.video_id not in corrupt_videos]
-                skipped_count = original_count - len(vinfos)
-                if skipped_count > 0:
-                    logger.info(f"Skipping {skipped_count} video(s) previously marked as corrupt. Use --include-corrupt to retry them.")
-
-            # Build work queue: list of (video_info, height) tuples that actually need transcoding
-            # Also reconcile has_* flags if outputs already exist on disk.
-            work_items = []
-            skipped_missing_source = 0
-            skipped_source_too_small = 0
-            skipped_existing_output = 0
-            reconciled_flag_updates = 0
-            reconciled_videos = set()
-            for vi in vinfos:
-                video_path = Path(processed_root, "video_links", vi.video_id + vi.video.extension)
-                if not video_path.exists():
-                    skipped_missing_source += 1
-                    if video:
-                        logger.warning(f"Skipping video {vi.video_id}: source file not found at {video_path}")
-                    continue
-                derived_path = Path(processed_root, "derived", vi.video_id)
-                original_height = vi.height or 0
-                for height in resolutions:
-                    if original_height > 0 and original_height <= height:
-                        skipped_source_too_small += 1
-                        if video:
-                            logger.debug(
-                                f"Skipping {vi.video_id} {height}p: source height ({original_height}p) "
-                                f"is not greater than target"
-                            )
-                        continue
-                    transcode_path = derived_path / f"{vi.video_id}-{height}p.mp4"
-                    has_attr = f'has_{height}p'
-                    output_exists = transcode_path.exists()
-
-                    if output_exists and getattr(vi, has_attr, False) is not True:
-                        setattr(vi, has_attr, True)
-                        reconciled_flag_updates += 1
-                        reconciled_videos.add(vi.video_id)
-                        if video:
-                            logger.debug(f"Detected existing {height}p output on disk; updating {has_attr}=True for {vi.video_id}")
-
-                    if output_exists and not regenerate:
-                        skipped_existing_output += 1
-                        if video:
-                            logger.debug(f"Skipping {vi.video_id} {height}p: output already exists at {transcode_path}")
-                        continue
-
-                    work_items.append((vi, height, video_path, derived_path, transcode_path))
-
-            if reconciled_flag_updates > 0:
-                db.session.commit()
-                logger.info(
-                    f"Reconciled transcode flags from disk for {len(reconciled_videos)} video(s), "
-                    f"updated {reconciled_flag_updates} flag value(s)."
-                )
-
-            total_jobs = len(work_items)
-            logger.info(f'Processing {total_jobs:,} transcode job(s) (GPU: {use_gpu}, Encoder: {encoder_preference})')
+            ladder = current_app.config.get('TRANSCODE_LADDER', True)
+            concurrency = util.transcode_concurrency(current_app.config.get('TRANSCODE_CONCURRENCY', 0), use_gpu)
+            threads = util.transcode_threads(concurrency)
+            segment_seconds = current_app.config.get('TRANSCODE_SEGMENT_SECONDS', 0)
+            encoder_preference = _transcoding_settings(paths['data']).get('encoder_preference', 'auto')
+
+            pending = TranscodeJob.query.filter_by(status='pending').count()
+            if pending == 0:
+                logger.info("No videos need transcoding")
+                return
+            logger.info(f'Processing {pending:,} queued transcode job(s) (GPU: {use_gpu}, Encoder: {encoder_preference}, '
+                        f'Concurrency: {concurrency}, Threads per job: {threads or "auto"})')
 
             # Claim ownership of the status file immediately so the SSE poller has a
             # stable is_running=True signal to detect regardless of how we were invoked
             # (upload auto-transcode, bulk-import, or manual queue).  We overwrite any
-            # earlier placeholder written by _launch_scan_video or bulk_import so that
+            # earlier placeholder written by _spawn_transcode or bulk_import so that
             # our own PID is authoritative for the duration of this function.
-            util.write_transcoding_status(paths['data'], 0, total_jobs, pid=os.getpid())
-
-            if total_jobs == 0:
-                if video:
-                    vi = vinfos[0] if vinfos else None
-                    logger.info(
-                        f"Single-video planner summary for {video}: "
-                        f"found_video_info={bool(vi)}, source_height={vi.height if vi else None}, "
-                        f"enabled_targets={','.join(f'{h}p' for h in resolutions) if resolutions else 'none'}, "
-                        f"regenerate={regenerate}, include_corrupt={include_corrupt}"
-                    )
-                    logger.info(
-                        "Single-video planner breakdown: "
-                        f"missing_source={skipped_missing_source}, "
-                        f"source_too_small={skipped_source_too_small}, "
-                        f"already_exists={skipped_existing_output}"
-                    )
-                logger.info("No videos need transcoding")
-                util.clear_transcoding_status(paths['data'])
-                return
+            util.write_transcoding_status(paths['data'], 0, 0, pid=os.getpid())
 
             # Remove any leftover *.mp4.tmp files from a previous run that crashed
             # before the temp file could be renamed to its final location.
@@ -869,48 +1374,192 @@ def transcode_videos(regenerate, video, include_corrupt):
 
             # Track corrupt videos to skip remaining heights for that video
             corrupt_video_ids = set()
-
-            for idx, (vi, height, video_path, derived_path, transcode_path) in enumerate(work_items, 1):
+            # Videos marked corrupt, loaded once so a successful encode does not query for its mark
+            marked_corrupt = set(get_all_corrupt_videos())
+            progress = _TranscodeProgress(paths['data'])
+
+            def run_job(idx, video_id, title, source, heights, video_path, derived_path, kind, copy_audio):
+                """Encode one claimed video; runs on a pool thread, so it leaves the database alone."""
+                resolution = '/'.join(f"{height}p" for height in heights)
+                targets = [(height, derived_path / f"{video_id}-{height}p.mp4") for height in heights]
+                if kind == 'remux':
+                    # A stream copy is over in seconds, so it does not wait for an encode slot
+                    derived_path.mkdir(parents=True, exist_ok=True)
+                    logger.info(f"Remuxing {video_id} as {resolution} ({source})")
+                    success = util.remux_video(video_path, targets[0][1], copy_audio)
+                    return resolution, targets, success, None if success else 'remux'
+                # The slot caps encodes across this and every other process
+                with util.transcode_slot(paths['data'], concurrency):
+                    progress.start(idx, title, resolution, len(heights))
+                    try:
+                        derived_path.mkdir(parents=True, exist_ok=True)
+                        logger.info(f"Transcoding {video_id} to {resolution} ({source})")
+                        success, failure_reason = util.transcode_video_ladder(
+                            video_path, targets, use_gpu, None, encoder_preference, threads=threads,
+                            on_progress=lambda percent, eta_seconds: progress.update(idx, percent, eta_seconds),
+                            copy_audio=copy_audio, segment_seconds=segment_seconds, slots=concurrency
+                        )
+                    finally:
+                        progress.finish(idx)
+                if failure_reason == 'corruption':
+                    corrupt_video_ids.add(video_id)
+                return resolution, targets, success, failure_reason
+
+            def submit(pool, jobs, idx):
+                """Start encoding claimed rendition rows; returns (future, source path), or None if they failed right away."""
+                video_id, ids = jobs[0].video_id, [job.id for job in jobs]
+                vi = VideoInfo.query.filter_by(video_id=video_id).first()
+                if vi is None or vi.video is None:
+                    logger.warning(f"Skipping queued transcode of {video_id}: the video no longer exists")
+                    _finish_transcode_jobs(ids, 'failed')
+                    return None
                 # Skip if this video was marked corrupt during this run
-                if vi.video_id in corrupt_video_ids:
-                    continue
-
-                # Update transcoding progress
-                util.write_transcoding_status(paths['data'], idx, total_jobs, vi.title, resolution=f"{height}p")
-
-                if not derived_path.exists():
-                    derived_path.mkdir(parents=True)
-
-                has_attr = f'has_{height}p'
-
-                logger.info(f"[{idx}/{total_jobs}] Transcoding {vi.video_id} to {height}p ({vi.video.path})")
-                success, failure_reason = util.transcode_video_quality(
-                    video_path, transcode_path, height, use_gpu, None, encoder_preference,
-                    data_path=paths['data']
-                )
+                if video_id in corrupt_video_ids:
+                    _finish_transcode_jobs(ids, 'failed')
+                    return None
+                video_path = Path(processed_root, "video_links", vi.video_id + vi.video.extension)
+                if not video_path.exists():
+                    logger.warning(f"Skipping video {vi.video_id}: source file not found at {video_path}")
+                    _finish_transcode_jobs(ids, 'failed')
+                    return None
+                derived_path = Path(processed_root, "derived", vi.video_id)
+                heights = [job.height for job in jobs]
+                copy_audio = util.can_copy_audio(json.loads(vi.info)) if vi.info else None
+                future = pool.submit(run_job, idx, vi.video_id, vi.title, vi.video.path, heights, video_path, derived_path,
+                                     jobs[0].kind, copy_audio)
+                return future, video_path
+
+            def record(video_id, video_path, ids, result):
+                """Store the outcome of a finished encode on its VideoInfo and queue rows."""
+                resolution, targets, success, failure_reason = result
                 if success:
-                    setattr(vi, has_attr, True)
-                    if is_video_corrupt(vi.video_id):
-                        clear_video_corrupt(vi.video_id)
-                    db.session.add(vi)
+                    vi = VideoInfo.query.filter_by(video_id=video_id).first()
+                    if vi is not None:
+                        for height, transcode_path in targets:
+                            if transcode_path.exists():
+                                setattr(vi, f'has_{height}p', True)
+                        db.session.commit()
+                    if video_id in marked_corrupt:
+                        clear_video_corrupt(video_id)
+                        marked_corrupt.discard(video_id)
+                    _finish_transcode_jobs(ids, 'complete')
+                    return
+                if failure_reason == 'remux':
+                    # Encode it instead; the rows keep their place in the queue
+                    logger.warning(f"Remuxing video {video_id} {resolution} failed, queueing it for transcoding instead")
+                    TranscodeJob.query.filter(TranscodeJob.id.in_(ids)).update(
+                        {'kind': 'transcode', 'status': 'pending', 'started_at': None}, synchronize_session=False)
                     db.session.commit()
-                elif failure_reason == 'corruption':
-                    logger.warning(f"Skipping video {vi.video_id} {height}p transcode - source file appears corrupt")
-                    mark_video_corrupt(vi.video_id)
-                    corrupt_video_ids.add(vi.video_id)
+                    return
+                if failure_reason == 'corruption':
+                    logger.warning(f"Skipping video {video_id} {resolution} transcode - source file appears corrupt")
+                    mark_video_corrupt(video_id, "Source file appears corrupt or unreadable", video_path)
+                    marked_corrupt.add(video_id)
                 else:
-                    logger.warning(f"Skipping video {vi.video_id} {height}p transcode - all encoders failed")
-
-            util.clear_transcoding_status(paths['data'])
+                    logger.warning(f"Skipping video {video_id} {resolution} transcode - all encoders failed")
+                _finish_transcode_jobs(ids, 'failed')
+
+            # Claim work as slots free up rather than all at once, so renditions
+            # queued while this runs (a fresh upload) are picked by priority.
+            in_flight = {}
+            idx = 0
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                while True:
+                    while len(in_flight) < concurrency:
+                        jobs = claim_transcode_jobs(group=ladder)
+                        if not jobs:
+                            break
+                        if jobs[0].kind == 'plan':
+                            plan_transcodes(None if jobs[0].video_id is None else [jobs[0].video_id], jobs[0].priority)
+                            _finish_transcode_jobs([jobs[0].id], 'complete')
+                            continue
+                        idx += 1
+                        video_id, ids = jobs[0].video_id, [job.id for job in jobs]
+                        started = submit(pool, jobs, idx)
+                        if started is not None:
+                            future, video_path = started
+                            in_flight[future] = (video_id, video_path, ids)
+                    if not in_flight:
+                        break
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        video_id, video_path, ids = in_flight.pop(future)
+                        try:
+                            record(video_id, video_path, ids, future.result())
+                        except Exception as ex:
+                            db.session.rollback()
+                            logger.error(f"Transcoding {video_id} failed: {ex}")
+                            _finish_transcode_jobs(ids, 'failed')
+
+            # Finished rows only matter for the progress display while work is queued
+            if not TranscodeJob.query.filter(TranscodeJob.status.in_(['pending', 'running'])).first():
+                TranscodeJob.query.filter(TranscodeJob.status.in_(['complete', 'failed'])).delete(synchronize_session=False)
+                db.session.commit()
             logger.info("Transcoding complete")
         finally:
-            util.remove_lock(paths['data'], _TRANSCODE_LOCK)
+            util.clear_transcoding_status(paths['data'])
+            util.remove_lock(paths['data'], TRANSCODE_LOCK)
+
+# Number of scan_run rows kept for the admin history
+_SCAN_RUN_HISTORY = 500
+
+def _start_scan_run(command):
+    """
+    Record the start of a library scan. Runs left 'running' by a process that
+    died are closed first; if the last run was one of them, this run resumes it.
+    """
+    ScanRun.query.filter_by(command=command, status='running').update(
+        {'status': 'interrupted'}, synchronize_session=False)
+    previous = ScanRun.query.filter_by(command=command).order_by(ScanRun.id.desc()).first()
+    run = ScanRun(command=command, status='running', started_at=datetime.utcnow())
+    if previous is not None and previous.status == 'interrupted':
+        run.resumed_from = previous.id
+        indexed = FileIndex.query.filter_by(kind='video').count()
+        logger.info(f"Resuming {command} run {previous.id}, interrupted during {previous.phase or 'startup'} "
+                    f"(started {previous.started_at.isoformat()}); {indexed:,} already indexed file(s) will not be hashed again")
+    db.session.add(run)
+    db.session.commit()
+    return run.id
+
+def _set_scan_phase(run_id, phase):
+    ScanRun.query.filter_by(id=run_id).update({'phase': phase}, synchronize_session=False)
+    db.session.commit()
+
+def _finish_scan_run(run_id, started, timing, scan_stats, io_before, error=None):
+    """Store the phase durations and file counts of a scan started with _start_scan_run."""
+    try:
+        run = db.session.get(ScanRun, run_id)
+        if run is None:
+            return
+        run.status = 'failed' if error else 'complete'
+        run.error = f"{type(error).__name__}: {error}"[:512] if error else None
+        run.finished_at = datetime.utcnow()
+        run.total_seconds = time.time() - started
+        run.walk_seconds = scan_stats.get('walk_seconds')
+        run.hash_seconds = scan_stats.get('hash_seconds')
+        run.reconcile_seconds = scan_stats.get('reconcile_seconds')
+        run.probe_seconds = timing.get('sync_metadata')
+        run.poster_seconds = timing.get('create_posters')
+        run.transcode_seconds = timing.get('transcode_videos')
+        run.files_seen = scan_stats.get('files_seen')
+        run.files_hashed = scan_stats.get('files_hashed')
+        run.files_skipped = scan_stats.get('files_skipped')
+        run.files_new = scan_stats.get('files_new')
+        run.bytes_read = util.scan_io_stats['bytes_read'] - io_before['bytes_read']
+        cutoff = db.session.query(ScanRun.id).order_by(ScanRun.id.desc()).offset(_SCAN_RUN_HISTORY).limit(1).scalar()
+        if cutoff is not None:
+            ScanRun.query.filter(ScanRun.id <= cutoff).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Could not record scan run {run_id}: {e}")
 
 @cli.command()
 @click.pass_context
 @click.option("--root", "-r", help="root video path to scan", required=False)
-def bulk_import(ctx, root):
-    with create_app().app_context():
+@click.option("--background-transcode", is_flag=True, hidden=True, help="Start the auto-transcode in a separate process")
+def bulk_import(ctx, root, background_transcode):
+    with _app_context():
         paths = current_app.config['PATHS']
         if util.lock_exists(paths["data"]):
             logger.info(f"A scan process is currently active... Aborting. (Remove {paths['data']/'fireshare.lock'} to continue anyway)")
@@ -923,48 +1572,78 @@ def bulk_import(ctx, root):
         else:
             thumbnail_skip = 0
 
+        run = _start_scan_run('bulk-import')
+        io_before = dict(util.scan_io_stats)
+        # The ingest worker runs many imports, so report this run's share of the counters
+        probe_before = dict(util.probe_cache_stats)
+        started = time.time()
         timing = {}
-        s = time.time()
-        ctx.invoke(scan_videos, root=root)
-        timing['scan_videos'] = time.time() - s
-        s = time.time()
-        ctx.invoke(sync_metadata)
-        timing['sync_metadata'] = time.time() - s
-        s = time.time()
-        ctx.invoke(create_posters, skip=thumbnail_skip)
-        timing['create_posters'] = time.time() - s
-        
-        # Release the scan lock before transcoding — scanning and transcoding are
-        # independent, and holding the lock across a long transcode would cause
-        # every scheduled scan during that window to abort unnecessarily.
-        util.remove_lock(paths["data"])
-
-        # Transcode videos if transcoding is enabled and auto_transcode is on
-        if current_app.config.get('ENABLE_TRANSCODING'):
-            # Check if auto_transcode is enabled in config.json
-            config_path = paths['data'] / 'config.json'
-            auto_transcode = True  # Default to True
-            if config_path.exists():
-                with open(config_path, 'r') as f:
-                    config = json.load(f)
-                    auto_transcode = config.get('transcoding', {}).get('auto_transcode', True)
-
-            if auto_transcode:
-                util.write_transcoding_status(paths['data'], 0, 0, None, os.getpid())
-                s = time.time()
-                ctx.invoke(transcode_videos)
-                timing['transcode_videos'] = time.time() - s
-            else:
-                logger.info("Skipping automatic transcoding (auto_transcode is disabled in settings)")
+        scan_stats = {}
+        # Each phase resumes from its own checkpoints after a crash or restart: the
+        # scan from the file index, which it commits as it goes, metadata from its
+        # per-batch commits, and posters and transcodes from the files already on disk.
+        try:
+            _set_scan_phase(run, 'scan')
+            s = time.time()
+            scan_stats = ctx.invoke(scan_videos, root=root) or {}
+            timing['scan_videos'] = time.time() - s
+            _set_scan_phase(run, 'metadata')
+            s = time.time()
+            ctx.invoke(sync_metadata)
+            timing['sync_metadata'] = time.time() - s
+            _set_scan_phase(run, 'posters')
+            s = time.time()
+            ctx.invoke(create_posters, skip=thumbnail_skip)
+            timing['create_posters'] = time.time() - s
+
+            # Release the scan lock before transcoding — scanning and transcoding are
+            # independent, and holding the lock across a long transcode would cause
+            # every scheduled scan during that window to abort unnecessarily.
+            util.remove_lock(paths["data"])
+
+            # Transcode videos if transcoding is enabled and auto_transcode is on
+            if current_app.config.get('ENABLE_TRANSCODING'):
+                # Check if auto_transcode is enabled in config.json
+                config_path = paths['data'] / 'config.json'
+                auto_transcode = True  # Default to True
+                if config_path.exists():
+                    with open(config_path, 'r') as f:
+                        config = json.load(f)
+                        auto_transcode = config.get('transcoding', {}).get('auto_transcode', True)
 
+                if auto_transcode and background_transcode:
+                    plan_transcodes()
+                    _spawn_transcode(paths['data'])
+                elif auto_transcode:
+                    _set_scan_phase(run, 'transcode')
+                    util.write_transcoding_status(paths['data'], 0, 0, None, os.getpid())
+                    s = time.time()
+                    ctx.invoke(transcode_videos)
+                    timing['transcode_videos'] = time.time() - s
+                else:
+                    logger.info("Skipping automatic transcoding (auto_transcode is disabled in settings)")
+        except Exception as e:
+            db.session.rollback()
+            # Hand the scan lock back now unless it was already released for transcoding
+            if util.lock_owner(paths["data"]) == os.getpid():
+                util.remove_lock(paths["data"])
+            _finish_scan_run(run, started, timing, scan_stats, io_before, error=e)
+            raise
+
+        timing['probe_cache_hits'] = util.probe_cache_stats['hits'] - probe_before['hits']
+        timing['probe_cache_misses'] = util.probe_cache_stats['misses'] - probe_before['misses']
+        timing['hash_bytes_read'] = util.scan_io_stats['bytes_read'] - io_before['bytes_read']
+        timing['hash_throttled_seconds'] = round(util.scan_io_stats['throttled_seconds'] - io_before['throttled_seconds'], 2)
         logger.info(f"Finished bulk import. Timing info: {json.dumps(timing)}")
-        util.clear_transcoding_status(paths['data'])
+        _finish_scan_run(run, started, timing, scan_stats, io_before)
+        if not background_transcode:
+            util.clear_transcoding_status(paths['data'])
 
 @cli.command()
 @click.option("--root", "-r", help="subdirectory of IMAGE_DIRECTORY to scan", required=False)
 def scan_images(root):
     """Scan IMAGE_DIRECTORY for new image files and index them."""
-    with create_app().app_context():
+    with _app_context():
         image_directory = current_app.config.get('IMAGE_DIRECTORY')
         if not image_directory:
             logger.error("IMAGE_DIRECTORY is not configured. Set the IMAGE_DIRECTORY environment variable.")
@@ -978,6 +1657,7 @@ def scan_images(root):
         image_links = paths["processed"] / "image_links"
         if not image_links.is_dir():
             image_links.mkdir(parents=True)
+        io_before = dict(util.scan_io_stats)
 
         config_file = open(paths["data"] / "config.json")
         config = json.load(config_file)
@@ -987,61 +1667,86 @@ def scan_images(root):
         search_root = images_path / root if root else images_path
         logger.info(f"Scanning {search_root} for image files")
 
-        image_files = [
-            f for f in search_root.glob('**/*')
-            if f.is_file() and util.is_image_file(f) and not f.name.startswith('._')
-        ]
-        logger.info(f"Found {len(image_files)} image file(s)")
+        walk_errors = []
+        image_files = util.walk_files(search_root, util.SUPPORTED_IMAGE_EXTENSIONS, ignore=current_app.config['SCAN_IGNORE'],
+                                      name_filter=lambda name: not name.startswith('._'), errors=walk_errors)
 
         image_rows = Image.query.all()
-        new_images = []
-        for img_file in image_files:
+        images_by_id = {ir.image_id: ir for ir in image_rows}
+        file_index = FileIdIndex('image')
+        sparse_ids = _use_sparse_ids()
+        scanned_paths = set()
+
+        def identify(img_file):
+            # Runs on the scan pool: stat the file and hash it only on an index miss.
             rel_path = str(img_file.relative_to(images_path))
-            iid = util.image_id(img_file)
-            existing = next((ir for ir in image_rows if ir.image_id == iid), None)
-            duplicate = next((ni for ni in new_images if ni.image_id == iid), None)
-            if duplicate:
-                logger.debug(f"Found duplicate image {iid} at {rel_path}, skipping...")
-            elif existing:
-                if not existing.available:
-                    db.session.query(Image).filter_by(image_id=iid).update({"available": True})
-                # Regenerate missing WebP/thumbnail for existing images
-                info = ImageInfo.query.filter_by(image_id=iid).first()
-                if info and (not info.has_webp or not info.has_thumbnail):
-                    derived_path = Path(current_app.config['PROCESSED_DIRECTORY']) / "derived" / iid
-                    if not derived_path.exists():
-                        derived_path.mkdir(parents=True)
-                    src = images_path / rel_path
-                    webp_path = derived_path / "image.webp"
-                    thumb_path = derived_path / "thumbnail.webp"
-                    if not webp_path.exists():
-                        ok = util.create_image_webp(src, webp_path)
-                        if ok:
-                            info.has_webp = True
-                    if not thumb_path.exists():
-                        ok = util.create_image_thumbnail(src, thumb_path)
-                        if ok:
-                            info.has_thumbnail = True
-                    if not info.width or not info.height:
-                        w, h = util.get_image_dimensions(src)
-                        info.width = w
-                        info.height = h
-                    if not info.file_size:
-                        info.file_size = src.stat().st_size
-                    db.session.commit()
-                    logger.debug(f"Regenerated derived data for existing image {iid}")
-            else:
-                created_at = datetime.fromtimestamp(os.path.getctime(str(img_file)))
-                updated_at = datetime.fromtimestamp(os.path.getmtime(str(img_file)))
-                source_folder = rel_path.split('/')[0] if '/' in rel_path else None
-                img = Image(image_id=iid, extension=img_file.suffix, path=rel_path,
-                            available=True, created_at=created_at, updated_at=updated_at,
-                            source_folder=source_folder)
-                logger.info(f"Adding new Image {iid} at {rel_path}")
-                new_images.append(img)
+            st = img_file.stat()
+            iid = file_index.match(rel_path, st)
+            if iid is not None:
+                return img_file, rel_path, st, iid, True
+            return img_file, rel_path, st, util.image_id(img_file, sparse=sparse_ids), False
 
+        new_images = []
+        new_image_ids = set()
+        moved_count = 0
+        with ThreadPoolExecutor(max_workers=current_app.config['SCAN_WORKERS']) as pool:
+            window = current_app.config['SCAN_WORKERS'] * 4
+            for img_file, rel_path, st, iid, hit in util.ordered_map(pool, identify, image_files, window):
+                scanned_paths.add(rel_path)
+                file_index.record(rel_path, st, iid, hit)
+                existing = images_by_id.get(iid)
+                if iid in new_image_ids:
+                    logger.debug(f"Found duplicate image {iid} at {rel_path}, skipping...")
+                elif existing:
+                    if existing.path != rel_path and not (images_path / existing.path).exists():
+                        logger.info(f"Image {iid} moved from {existing.path} to {rel_path}")
+                        existing.path = rel_path
+                        existing.source_folder = rel_path.split('/')[0] if '/' in rel_path else None
+                        _relink_source(image_links / (existing.image_id + existing.extension), img_file)
+                        moved_count += 1
+                    # Regenerate missing WebP/thumbnail for existing images
+                    info = existing.info
+                    if info and (not info.has_webp or not info.has_thumbnail):
+                        derived_path = Path(current_app.config['PROCESSED_DIRECTORY']) / "derived" / iid
+                        if not derived_path.exists():
+                            derived_path.mkdir(parents=True)
+                        src = images_path / rel_path
+                        webp_path = derived_path / "image.webp"
+                        thumb_path = derived_path / "thumbnail.webp"
+                        if not webp_path.exists():
+                            ok = util.create_image_webp(src, webp_path)
+                            if ok:
+                                info.has_webp = True
+                        if not thumb_path.exists():
+                            ok = util.create_image_thumbnail(src, thumb_path)
+                            if ok:
+                                info.has_thumbnail = True
+                        if not info.width or not info.height:
+                            w, h = util.get_image_dimensions(src)
+                            info.width = w
+                            info.height = h
+                        if not info.file_size:
+                            info.file_size = src.stat().st_size
+                        db.session.commit()
+                        logger.debug(f"Regenerated derived data for existing image {iid}")
+                else:
+                    created_at = datetime.fromtimestamp(st.st_ctime)
+                    updated_at = datetime.fromtimestamp(st.st_mtime)
+                    source_folder = rel_path.split('/')[0] if '/' in rel_path else None
+                    img = Image(image_id=iid, extension=img_file.suffix, path=rel_path,
+                                available=True, created_at=created_at, updated_at=updated_at,
+                                source_folder=source_folder)
+                    logger.info(f"Adding new Image {iid} at {rel_path}")
+                    new_images.append(img)
+                    new_image_ids.add(iid)
+
+        logger.info(f"Found {len(scanned_paths)} image file(s)")
+        if moved_count:
+            logger.info(f"Updated the location of {moved_count} moved image(s)")
         if new_images:
             db.session.add_all(new_images)
+        pruned = file_index.prune(root)
+        logger.info(f"File index: {file_index.summary()}, {pruned:,} stale entr{'y' if pruned == 1 else 'ies'} removed; {_hash_io_summary(io_before)}")
         db.session.commit()
 
         fd = os.open(str(image_links.absolute()), os.O_DIRECTORY)
@@ -1105,11 +1810,8 @@ def scan_images(root):
         db.session.commit()
 
         # Verify existing images still exist
-        for ei in Image.query.filter_by(available=True).all():
-            file_path = images_path / ei.path
-            if not file_path.exists():
-                logger.warning(f"Image {ei.image_id} at {file_path} not found, marking unavailable")
-                db.session.query(Image).filter_by(image_id=ei.image_id).update({"available": False})
+        _verify_availability(Image, 'image_id', Image.query.all(), scanned_paths, images_path, root,
+                             current_app.config['SCAN_IGNORE'], walk_errors)
         db.session.commit()
         logger.info("Image scan complete")
 
@@ -1122,7 +1824,7 @@ def scan_images(root):
 @click.option("--title", help="Initial title for the image", required=False, default=None)
 def scan_image(ctx, path, game_id, tag_ids, title):
     """Scan a single image file and index it."""
-    with create_app().app_context():
+    with _app_context():
         image_directory = current_app.config.get('IMAGE_DIRECTORY')
         if not image_directory:
             logger.error("IMAGE_DIRECTORY is not configured.")
@@ -1144,13 +1846,19 @@ def scan_image(ctx, path, game_id, tag_ids, title):
         config_file.close()
 
         rel_path = str(img_file.relative_to(images_path))
-        iid = util.image_id(img_file)
+        sparse_ids = _use_sparse_ids()
+        iid = FileIdIndex('image', paths=[rel_path]).content_id(img_file, rel_path, lambda p: util.image_id(p, sparse=sparse_ids))
 
         existing = Image.query.filter_by(image_id=iid).first()
         if existing:
+            if existing.path != rel_path and not (images_path / existing.path).exists():
+                logger.info(f"Image {iid} moved from {existing.path} to {rel_path}")
+                existing.path = rel_path
+                existing.source_folder = rel_path.split('/')[0] if '/' in rel_path else None
+                _relink_source(image_links / (iid + existing.extension), img_file)
             if not existing.available:
-                db.session.query(Image).filter_by(image_id=iid).update({"available": True})
-                db.session.commit()
+                existing.available = True
+            db.session.commit()
             # Regenerate missing WebP/thumbnail for existing images
             info = ImageInfo.query.filter_by(image_id=iid).first()
             if info and (not info.has_webp or not info.has_thumbnail):
@@ -1237,6 +1945,167 @@ def scan_image(ctx, path, game_id, tag_ids, title):
             logger.info(f"Image {iid} indexed successfully")
 
 
+@cli.command()
+@click.pass_context
+@click.option("--settle", type=float, default=5.0, help="Seconds a file must be unchanged before it is ingested")
+@click.option("--poll-interval", type=float, default=30.0, help="Seconds between directory snapshots when polling")
+def watch(ctx, settle, poll_interval):
+    """Watch the video and image directories and ingest files as they appear."""
+    from fireshare import ingest, watcher
+    from fireshare.schedule import fireshare_scan
+
+    _watch_state = {'stop': False}
+
+    def handle_stop(signum, frame):
+        logger.info("Stopping file watcher")
+        _watch_state['stop'] = True
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    with _app_context():
+        paths = current_app.config['PATHS']
+        if util.lock_exists(paths['data'], watcher.LOCK_FILE):
+            logger.info("A file watcher is already running... Aborting.")
+            return
+        util.create_lock(paths['data'], watcher.LOCK_FILE)
+        try:
+            videos_path = paths['video'].resolve()
+            image_directory = current_app.config.get('IMAGE_DIRECTORY')
+            images_path = Path(image_directory).resolve() if image_directory and Path(image_directory).is_dir() else None
+            roots = [videos_path] + ([images_path] if images_path else [])
+
+            CHUNK_FILE_PATTERN = re.compile(r'\.part\d{4}$')
+            TRANSCODE_PATTERN = re.compile(r'-(?:720p|1080p)\.mp4$', re.IGNORECASE)
+
+            def locate(path):
+                # The image directory may live inside the video directory, so check it first
+                for kind, root in (('image', images_path), ('video', videos_path)):
+                    if root is not None and path.is_relative_to(root):
+                        return kind, root, str(path.relative_to(root))
+                return None, None, None
+
+            def on_write(path):
+                kind, root, rel = locate(path)
+                if kind is None or path.name.startswith('._') or not path.is_file():
+                    return
+                if kind == 'video':
+                    if ingest.upload_in_flight(paths['data'], path):
+                        logger.debug(f"Leaving {rel} to the scan of the upload that is writing it")
+                        return
+                    if (path.suffix.lower() in SUPPORTED_FILE_EXTENSIONS
+                            and not CHUNK_FILE_PATTERN.search(path.name)
+                            and not TRANSCODE_PATTERN.search(path.name)):
+                        # Only queue transcodes; draining them here would stall the watcher
+                        ctx.invoke(scan_video, path=rel, background_transcode=True)
+                elif util.is_image_file(path):
+                    ctx.invoke(scan_image, path=rel)
+
+            def on_delete(path):
+                kind, root, rel = locate(path)
+                if kind is None:
+                    return
+                model = Video if kind == 'video' else Image
+                id_attr = 'video_id' if kind == 'video' else 'image_id'
+                under = (model.path == rel) | model.path.startswith(rel + '/', autoescape=True)
+                missing = [row for row in model.query.filter(under, model.available.is_(True)).all()
+                           if not (root / row.path).exists()]
+                for row in missing:
+                    logger.info(f"{kind.capitalize()} {getattr(row, id_attr)} at {row.path} was removed, marking unavailable")
+                    row.available = False
+                index_under = (FileIndex.path == rel) | FileIndex.path.startswith(rel + '/', autoescape=True)
+                FileIndex.query.filter(FileIndex.kind == kind, index_under).delete(synchronize_session=False)
+                db.session.commit()
+
+            def on_overflow():
+                db.session.rollback()
+                fireshare_scan(str(paths['data']))
+
+            def on_error():
+                db.session.rollback()
+
+            fs_watcher = watcher.create_watcher(roots, current_app.config['FILE_WATCHER_MODE'], poll_interval)
+            try:
+                watcher.watch(fs_watcher, on_write, on_delete, on_overflow=on_overflow, on_error=on_error,
+                              settle=settle, should_stop=lambda: _watch_state['stop'])
+            finally:
+                fs_watcher.close()
+        finally:
+            util.remove_lock(paths['data'], watcher.LOCK_FILE)
+
+@cli.command()
+@click.option("--poll-interval", type=float, default=30.0, help="Seconds between queue checks when no request wakes the worker")
+def ingest_worker(poll_interval):
+    """
+    Run scan commands queued by the web server in one long-lived process.
+
+    Uploads and scheduled scans are sent to this worker over data/ingest.sock
+    and run in-process with a warm app context and probe cache.
+    """
+    from fireshare import ingest
+
+    wake = threading.Event()
+    _worker_state = {'stop': False}
+
+    def handle_stop(signum, frame):
+        logger.info("Stopping ingest worker")
+        _worker_state['stop'] = True
+        wake.set()
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    app = create_app(mode="worker")
+    with app.app_context():
+        data_path = current_app.config['PATHS']['data']
+        if util.lock_exists(data_path, ingest.LOCK_FILE):
+            logger.info("An ingest worker is already running... Aborting.")
+            return
+        util.create_lock(data_path, ingest.LOCK_FILE)
+        server = ingest.IngestServer(app, data_path, wake)
+        try:
+            ingest.recover_jobs()
+            server.start()
+            # Scans run here queue webhook notifications for this thread to send
+            notify.start_dispatcher(app)
+            logger.info(f"Ingest worker listening on {server.path}")
+            while not _worker_state['stop']:
+                wake.clear()
+                job = ingest.claim_next()
+                if job is None:
+                    wake.wait(poll_interval)
+                    continue
+                job_id, command, args = job
+                if command in ('scan-video', 'bulk-import'):
+                    args = args + ['--background-transcode']
+                logger.info(f"Running ingest job {job_id}: {command} {' '.join(args)}")
+                started = time.monotonic()
+                error = None
+                try:
+                    cli.main(args=[command, *args], prog_name="fireshare", standalone_mode=False)
+                except SystemExit as e:
+                    if e.code:
+                        error = f"exited with status {e.code}"
+                except Exception as e:
+                    logger.exception(f"Ingest job {job_id} failed")
+                    error = str(e) or type(e).__name__
+                finally:
+                    db.session.rollback()
+                    db.session.remove()
+                # A command that failed before releasing the scan lock would otherwise
+                # block every later scan, since this process stays alive.
+                if util.lock_owner(data_path) == os.getpid():
+                    util.remove_lock(data_path)
+                # Clear a "transcoding starting" placeholder an upload stamped with our PID
+                # if the command didn't go on to start a transcode.
+                if util.read_transcoding_status(data_path).get('pid') == os.getpid():
+                    util.clear_transcoding_status(data_path)
+                ingest.finish(job_id, error)
+                logger.info(f"Ingest job {job_id} {'failed' if error else 'finished'} in {time.monotonic() - started:.2f}s")
+        finally:
+            server.close()
+            util.remove_lock(data_path, ingest.LOCK_FILE)
+
 @cli.command()
 def migrate_game_assets():
     """Convert any non-webp game assets to webp at 100% quality."""
@@ -1245,7 +2114,7 @@ def migrate_game_assets():
     _ASSET_SLOTS = ['hero_1', 'hero_2', 'logo_1', 'icon_1']
     _NON_WEBP_EXTENSIONS = ['.png', '.jpg', '.jpeg']
 
-    with create_app().app_context():
+    with _app_context():
         paths = current_app.config['PATHS']
         game_assets_base = paths['data'] / 'game_assets'
 
@@ -0,0 +1,108 @@
+"""
+Persistent (path, size, mtime, inode) -> content id index used by the scanners.
+
+Computing a video or image id reads up to 16MB of the file, so the scanners
+consult this index first and only hash files that are new or whose stat
+signature changed since the last scan.
+"""
+import os
+from datetime import datetime
+
+from . import db
+from .models import FileIndex
+
+# SQLite integers are signed 64-bit; some network filesystems hand out inode
+# numbers above that range.
+_INODE_MASK = 0x7FFFFFFFFFFFFFFF
+
+# Keep bulk DELETEs well below SQLite's bound-parameter limit.
+_DELETE_CHUNK = 500
+
+
+def stat_signature(st):
+    """Return the (size, mtime_ns, inode) tuple used to detect changed files."""
+    return (st.st_size, st.st_mtime_ns, st.st_ino & _INODE_MASK)
+
+
+class FileIdIndex:
+    """
+    In-memory view of the file_index rows for one kind of media.
+
+    Loaded once per scan; new and changed entries are staged on the current
+    db.session and are persisted by the scan's own commit.
+    """
+
+    def __init__(self, kind, paths=None):
+        """If paths is given only those entries are loaded, for single-file ingests."""
+        self.kind = kind
+        query = FileIndex.query.filter_by(kind=kind)
+        if paths is not None:
+            query = query.filter(FileIndex.path.in_(list(paths)))
+        self._rows = {row.path: row for row in query.all()}
+        # Plain-tuple snapshot so match() never touches ORM state and is safe to
+        # call from the scanners' worker threads.
+        self._signatures = {path: ((row.size, row.mtime_ns, row.inode), row.content_id)
+                            for path, row in self._rows.items()}
+        self._seen = set()
+        self.hits = 0
+        self.misses = 0
+
+    def match(self, rel_path, st):
+        """Return the indexed content id for rel_path if its stat signature is unchanged."""
+        entry = self._signatures.get(rel_path)
+        if entry is not None and entry[0] == stat_signature(st):
+            return entry[1]
+        return None
+
+    def record(self, rel_path, st, content_id, hit):
+        """
+        Mark rel_path as seen and store its content id if it had to be hashed.
+        Must be called from the thread that owns db.session.
+        """
+        self._seen.add(rel_path)
+        if hit:
+            self.hits += 1
+            return
+        self.misses += 1
+        size, mtime_ns, inode = stat_signature(st)
+        row = self._rows.get(rel_path)
+        if row is None:
+            row = FileIndex(kind=self.kind, path=rel_path)
+            db.session.add(row)
+            self._rows[rel_path] = row
+        row.size = size
+        row.mtime_ns = mtime_ns
+        row.inode = inode
+        row.content_id = content_id
+        row.updated_at = datetime.utcnow()
+        self._signatures[rel_path] = ((size, mtime_ns, inode), content_id)
+
+    def content_id(self, path, rel_path, hasher, st=None):
+        """Return the content id for path, hashing it with hasher only on an index miss."""
+        if st is None:
+            st = os.stat(path)
+        cid = self.match(rel_path, st)
+        hit = cid is not None
+        if not hit:
+            cid = hasher(path)
+        self.record(rel_path, st, cid, hit)
+        return cid
+
+    def prune(self, root=None):
+        """
+        Forget entries that were not seen during this scan.
+        If root is given, only entries beneath that relative directory are considered.
+        """
+        prefix = root.strip('/') + '/' if root else None
+        stale = [path for path in self._rows
+                 if path not in self._seen and (prefix is None or path.startswith(prefix))]
+        for path in stale:
+            self._signatures.pop(path, None)
+        stale_ids = [self._rows.pop(path).id for path in stale]
+        stale_ids = [i for i in stale_ids if i is not None]
+        for i in range(0, len(stale_ids), _DELETE_CHUNK):
+            FileIndex.query.filter(FileIndex.id.in_(stale_ids[i:i + _DELETE_CHUNK])).delete(synchronize_session=False)
+        return len(stale)
+
+    def summary(self):
+        return f"{self.hits:,} hit(s), {self.misses:,} miss(es)"
@@ -0,0 +1,225 @@
+"""
+Queue and socket plumbing for `fireshare ingest-worker`.
+
+The worker keeps one warm app context, database connection and probe cache
+and runs scan commands in-process, so an upload no longer pays for a new
+interpreter and a full create_app() before it shows up in the library.
+Commands arrive over a unix socket in the data directory and are stored as
+IngestJob rows, so a worker restart picks up where it left off. When no
+worker is listening, callers fall back to spawning the CLI as before.
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from subprocess import Popen
+
+import sqlalchemy as sa
+
+from . import db, logger, util
+from .models import IngestJob
+
+SOCKET_FILE = "ingest.sock"
+LOCK_FILE = "fireshare_ingest.lock"
+
+# Commands the worker accepts. Transcodes still get their own process: they run
+# for minutes, would hold up every upload behind them, and are cancelled by PID.
+COMMANDS = ('scan-video', 'scan-image', 'scan-images', 'bulk-import')
+
+# Library-wide scans only need to be queued once
+_DEDUPED_COMMANDS = ('scan-images', 'bulk-import')
+
+# Single-file scans for uploads are claimed ahead of library-wide scans queued
+# before them, so a long bulk import never holds an upload back
+_UPLOAD_COMMANDS = ('scan-video', 'scan-image')
+
+# Uploads mark the file they are writing so the file watcher leaves it to the
+# upload's own scan-video, which carries the title, tags and game
+UPLOADS_DIR = "uploads_in_flight"
+# A mark left behind by a scan that never finished stops protecting the file after this long
+_UPLOAD_MARK_TTL = 6 * 60 * 60
+
+
+def worker_pid(data_path):
+    """PID of the running ingest worker, or None."""
+    data_path = Path(data_path)
+    if not util.lock_exists(data_path, LOCK_FILE):
+        return None
+    return util.lock_owner(data_path, LOCK_FILE)
+
+
+def submit(data_path, command, args=(), timeout=2.0):
+    """
+    Queue command on the ingest worker and return the job id, or None if no
+    worker answered; the caller should then run the command itself.
+    """
+    sock_path = Path(data_path) / SOCKET_FILE
+    if not sock_path.exists():
+        return None
+    request = json.dumps({'command': command, 'args': list(args)}).encode() + b'\n'
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            s.connect(str(sock_path))
+            s.sendall(request)
+            with s.makefile('rb') as f:
+                reply = json.loads(f.readline() or b'{}')
+    except (OSError, ValueError) as e:
+        logger.debug(f"Ingest worker unavailable, running {command} directly: {e}")
+        return None
+    if not reply.get('ok'):
+        logger.warning(f"Ingest worker rejected {command}: {reply.get('error')}")
+        return None
+    return reply['job_id']
+
+
+def run_command(data_path, command, args=()):
+    """Queue command on the ingest worker, or spawn `fireshare <command>` if it is not running."""
+    if data_path is not None and submit(data_path, command, args) is not None:
+        return None
+    proc = Popen(["fireshare", command, *args], shell=False, start_new_session=True)
+    threading.Thread(target=proc.wait, daemon=True).start()
+    return proc
+
+
+def _upload_mark(data_path, path):
+    key = hashlib.sha1(str(Path(path).resolve()).encode()).hexdigest()
+    return Path(data_path) / UPLOADS_DIR / key
+
+
+def mark_upload(data_path, path):
+    """Claim path for an upload before it is written; scan-video releases it."""
+    mark = _upload_mark(data_path, path)
+    mark.parent.mkdir(parents=True, exist_ok=True)
+    mark.touch()
+
+
+def release_upload(data_path, path):
+    try:
+        _upload_mark(data_path, path).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def upload_in_flight(data_path, path):
+    """True while an upload's scan still owns path."""
+    try:
+        marked_at = _upload_mark(data_path, path).stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return time.time() - marked_at < _UPLOAD_MARK_TTL
+
+
+def recover_jobs():
+    """Put jobs that were running when the previous worker exited back in the queue."""
+    count = IngestJob.query.filter_by(status='running').update(
+        {'status': 'pending', 'started_at': None}, synchronize_session=False)
+    # Finished rows are only useful until the next restart
+    IngestJob.query.filter(IngestJob.status.in_(['complete', 'failed'])).delete(synchronize_session=False)
+    db.session.commit()
+    if count:
+        logger.info(f"Re-queued {count} interrupted ingest job(s)")
+
+
+def claim_next():
+    """
+    Claim the next pending job and return (id, command, args), or None if the
+    queue is empty. Upload scans go first, otherwise jobs run oldest first.
+    """
+    upload_first = sa.case((IngestJob.command.in_(_UPLOAD_COMMANDS), 0), else_=1)
+    while True:
+        job = IngestJob.query.filter_by(status='pending').order_by(upload_first, IngestJob.id).first()
+        if job is None:
+            return None
+        result = db.session.execute(
+            sa.update(IngestJob)
+            .where(sa.and_(IngestJob.id == job.id, IngestJob.status == 'pending'))
+            .values(status='running', started_at=datetime.utcnow())
+        )
+        db.session.commit()
+        if result.rowcount:
+            return job.id, job.command, json.loads(job.args)
+
+
+def finish(job_id, error=None):
+    """Mark a claimed job complete, or failed with error."""
+    IngestJob.query.filter_by(id=job_id).update({
+        'status': 'failed' if error else 'complete',
+        'error': error[:512] if error else None,
+        'completed_at': datetime.utcnow(),
+    }, synchronize_session=False)
+    db.session.commit()
+
+
+class IngestServer:
+    """
+    Accepts commands on the worker's unix socket from a background thread,
+    stores them as IngestJob rows and sets wake so the worker loop picks them up
+    even while it is busy with another job.
+    """
+
+    def __init__(self, app, data_path, wake):
+        self._app = app
+        self._wake = wake
+        self.path = Path(data_path) / SOCKET_FILE
+        # Only one worker holds the lock, so anything at this path is stale
+        if self.path.exists() or self.path.is_symlink():
+            self.path.unlink()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(str(self.path))
+        os.chmod(self.path, 0o600)
+        self._sock.listen(64)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        self._sock.close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def _serve(self):
+        with self._app.app_context():
+            while True:
+                try:
+                    conn, _ = self._sock.accept()
+                except OSError:
+                    return  # socket closed
+                with conn:
+                    conn.settimeout(2.0)
+                    try:
+                        reply = self._handle(conn)
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.error(f"Failed to queue ingest request: {e}")
+                        reply = {'ok': False, 'error': str(e)}
+                    try:
+                        conn.sendall(json.dumps(reply).encode() + b'\n')
+                    except OSError:
+                        pass
+                    db.session.remove()
+
+    def _handle(self, conn):
+        with conn.makefile('rb') as f:
+            request = json.loads(f.readline() or b'{}')
+        command = request.get('command')
+        args = request.get('args') or []
+        if command not in COMMANDS or not all(isinstance(a, str) for a in args):
+            return {'ok': False, 'error': f"unsupported command {command!r}"}
+        args_json = json.dumps(args)
+        if command in _DEDUPED_COMMANDS:
+            queued = IngestJob.query.filter_by(command=command, args=args_json, status='pending').first()
+            if queued:
+                return {'ok': True, 'job_id': queued.id}
+        job = IngestJob(command=command, args=args_json)
+        db.session.add(job)
+        db.session.commit()
+        self._wake.set()
+        return {'ok': True, 'job_id': job.id}
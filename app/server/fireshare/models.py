@@ -437,7 +437,10 @@ class TranscodeJob(db.Model):
     __tablename__ = "transcode_job"
 
     id           = db.Column(db.Integer, primary_key=True)
-    video_id     = db.Column(db.String(64), nullable=True, index=True)  # None = bulk
+    video_id     = db.Column(db.String(64), nullable=True, index=True)  # None = bulk (kind 'plan' only)
+    height       = db.Column(db.Integer, nullable=True)                 # rendition height for kinds 'transcode' and 'remux'
+    kind         = db.Column(db.String(16), nullable=False, default='transcode')  # 'transcode', 'remux' or 'plan'
+    priority     = db.Column(db.Integer, nullable=False, default=0, index=True)   # higher runs first
     status       = db.Column(db.String(16), nullable=False, default='pending', index=True)
     task_count   = db.Column(db.Integer, nullable=False, default=0)
     created_at   = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -445,5 +448,201 @@ class TranscodeJob(db.Model):
     completed_at = db.Column(db.DateTime, nullable=True)
 
     def __repr__(self):
-        return "<TranscodeJob id={} video_id={} status={}>".format(self.id, self.video_id, self.status)
+        return "<TranscodeJob id={} video_id={} height={} kind={} status={}>".format(
+            self.id, self.video_id, self.height, self.kind, self.status)
 
+
+class FileIndex(db.Model):
+    __tablename__ = "file_index"
+    __table_args__ = (db.UniqueConstraint("kind", "path"),)
+
+    id         = db.Column(db.Integer, primary_key=True)
+    kind       = db.Column(db.String(8), nullable=False)        # 'video' or 'image'
+    path       = db.Column(db.String(2048), nullable=False)     # relative to the media root
+    size       = db.Column(db.BigInteger, nullable=False)
+    mtime_ns   = db.Column(db.BigInteger, nullable=False)
+    inode      = db.Column(db.BigInteger, nullable=False)
+    content_id = db.Column(db.String(32), index=True, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return "<FileIndex {} {} -> {}>".format(self.kind, self.path, self.content_id)
+
+class MediaProbe(db.Model):
+    __tablename__ = "media_probe"
+
+    id        = db.Column(db.Integer, primary_key=True)
+    video_id  = db.Column(db.String(32), unique=True, index=True, nullable=False)
+    size      = db.Column(db.BigInteger, nullable=False)
+    mtime_ns  = db.Column(db.BigInteger, nullable=False)
+    data      = db.Column(db.Text, nullable=False)          # ffprobe -show_format -show_streams JSON
+    probed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return "<MediaProbe {}>".format(self.video_id)
+
+class MetadataRetry(db.Model):
+    __tablename__ = "metadata_retry"
+
+    id              = db.Column(db.Integer, primary_key=True)
+    video_id        = db.Column(db.String(32), unique=True, index=True, nullable=False)
+    attempts        = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, index=True)
+    size            = db.Column(db.BigInteger, nullable=True)      # source file size at the last attempt
+    mtime_ns        = db.Column(db.BigInteger, nullable=True)      # source file mtime at the last attempt
+    last_error      = db.Column(db.String(512), nullable=True)
+    created_at      = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return "<MetadataRetry {} attempts={}>".format(self.video_id, self.attempts)
+
+class IngestJob(db.Model):
+    __tablename__ = "ingest_job"
+
+    id           = db.Column(db.Integer, primary_key=True)
+    command      = db.Column(db.String(32), nullable=False)    # fireshare CLI command, e.g. 'scan-video'
+    args         = db.Column(db.Text, nullable=False, default='[]')  # JSON list of CLI arguments
+    status       = db.Column(db.String(16), nullable=False, default='pending', index=True)
+    error        = db.Column(db.String(512), nullable=True)
+    created_at   = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at   = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return "<IngestJob id={} command={} status={}>".format(self.id, self.command, self.status)
+
+class Notification(db.Model):
+    __tablename__ = "notification"
+
+    id              = db.Column(db.Integer, primary_key=True)
+    kind            = db.Column(db.String(16), nullable=False)       # 'discord' or 'generic'
+    url             = db.Column(db.String(2048), nullable=False)     # webhook to POST to
+    video_id        = db.Column(db.String(32), nullable=True, index=True)
+    video_url       = db.Column(db.String(2048), nullable=True)      # public watch link, used for digests
+    payload         = db.Column(db.Text, nullable=False)             # JSON body
+    status          = db.Column(db.String(16), nullable=False, default='pending', index=True)  # pending, sending or dead
+    attempts        = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error      = db.Column(db.String(512), nullable=True)
+    created_at      = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def json(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "url": self.url,
+            "video_id": self.video_id,
+            "video_url": self.video_url,
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        return "<Notification {} {} status={}>".format(self.id, self.kind, self.status)
+
+class GameSuggestion(db.Model):
+    __tablename__ = "game_suggestion"
+
+    id             = db.Column(db.Integer, primary_key=True)
+    # Exactly one of video_id (suggestion for one video) or folder_path (suggestion for a whole folder) is set
+    video_id       = db.Column(db.String(32), nullable=True, unique=True, index=True)
+    folder_path    = db.Column(db.String(1024), nullable=True, unique=True, index=True)
+    game_id        = db.Column(db.Integer, nullable=True)
+    game_name      = db.Column(db.String(256), nullable=True)
+    steamgriddb_id = db.Column(db.Integer, nullable=True)
+    confidence     = db.Column(db.Float, nullable=True)
+    source         = db.Column(db.String(32), nullable=True)
+    release_date   = db.Column(db.String(64), nullable=True)
+    video_ids      = db.Column(db.Text, nullable=True)  # JSON list, folder suggestions only
+    created_at     = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def json(self):
+        suggestion = {
+            "game_id": self.game_id,
+            "game_name": self.game_name,
+            "steamgriddb_id": self.steamgriddb_id,
+            "confidence": self.confidence,
+            "source": self.source,
+        }
+        if self.release_date:
+            suggestion["release_date"] = self.release_date
+        if self.folder_path is not None:
+            video_ids = json.loads(self.video_ids or "[]")
+            suggestion["video_ids"] = video_ids
+            suggestion["video_count"] = len(video_ids)
+        return suggestion
+
+    def __repr__(self):
+        return "<GameSuggestion {} {}>".format(self.video_id or self.folder_path, self.game_name)
+
+class CorruptVideo(db.Model):
+    __tablename__ = "corrupt_video"
+
+    id         = db.Column(db.Integer, primary_key=True)
+    video_id   = db.Column(db.String(32), unique=True, index=True, nullable=False)
+    reason     = db.Column(db.String(512), nullable=True)
+    probed_at  = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # when the source last failed
+    size       = db.Column(db.BigInteger, nullable=True)      # source file size when it failed
+    mtime_ns   = db.Column(db.BigInteger, nullable=True)      # source file mtime when it failed
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return "<CorruptVideo {} {}>".format(self.video_id, self.reason)
+
+class ScanRun(db.Model):
+    __tablename__ = "scan_run"
+
+    id                = db.Column(db.Integer, primary_key=True)
+    command           = db.Column(db.String(32), nullable=False)
+    status            = db.Column(db.String(16), nullable=False, default='running')  # running, complete, failed or interrupted
+    phase             = db.Column(db.String(32), nullable=True)   # current phase, or the one the run stopped in
+    resumed_from      = db.Column(db.Integer, nullable=True)      # id of the interrupted run this one picked up from
+    started_at        = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    finished_at       = db.Column(db.DateTime, nullable=True)
+    # Phase durations in seconds. Walking and hashing overlap, and hash_seconds
+    # adds up the time of every scan worker, so phases don't sum to total_seconds.
+    total_seconds     = db.Column(db.Float, nullable=True)
+    walk_seconds      = db.Column(db.Float, nullable=True)
+    hash_seconds      = db.Column(db.Float, nullable=True)
+    probe_seconds     = db.Column(db.Float, nullable=True)
+    reconcile_seconds = db.Column(db.Float, nullable=True)
+    poster_seconds    = db.Column(db.Float, nullable=True)
+    transcode_seconds = db.Column(db.Float, nullable=True)
+    files_seen        = db.Column(db.Integer, nullable=True)
+    files_hashed      = db.Column(db.Integer, nullable=True)  # file index misses
+    files_skipped     = db.Column(db.Integer, nullable=True)  # transcoded outputs left out of the scan
+    files_new         = db.Column(db.Integer, nullable=True)
+    bytes_read        = db.Column(db.BigInteger, nullable=True)  # read for content ids
+    error             = db.Column(db.String(512), nullable=True)
+
+    def json(self):
+        return {
+            "id": self.id,
+            "command": self.command,
+            "status": self.status,
+            "phase": self.phase,
+            "resumed_from": self.resumed_from,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "total_seconds": self.total_seconds,
+            "phases": {
+                "walk": self.walk_seconds,
+                "hash": self.hash_seconds,
+                "probe": self.probe_seconds,
+                "reconcile": self.reconcile_seconds,
+                "posters": self.poster_seconds,
+                "transcode": self.transcode_seconds,
+            },
+            "files_seen": self.files_seen,
+            "files_hashed": self.files_hashed,
+            "files_skipped": self.files_skipped,
+            "files_new": self.files_new,
+            "bytes_read": self.bytes_read,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return "<ScanRun {} {} status={}>".format(self.id, self.command, self.status)
@@ -0,0 +1,258 @@
+"""
+Outbound webhook notifications for new videos.
+
+Scans only stage Notification rows next to the videos they add; sending
+happens afterwards, a few requests at a time, so a slow or unreachable
+webhook never holds up ingestion. Failed sends are retried with exponential
+backoff and end up in a dead-letter list (status 'dead') that admins can
+inspect and requeue. When many clips arrive at once, Discord notifications
+for the same webhook are collapsed into digest messages.
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from flask import current_app
+
+from . import db, logger
+from .models import Notification
+
+DISCORD_USERNAME = "Fireshare"
+DISCORD_AVATAR_URL = "https://github.com/ShaneIsrael/fireshare/raw/develop/app/client/src/assets/logo_square.png"
+# Discord rejects messages with more than 2000 characters of content
+_DISCORD_CONTENT_LIMIT = 2000
+
+MAX_ATTEMPTS = 8
+_BACKOFF_START = timedelta(seconds=30)
+_BACKOFF_MAX = timedelta(hours=1)
+# A claimed row whose sender died becomes due again after this long
+_LEASE = timedelta(minutes=5)
+_CLAIM_BATCH = 100
+_REQUEST_TIMEOUT = 10
+# Client errors that will not go away by retrying; anything else is retried
+_RETRYABLE_CLIENT_ERRORS = (408, 425, 429)
+
+_dispatcher = None
+
+
+def get_public_watch_url(video_id, config, host):
+    shareable_link_domain = config.get("ui_config", {}).get("shareable_link_domain", "")
+    if shareable_link_domain:
+        if not shareable_link_domain.startswith("https://") and not shareable_link_domain.startswith("http://"):
+            shareable_link_domain = f"https://{shareable_link_domain}"
+        return f"{shareable_link_domain}/w/{video_id}"
+    elif host:
+        if not host.startswith("https://") and not host.startswith("http://"):
+            host = f"https://{host}"
+        return f"{host}/w/{video_id}"
+    logger.warning("Unable to post to webhooks: set the DOMAIN env variable or a shareable link domain in the Admin settings.")
+
+
+def discord_payload(content):
+    return {"content": content, "username": DISCORD_USERNAME, "avatar_url": DISCORD_AVATAR_URL}
+
+
+def enqueue_new_videos(video_ids, config, domain):
+    """
+    Stage notifications for newly added videos on the current session; they are
+    persisted by the caller's commit. Returns the number of rows staged.
+    """
+    integrations = config.get("integrations", {})
+    discord_url = integrations.get("discord_webhook_url")
+    generic_url = integrations.get("generic_webhook_url")
+    if not (discord_url or generic_url):
+        return 0
+    generic_template = json.dumps(integrations.get("generic_webhook_payload") or {})
+    rows = []
+    for video_id in video_ids:
+        video_url = get_public_watch_url(video_id, config, domain)
+        if video_url is None:
+            continue
+        if discord_url:
+            rows.append(Notification(kind='discord', url=discord_url, video_id=video_id, video_url=video_url,
+                                     payload=json.dumps(discord_payload(video_url))))
+        if generic_url:
+            # Replaces plain text json [[video_url]] with the real video_url
+            payload = json.loads(generic_template.replace("[[video_url]]", video_url))
+            if not payload:
+                payload = {"content": video_url}
+            rows.append(Notification(kind='generic', url=generic_url, video_id=video_id, video_url=video_url,
+                                     payload=json.dumps(payload)))
+    db.session.add_all(rows)
+    return len(rows)
+
+
+def _digest_messages(rows):
+    """Split rows into Discord digest messages that stay under the content limit."""
+    messages = []
+    batch, length = [], 0
+    for row in rows:
+        line_length = len(row.video_url) + 1
+        if batch and length + line_length > _DISCORD_CONTENT_LIMIT - 40:
+            messages.append(batch)
+            batch, length = [], 0
+        batch.append(row)
+        length += line_length
+    if batch:
+        messages.append(batch)
+    return [(rows[0].url, discord_payload(f"{len(batch)} new clips:\n" + "\n".join(r.video_url for r in batch)), batch)
+            for batch in messages]
+
+
+def _plan(rows, digest_threshold):
+    """Group claimed rows into (url, payload, rows) messages."""
+    messages = []
+    discord = {}
+    for row in rows:
+        if row.kind == 'discord' and row.video_url:
+            discord.setdefault(row.url, []).append(row)
+        else:
+            messages.append((row.url, json.loads(row.payload), [row]))
+    for url_rows in discord.values():
+        if digest_threshold and len(url_rows) >= digest_threshold:
+            messages.extend(_digest_messages(url_rows))
+        else:
+            messages.extend((r.url, json.loads(r.payload), [r]) for r in url_rows)
+    return messages
+
+
+def _post(session, url, payload):
+    """POST payload to url. Returns (error, retry_after, permanent); error is None on success."""
+    import requests
+    try:
+        response = session.post(url, json=payload, timeout=_REQUEST_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        return str(e) or type(e).__name__, None, False
+    if response.status_code < 400:
+        return None, None, False
+    retry_after = None
+    if response.status_code == 429:
+        try:
+            retry_after = float(response.headers.get('Retry-After') or response.json().get('retry_after'))
+        except (TypeError, ValueError):
+            retry_after = None
+    permanent = 400 <= response.status_code < 500 and response.status_code not in _RETRYABLE_CLIENT_ERRORS
+    return f"HTTP {response.status_code}: {response.text[:200]}", retry_after, permanent
+
+
+def _claim(now):
+    lease = now + _LEASE
+    due = [i for (i,) in db.session.query(Notification.id)
+           .filter(Notification.status.in_(['pending', 'sending']), Notification.next_attempt_at <= now)
+           .order_by(Notification.id).limit(_CLAIM_BATCH).all()]
+    if not due:
+        return []
+    db.session.execute(
+        sa.update(Notification)
+        .where(Notification.id.in_(due), Notification.status.in_(['pending', 'sending']),
+               Notification.next_attempt_at <= now)
+        .values(status='sending', next_attempt_at=lease)
+    )
+    db.session.commit()
+    # The lease timestamp identifies the rows this call won if another sender raced us
+    return Notification.query.filter_by(status='sending', next_attempt_at=lease).all()
+
+
+def dispatch_due(concurrency=None, digest_threshold=None):
+    """
+    Send every notification that is due, concurrency requests at a time.
+    Returns a dict with sent, retrying and dead counts.
+    """
+    import requests
+    if concurrency is None:
+        concurrency = current_app.config.get('NOTIFY_CONCURRENCY', 4)
+    if digest_threshold is None:
+        digest_threshold = current_app.config.get('NOTIFY_DIGEST_THRESHOLD', 0)
+    counts = {'sent': 0, 'retrying': 0, 'dead': 0}
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        while True:
+            now = datetime.utcnow()
+            rows = _claim(now)
+            if not rows:
+                break
+            messages = _plan(rows, digest_threshold)
+            results = pool.map(lambda m: _post(session, m[0], m[1]), messages)
+            now = datetime.utcnow()
+            for (url, _, message_rows), (error, retry_after, permanent) in zip(messages, results):
+                for row in message_rows:
+                    if error is None:
+                        db.session.delete(row)
+                        counts['sent'] += 1
+                        continue
+                    row.attempts += 1
+                    row.last_error = error[:512]
+                    if permanent or row.attempts >= MAX_ATTEMPTS:
+                        row.status = 'dead'
+                        counts['dead'] += 1
+                        logger.warning(f"Giving up on {row.kind} notification {row.id} after {row.attempts} attempt(s): {error}")
+                    else:
+                        backoff = min(_BACKOFF_START * 2 ** (row.attempts - 1), _BACKOFF_MAX)
+                        if retry_after:
+                            backoff = max(backoff, timedelta(seconds=retry_after))
+                        row.status = 'pending'
+                        row.next_attempt_at = now + backoff
+                        counts['retrying'] += 1
+                        logger.info(f"{row.kind.capitalize()} notification {row.id} failed ({error}), retrying in {int(backoff.total_seconds())}s")
+            db.session.commit()
+    if counts['sent'] or counts['dead']:
+        logger.info(f"Notifications: {counts['sent']} sent, {counts['retrying']} to retry, {counts['dead']} dead")
+    return counts
+
+
+def next_due_in(default):
+    """Seconds until the next pending notification is due, or default if there are none."""
+    due = db.session.query(sa.func.min(Notification.next_attempt_at)).filter(
+        Notification.status.in_(['pending', 'sending'])).scalar()
+    if due is None:
+        return default
+    return max(0.0, (due - datetime.utcnow()).total_seconds())
+
+
+class Dispatcher(threading.Thread):
+    """Background sender used by long-lived processes such as the ingest worker."""
+
+    def __init__(self, app, idle_interval=60.0):
+        super().__init__(daemon=True, name="notify-dispatcher")
+        self._app = app
+        self._idle_interval = idle_interval
+        self._wake = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def run(self):
+        with self._app.app_context():
+            while True:
+                self._wake.clear()
+                try:
+                    dispatch_due()
+                    wait = min(next_due_in(self._idle_interval), self._idle_interval)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Notification dispatch failed: {e}")
+                    wait = self._idle_interval
+                finally:
+                    db.session.remove()
+                self._wake.wait(wait)
+
+
+def start_dispatcher(app):
+    """Send notifications from a background thread of this process from now on."""
+    global _dispatcher
+    if _dispatcher is None or not _dispatcher.is_alive():
+        _dispatcher = Dispatcher(app)
+        _dispatcher.start()
+    return _dispatcher
+
+
+def flush():
+    """
+    Deliver committed notifications: wakes the background sender when this
+    process runs one, otherwise sends what is due before returning.
+    """
+    if _dispatcher is not None and _dispatcher.is_alive():
+        _dispatcher.wake()
+        return None
+    return dispatch_due()
@@ -1,20 +1,44 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.jobstores.base import JobLookupError
 from sqlalchemy.pool import StaticPool
 
 import logging
+from pathlib import Path
 from subprocess import Popen
 
+from . import ingest, util
+from .watcher import LOCK_FILE as WATCH_LOCK_FILE
+
 logger = logging.getLogger('fireshare')
 logger.setLevel(logging.DEBUG)
 
-def fireshare_scan():
+def fireshare_scan(data_path=None):
     logger.info('Starting scheduled scan...')
-    Popen(["fireshare", "bulk-import"], shell=False)
-    Popen(["fireshare", "scan-images"], shell=False)
+    # Runs on the ingest worker when there is one, otherwise in new processes
+    ingest.run_command(data_path, "bulk-import")
+    ingest.run_command(data_path, "scan-images")
+
+def ensure_file_watcher(data_path):
+    if not util.lock_exists(Path(data_path), WATCH_LOCK_FILE):
+        logger.info('Starting file watcher...')
+        Popen(["fireshare", "watch"], shell=False)
 
-def init_schedule(dburl, mins_between_scan=5):
-    if mins_between_scan > 0:
+def ensure_ingest_worker(data_path):
+    if not util.lock_exists(Path(data_path), ingest.LOCK_FILE):
+        logger.info('Starting ingest worker...')
+        Popen(["fireshare", "ingest-worker"], shell=False)
+
+def init_schedule(dburl, mins_between_scan=5, data_path=None, file_watcher=False, ingest_worker=False):
+    if ingest_worker:
+        # Uploads and scheduled scans run on the worker; check every minute that it is still running
+        logger.info('Initializing ingest worker')
+        ensure_ingest_worker(data_path)
+    if file_watcher:
+        # The watcher ingests new files as they appear; check every minute that it is still running
+        logger.info('Initializing file watcher')
+        ensure_file_watcher(data_path)
+    if mins_between_scan > 0 or file_watcher or ingest_worker:
         logger.info(f'Initializing scheduled video scan. minutes={mins_between_scan}')
         # Configure SQLite connection for better concurrency handling
         # StaticPool maintains a single persistent connection per worker process
@@ -27,5 +51,24 @@ def init_schedule(dburl, mins_between_scan=5):
         scheduler = BackgroundScheduler(
             jobstores={'default': SQLAlchemyJobStore(url=dburl, engine_options=engine_options)}
         )
-        scheduler.add_job(fireshare_scan, 'interval', minutes=mins_between_scan, id='fireshare_scan', replace_existing=True)
         scheduler.start()
+        if mins_between_scan > 0:
+            scan_args = [str(data_path)] if data_path is not None else []
+            scheduler.add_job(fireshare_scan, 'interval', minutes=mins_between_scan, args=scan_args, id='fireshare_scan', replace_existing=True)
+        else:
+            _remove_job(scheduler, 'fireshare_scan')
+        if file_watcher:
+            scheduler.add_job(ensure_file_watcher, 'interval', minutes=1, args=[str(data_path)], id='ensure_file_watcher', replace_existing=True)
+        else:
+            _remove_job(scheduler, 'ensure_file_watcher')
+        if ingest_worker:
+            scheduler.add_job(ensure_ingest_worker, 'interval', minutes=1, args=[str(data_path)], id='ensure_ingest_worker', replace_existing=True)
+        else:
+            _remove_job(scheduler, 'ensure_ingest_worker')
+
+def _remove_job(scheduler, job_id):
+    # Jobs persist in the job store across restarts, so drop ones that are no longer configured
+    try:
+        scheduler.remove_job(job_id)
+    except JobLookupError:
+        pass
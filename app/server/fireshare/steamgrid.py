@@ -1,32 +1,194 @@
 """
 SteamGridDB API Integration
 Handles game search and asset retrieval from SteamGridDB API
+
+API responses are cached on disk (data/steamgriddb_cache) so repeated game
+scans don't query the same strings again. Misses are cached too, for a shorter
+time, and failed requests for a few minutes. All clients share one pooled
+session and a rate limiter.
 """
+import hashlib
+import json
+import os
+import threading
+import time
 import requests
 import logging
 from typing import Optional, List, Dict
 from pathlib import Path
 from PIL import Image as PILImage
 
+from fireshare.util import TokenBucket
+
 logger = logging.getLogger(__name__)
 
+_session = None
+_session_lock = threading.Lock()
+_rate_limiter = None
+
+
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _default_cache_dir() -> Optional[Path]:
+    from flask import current_app, has_app_context
+    if not has_app_context():
+        return None
+    paths = current_app.config.get('PATHS') or {}
+    return paths['data'] / 'steamgriddb_cache' if 'data' in paths else None
+
+
+class ResponseCache:
+    """
+    One JSON file per cached request, written atomically so concurrent scans
+    and web requests can share the directory.
+    """
+
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._last_prune = 0.0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def get(self, key: str):
+        """Returns (hit, value)."""
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return False, None
+        if entry.get("key") != key:
+            return False, None
+        if entry.get("expires", 0) < time.time():
+            path.unlink(missing_ok=True)
+            return False, None
+        return True, entry.get("value")
+
+    def set(self, key: str, value, ttl: float):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"key": key, "expires": time.time() + ttl, "value": value}, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write SteamGridDB cache entry: {e}")
+            return
+        if time.monotonic() - self._last_prune > self.PRUNE_INTERVAL:
+            self._last_prune = time.monotonic()
+            self.prune()
+
+    def prune(self):
+        """Delete expired entries and leftover temp files."""
+        now = time.time()
+        for path in self.directory.glob("*.json"):
+            try:
+                with open(path) as f:
+                    expired = json.load(f).get("expires", 0) < now
+            except (OSError, ValueError):
+                expired = True
+            if expired:
+                path.unlink(missing_ok=True)
+        for path in self.directory.glob("*.tmp"):
+            if now - path.stat().st_mtime > 3600:
+                path.unlink(missing_ok=True)
+
 
 class SteamGridDBClient:
     """Client for interacting with SteamGridDB API"""
 
     BASE_URL = "https://www.steamgriddb.com/api/v2"
 
-    def __init__(self, api_key: str):
+    # Cache lifetimes in seconds: found results, misses (empty result or 404)
+    # and failed requests (timeouts, 5xx, 429)
+    CACHE_TTL = 7 * 24 * 3600
+    ASSET_LIST_TTL = 24 * 3600
+    NEGATIVE_TTL = 24 * 3600
+    ERROR_TTL = 10 * 60
+
+    # Shared by every client in the process
+    RATE_LIMIT = 4  # requests per second
+    RATE_BURST = 8
+
+    def __init__(self, api_key: str, cache_dir: Path = None):
         """
         Initialize SteamGridDB client
 
         Args:
             api_key: SteamGridDB API key
+            cache_dir: Response cache directory; defaults to data/steamgriddb_cache
+                when called inside the app, otherwise responses are not cached
         """
+        global _rate_limiter
         self.api_key = api_key
         self.headers = {
             "Authorization": f"Bearer {api_key}"
         }
+        if cache_dir is None:
+            cache_dir = _default_cache_dir()
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.session = _get_session()
+        if _rate_limiter is None:
+            _rate_limiter = TokenBucket(self.RATE_LIMIT, self.RATE_BURST)
+
+    def _get_data(self, path: str, params: Dict = None, ttl: float = None, description: str = None):
+        """
+        GET an API path and return the response's data field, or None if
+        SteamGridDB has nothing for it or the request failed.
+        """
+        key = path + ("?" + json.dumps(params, sort_keys=True) if params else "")
+        if self.cache:
+            hit, value = self.cache.get(key)
+            if hit:
+                return value
+
+        _rate_limiter.consume(1)
+        try:
+            response = self.session.get(f"{self.BASE_URL}{path}", headers=self.headers, params=params, timeout=10)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error {description}: {e}")
+            self._cache_set(key, None, self.ERROR_TTL)
+            return None
+
+        if response.status_code == 404:
+            self._cache_set(key, None, self.NEGATIVE_TTL)
+            return None
+        try:
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            logger.error(f"Error {description}: {e}")
+            # A bad API key should start working as soon as it is fixed
+            if response.status_code not in (401, 403):
+                ttl_error = self.ERROR_TTL
+                if response.status_code == 429:
+                    try:
+                        ttl_error = max(ttl_error, float(response.headers.get("Retry-After", 0)))
+                    except ValueError:
+                        pass
+                self._cache_set(key, None, ttl_error)
+            return None
+
+        value = data.get("data") if data.get("success") else None
+        self._cache_set(key, value or None, ttl if value else self.NEGATIVE_TTL)
+        return value or None
+
+    def _cache_set(self, key: str, value, ttl: float):
+        if self.cache:
+            self.cache.set(key, value, ttl)
 
     def search_games(self, query: str) -> List[Dict]:
         """
@@ -38,19 +200,9 @@ class SteamGridDBClient:
         Returns:
             List of game dictionaries with id, name, release_date
         """
-        try:
-            url = f"{self.BASE_URL}/search/autocomplete/{query}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            if data.get("success") and data.get("data"):
-                return data["data"]
-            return []
-
-        except Exception as e:
-            logger.error(f"Error searching SteamGridDB for '{query}': {e}")
-            return []
+        from urllib.parse import quote
+        return self._get_data(f"/search/autocomplete/{quote(query.strip(), safe='')}", ttl=self.CACHE_TTL,
+                              description=f"searching SteamGridDB for '{query}'") or []
 
     def get_game_by_id(self, game_id: int) -> Optional[Dict]:
         """
@@ -62,19 +214,8 @@ class SteamGridDBClient:
         Returns:
             Game dictionary or None
         """
-        try:
-            url = f"{self.BASE_URL}/games/id/{game_id}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            if data.get("success") and data.get("data"):
-                return data["data"]
-            return None
-
-        except Exception as e:
-            logger.error(f"Error fetching game {game_id} from SteamGridDB: {e}")
-            return None
+        return self._get_data(f"/games/id/{game_id}", ttl=self.CACHE_TTL,
+                              description=f"fetching game {game_id} from SteamGridDB")
 
     def get_heroes(self, game_id: int, limit: int = 1) -> List[Dict]:
         """
@@ -87,20 +228,10 @@ class SteamGridDBClient:
         Returns:
             List of hero image dictionaries
         """
-        try:
-            url = f"{self.BASE_URL}/heroes/game/{game_id}"
-            params = {"dimensions": "1920x620,3840x1240"}  # Standard hero sizes
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            if data.get("success") and data.get("data"):
-                return data["data"][:limit]
-            return []
-
-        except Exception as e:
-            logger.error(f"Error fetching heroes for game {game_id}: {e}")
-            return []
+        params = {"dimensions": "1920x620,3840x1240"}  # Standard hero sizes
+        heroes = self._get_data(f"/heroes/game/{game_id}", params=params, ttl=self.ASSET_LIST_TTL,
+                                description=f"fetching heroes for game {game_id}")
+        return (heroes or [])[:limit]
 
     def get_logos(self, game_id: int, limit: int = 1) -> List[Dict]:
         """
@@ -113,19 +244,9 @@ class SteamGridDBClient:
         Returns:
             List of logo image dictionaries
         """
-        try:
-            url = f"{self.BASE_URL}/logos/game/{game_id}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            if data.get("success") and data.get("data"):
-                return data["data"][:limit]
-            return []
-
-        except Exception as e:
-            logger.error(f"Error fetching logos for game {game_id}: {e}")
-            return []
+        logos = self._get_data(f"/logos/game/{game_id}", ttl=self.ASSET_LIST_TTL,
+                               description=f"fetching logos for game {game_id}")
+        return (logos or [])[:limit]
 
     def get_icons(self, game_id: int, limit: int = 1) -> List[Dict]:
         """
@@ -138,19 +259,9 @@ class SteamGridDBClient:
         Returns:
             List of icon image dictionaries
         """
-        try:
-            url = f"{self.BASE_URL}/icons/game/{game_id}"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            if data.get("success") and data.get("data"):
-                return data["data"][:limit]
-            return []
-
-        except Exception as e:
-            logger.error(f"Error fetching icons for game {game_id}: {e}")
-            return []
+        icons = self._get_data(f"/icons/game/{game_id}", ttl=self.ASSET_LIST_TTL,
+                               description=f"fetching icons for game {game_id}")
+        return (icons or [])[:limit]
 
     def get_all_asset_options(self, game_id: int, limit: int = 8) -> Dict:
         """
@@ -228,7 +339,7 @@ class SteamGridDBClient:
             True on success, False on failure
         """
         try:
-            response = requests.get(url, stream=True, timeout=30)
+            response = self.session.get(url, stream=True, timeout=30)
             response.raise_for_status()
 
             # Write to file
@@ -1,4 +1,6 @@
 import os
+import contextlib
+import fcntl
 from pathlib import Path
 import json
 import subprocess as sp
@@ -9,7 +11,12 @@ import glob
 import shutil
 import re
 import threading
+import fnmatch
+import queue
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from flask import has_app_context
 
 # Corruption indicators to detect during video validation
 # These are ffmpeg error messages that indicate file corruption
@@ -48,20 +55,41 @@ AV1_CODEC_NAMES = frozenset([
     'av1_qsv',
 ])
 
+def _process_start_time(pid: int):
+    """
+    Start time of a process in clock ticks since boot (Linux), or None if unknown.
+    Together with the PID it identifies a process even after the PID is reused.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces; starttime is the 20th field after it
+    fields = stat[stat.rfind(')') + 2:].split()
+    return fields[19] if len(fields) > 19 else None
+
+def _read_lock(lockfile: Path):
+    """Returns (pid, start_time) from a lock file; start_time is None for locks written without one."""
+    parts = lockfile.read_text().split()
+    return int(parts[0]), (parts[1] if len(parts) > 1 else None)
+
 def lock_exists(path: Path, filename: str = "fireshare.lock"):
     """
     Checks if a lockfile exists and the owning process is still alive.
-    Automatically removes stale locks left by crashed processes.
+    Automatically removes stale locks left by crashed processes, including
+    locks whose PID now belongs to another process (e.g. after a container restart).
     """
     lockfile = path / filename
     if not lockfile.exists():
         return False
     try:
-        with open(lockfile, 'r') as f:
-            pid = int(f.read().strip())
+        pid, start_time = _read_lock(lockfile)
         os.kill(pid, 0)  # signal 0 just checks liveness, sends nothing
+        if start_time is not None and _process_start_time(pid) not in (None, start_time):
+            raise ProcessLookupError(f"PID {pid} was reused")
         return True
-    except (ValueError, ProcessLookupError, OSError):
+    except (ValueError, IndexError, ProcessLookupError, OSError):
         logger.debug(f"Removing stale lockfile at {str(lockfile)}")
         try:
             os.remove(lockfile)
@@ -69,15 +97,27 @@ def lock_exists(path: Path, filename: str = "fireshare.lock"):
             pass
         return False
 
+def lock_owner(path: Path, filename: str = "fireshare.lock"):
+    """
+    Returns the PID recorded in a lockfile, or None if there is no readable lock.
+    Does not check whether that process is still alive.
+    """
+    try:
+        return _read_lock(path / filename)[0]
+    except (OSError, ValueError, IndexError):
+        return None
+
 def create_lock(path: Path, filename: str = "fireshare.lock"):
     """
-    Creates the lock file, writing the current PID so stale locks can be detected.
+    Creates the lock file, writing the current PID and its start time so stale locks can be detected.
     """
     lockfile = path / filename
     if not lockfile.exists():
         logger.debug(f"A lockfile has been created at {str(lockfile)}")
+        pid = os.getpid()
+        start_time = _process_start_time(pid)
         with open(lockfile, 'w') as f:
-            f.write(str(os.getpid()))
+            f.write(f"{pid} {start_time}" if start_time else str(pid))
 
 def remove_lock(path: Path, filename: str = "fireshare.lock"):
     """
@@ -165,23 +205,351 @@ def clear_transcoding_status(data_path: Path):
             logger.warning(f"Failed to remove transcoding status file: {e}")
 
 
-def video_id(path: Path, mb=16):
+def _is_ignored(name, rel_path, ignore):
+    return any(fnmatch.fnmatch(name, pat) or fnmatch.fnmatch(rel_path, pat) for pat in ignore)
+
+def is_ignored_path(rel_path, ignore):
+    """Whether walk_files would skip rel_path (or one of its parent directories) for these ignore globs."""
+    if not ignore:
+        return False
+    parts = rel_path.split('/')
+    return any(_is_ignored(parts[i], '/'.join(parts[:i + 1]), ignore) for i in range(len(parts)))
+
+def walk_files(root: Path, extensions=None, ignore=(), name_filter=None, errors=None):
+    """
+    Lazily yield the files below root as Paths, in a stable (sorted) order.
+
+    Everything that can be decided from a name is checked before touching the
+    file: the extension, name_filter(name) and the ignore globs, which are
+    matched against both the entry name and its path relative to root (an
+    ignored directory is not descended into). File and directory checks use
+    the types cached on os.DirEntry, so plain files are never stat'ed here.
+    Symlinked directories are followed once. Directories that could not be
+    read are appended to errors, if given.
+    """
+    root = Path(root)
+    extensions = {e.lower() for e in extensions} if extensions else None
+    try:
+        st = root.stat()
+    except OSError as ex:
+        logger.warning(f"Unable to scan {root}: {ex}")
+        if errors is not None:
+            errors.append(root)
+        return
+    visited = {(st.st_dev, st.st_ino)}
+    stack = [(str(root), '')]
+    while stack:
+        dirpath, rel_dir = stack.pop()
+        try:
+            with os.scandir(dirpath) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as ex:
+            logger.warning(f"Unable to read directory {dirpath}: {ex}")
+            if errors is not None:
+                errors.append(Path(dirpath))
+            continue
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                if ignore and _is_ignored(entry.name, rel_path, ignore):
+                    continue
+                if entry.is_symlink():
+                    try:
+                        target = entry.stat()
+                    except OSError:
+                        continue
+                    if (target.st_dev, target.st_ino) in visited:
+                        continue
+                    visited.add((target.st_dev, target.st_ino))
+                subdirs.append((entry.path, rel_path))
+                continue
+            if extensions is not None and os.path.splitext(entry.name)[1].lower() not in extensions:
+                continue
+            if name_filter is not None and not name_filter(entry.name):
+                continue
+            if ignore and _is_ignored(entry.name, rel_path, ignore):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            yield Path(entry.path)
+        # Reverse so subdirectories are visited in sorted order
+        stack.extend(reversed(subdirs))
+
+def ordered_map(pool, fn, iterable, window):
+    """
+    Like pool.map, but consumes iterable lazily and keeps at most window calls
+    in flight. Results are yielded in input order.
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. consume() may overdraw the bucket; the caller then
+    sleeps off the debt, so concurrent callers are served in the order they asked.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, n):
+        """Take n tokens, sleeping until they are available. Returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+_BYTE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+def parse_byte_size(value: str) -> int:
+    """Parse sizes like '50M', '512k' or '1048576' (binary units, optional B/iB suffix)."""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?\s*', value.lower())
+    if not match:
+        raise ValueError(f"invalid size: {value!r}")
+    return int(float(match.group(1)) * _BYTE_UNITS[match.group(2)])
+
+# Content-id hashing reads go through _hash_range so they can be throttled and kept
+# from evicting pages nginx is serving. Counters are cumulative for the process.
+_HASH_CHUNK = 1024 * 1024
+_RWF_NOWAIT = getattr(os, 'RWF_NOWAIT', None) if hasattr(os, 'preadv') else None
+_scan_io_bucket = None
+_scan_io_lock = threading.Lock()
+scan_io_stats = {'bytes_read': 0, 'cached_bytes': 0, 'throttled_seconds': 0.0}
+
+def set_scan_io_limit(bytes_per_second):
+    """Limit content-id hashing to bytes_per_second of disk reads (None or 0 for no limit)."""
+    global _scan_io_bucket
+    _scan_io_bucket = TokenBucket(bytes_per_second) if bytes_per_second else None
+
+def _fadvise(fd, offset, length, advice):
+    if advice is not None and hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, offset, length, advice)
+        except OSError:
+            pass
+
+def _hash_range(fd, h, offset, length):
+    """
+    Feed up to length bytes starting at offset into h.
+
+    Bytes already in the page cache are read with RWF_NOWAIT and left alone so
+    hot clips stay cached. The rest counts against the scan I/O limit and is
+    dropped from the cache again once hashed.
+    """
+    end = min(offset + length, os.fstat(fd).st_size)
+    pos = offset
+    read = cached = 0
+    waited = 0.0
+    while pos < end:
+        want = min(_HASH_CHUNK, end - pos)
+        hot = 0
+        if _RWF_NOWAIT is not None:
+            buf = bytearray(want)
+            try:
+                hot = os.preadv(fd, [buf], pos, _RWF_NOWAIT)
+            except OSError:
+                hot = 0
+            if hot:
+                h.update(memoryview(buf)[:hot])
+        cold = b''
+        if hot < want:
+            bucket = _scan_io_bucket
+            if bucket is not None:
+                waited += bucket.consume(want - hot)
+            cold = os.pread(fd, want - hot, pos + hot)
+            if cold:
+                h.update(cold)
+                _fadvise(fd, pos + hot, len(cold), getattr(os, 'POSIX_FADV_DONTNEED', None))
+        cached += hot
+        read += len(cold)
+        got = hot + len(cold)
+        pos += got
+        if got < want:
+            break
+    with _scan_io_lock:
+        scan_io_stats['bytes_read'] += read
+        scan_io_stats['cached_bytes'] += cached
+        scan_io_stats['throttled_seconds'] += waited
+
+def _open_for_hash(path):
+    fd = os.open(path, os.O_RDONLY)
+    # No readahead, so RWF_NOWAIT only reports pages that were cached before we
+    # opened the file; the 1MB reads are large enough on their own.
+    _fadvise(fd, 0, 0, getattr(os, 'POSIX_FADV_RANDOM', None))
+    # Pages this fd faults in are not promoted to the active list (Linux 6.3+)
+    _fadvise(fd, 0, 0, getattr(os, 'POSIX_FADV_NOREUSE', None))
+    return fd
+
+def head_content_id(path: Path, mb=16) -> str:
+    """Hashes the first mb megabytes of a file (or the whole file if it's less than that)."""
+    h = xxhash.xxh3_128()
+    fd = _open_for_hash(path)
+    try:
+        _hash_range(fd, h, 0, int(1024*1024*mb))
+    finally:
+        os.close(fd)
+    return h.hexdigest()
+
+def video_id(path: Path, mb=16, sparse=False):
     """
     Calculates the id of a video by using xxhash on the first 16mb (or the whole file if it's less than that)
+    If sparse is set, uses sparse_content_id instead.
     """
-    with path.open('rb', 0) as f:
-        file_header = f.read(int(1024*1024*mb))
-    return xxhash.xxh3_128_hexdigest(file_header)
+    if sparse:
+        return sparse_content_id(path)
+    return head_content_id(path, mb)
+
+# Sparse ids hash the file size plus SPARSE_SAMPLES blocks spread evenly from the
+# first to the last byte: 2MB of reads per file instead of 16MB, and files that
+# share an identical intro still get different ids.
+SPARSE_SAMPLES = 8
+SPARSE_BLOCK_SIZE = 256 * 1024
+
+def sparse_content_id(path: Path) -> str:
+    """Calculates a content id from the file size and evenly spaced samples (head, middle and tail)."""
+    fd = _open_for_hash(path)
+    try:
+        size = os.fstat(fd).st_size
+        h = xxhash.xxh3_128()
+        h.update(size.to_bytes(8, 'little'))
+        if size <= SPARSE_SAMPLES * SPARSE_BLOCK_SIZE:
+            _hash_range(fd, h, 0, size)
+        else:
+            span = size - SPARSE_BLOCK_SIZE
+            for i in range(SPARSE_SAMPLES):
+                _hash_range(fd, h, span * i // (SPARSE_SAMPLES - 1), SPARSE_BLOCK_SIZE)
+    finally:
+        os.close(fd)
+    return h.hexdigest()
+
+CONTENT_ID_MODES = ('head', 'sparse')
+CONTENT_ID_MODE_FILE = "content_id_mode"
 
-def get_media_info(path):
+def read_content_id_mode(data_path: Path) -> str:
+    """The id scheme existing rows are keyed with. Libraries created before sparse ids existed use 'head'."""
     try:
-        cmd = f'ffprobe -v quiet -print_format json -show_entries stream {path}'
-        logger.debug(f"$ {cmd}")
-        data = json.loads(sp.check_output(cmd.split()).decode('utf-8'))
-        return data['streams']
-    except Exception as ex:
+        mode = (data_path / CONTENT_ID_MODE_FILE).read_text().strip()
+    except OSError:
+        return 'head'
+    return mode if mode in CONTENT_ID_MODES else 'head'
+
+def write_content_id_mode(data_path: Path, mode: str):
+    (data_path / CONTENT_ID_MODE_FILE).write_text(mode)
+
+# Parsed ffprobe output shared by every helper that needs stream or format info.
+# Keyed by the resolved file path and only reused while (size, mtime) is unchanged.
+_PROBE_MEMO_SIZE = 256
+_probe_memo = OrderedDict()
+_probe_memo_lock = threading.Lock()
+# Lookups answered from the memo or media_probe vs. lookups that ran ffprobe; guarded by _probe_memo_lock
+probe_cache_stats = {'hits': 0, 'misses': 0}
+
+def _run_ffprobe(path, timeout=None):
+    cmd = ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', str(path)]
+    logger.debug(f"$ {' '.join(cmd)}")
+    result = sp.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"ffprobe exited with code {result.returncode}")
+    return json.loads(result.stdout)
+
+def probe_media(path, video_id=None, timeout=60, count=True):
+    """
+    Get the parsed `ffprobe -show_format -show_streams` output for a media file.
+
+    Results are memoized per process and, when called inside an app context with
+    a video_id, persisted in the media_probe table so later runs can skip
+    ffprobe entirely. Cached results are only used while the file's size and
+    mtime are unchanged. video_id defaults to the name of a video_links symlink.
+    Pass count=False when re-reading a result that an earlier call (e.g. a
+    prefetch on a pool thread) already counted in probe_cache_stats.
+
+    Returns:
+        dict with 'streams' and 'format', or None if the file could not be probed.
+        The returned dict is shared and must not be modified.
+    """
+    try:
+        st = os.stat(path)
+    except OSError as ex:
+        logger.debug(f"Could not stat {path} for probing: {ex}")
+        return None
+    key = os.path.realpath(path)
+    signature = (st.st_size, st.st_mtime_ns)
+    if video_id is None and Path(path).parent.name == 'video_links':
+        video_id = Path(path).stem
+    use_db = bool(video_id) and has_app_context()
+
+    with _probe_memo_lock:
+        cached = _probe_memo.get(key)
+        if cached and cached[0] == signature:
+            _probe_memo.move_to_end(key)
+    data = cached[1] if cached and cached[0] == signature else None
+    stored = data is not None and cached[2] == video_id
+
+    row = None
+    if use_db and not stored:
+        from . import db
+        from .models import MediaProbe
+        row = MediaProbe.query.filter_by(video_id=video_id).first()
+        if row and (row.size, row.mtime_ns) == signature:
+            stored = True
+            if data is None:
+                data = json.loads(row.data)
+
+    if count:
+        with _probe_memo_lock:
+            probe_cache_stats['hits' if data is not None else 'misses'] += 1
+    if data is None:
+        try:
+            data = _run_ffprobe(path, timeout)
+        except Exception as ex:
+            logger.debug(f"Could not probe {path}: {ex}")
+            return None
+
+    if use_db and not stored:
+        # Staged on the caller's session and saved with its next commit
+        if row is None:
+            row = MediaProbe(video_id=video_id)
+            db.session.add(row)
+        row.size, row.mtime_ns = signature
+        row.data = json.dumps(data)
+        row.probed_at = datetime.utcnow()
+        stored = True
+
+    with _probe_memo_lock:
+        _probe_memo[key] = (signature, data, video_id if stored else None)
+        _probe_memo.move_to_end(key)
+        while len(_probe_memo) > _PROBE_MEMO_SIZE:
+            _probe_memo.popitem(last=False)
+    return data
+
+def get_media_info(path, count=True):
+    data = probe_media(path, count=count)
+    if data is None or 'streams' not in data:
         logger.warning('Could not extract video info')
         return None
+    return data['streams']
 
 def get_video_duration(path):
     """
@@ -193,13 +561,11 @@ def get_video_duration(path):
     Returns:
         float: Duration in seconds, or None if unable to determine
     """
+    data = probe_media(path)
     try:
-        cmd = ['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_entries', 'format=duration', str(path)]
-        logger.debug(f"$ {' '.join(cmd)}")
-        data = json.loads(sp.check_output(cmd).decode('utf-8'))
-        if 'format' in data and 'duration' in data['format']:
+        if data and 'format' in data and 'duration' in data['format']:
             return float(data['format']['duration'])
-    except Exception as ex:
+    except (TypeError, ValueError) as ex:
         logger.debug(f'Could not extract video duration: {ex}')
     return None
 
@@ -231,28 +597,15 @@ def validate_video_file(path, timeout=30):
 
     try:
         # First, check if ffprobe can read the stream information
-        probe_cmd = [
-            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
-            '-show_entries', 'stream=codec_name,width,height',
-            '-of', 'json', str(path)
-        ]
-        logger.debug(f"Validating video file: {' '.join(probe_cmd)}")
-
-        probe_result = sp.run(probe_cmd, capture_output=True, text=True, timeout=timeout)
-
-        if probe_result.returncode != 0:
-            error_msg = probe_result.stderr.strip() if probe_result.stderr else "Unknown error reading video metadata"
-            return False, f"ffprobe failed: {error_msg}", None
+        logger.debug(f"Validating video file: {path}")
+        probe_data = probe_media(path, timeout=timeout)
+        if probe_data is None:
+            return False, "ffprobe failed: unable to read video metadata", None
 
         # Check if we got valid stream data
-        # Note: -select_streams v:0 in probe_cmd ensures only video streams are returned
-        try:
-            probe_data = json.loads(probe_result.stdout)
-            streams = probe_data.get('streams', [])
-            if not streams:
-                return False, "No video streams found in file", None
-        except json.JSONDecodeError:
-            return False, "Failed to parse video metadata", None
+        streams = [st for st in probe_data.get('streams', []) if st.get('codec_type') == 'video']
+        if not streams:
+            return False, "No video streams found in file", None
 
         # Get the codec name from the video stream
         # Safe to access streams[0] because we checked for empty streams above
@@ -352,6 +705,12 @@ def validate_video_file(path, timeout=30):
         return False, f"Validation error: {str(ex)}", None
 
 
+def _timeout_for_duration(duration):
+    # Use 60x the video duration as timeout (assumes worst case 20x encoding + 3x safety margin)
+    # Minimum of 600 seconds (10 minutes) for very short videos
+    # Cap at 8 hours to prevent truly stuck processes
+    return min(max(int(duration * 60), 600), 28800)
+
 def calculate_transcode_timeout(video_path, base_timeout=7200):
     """
     Calculate a smart timeout for video transcoding based on video duration.
@@ -371,11 +730,7 @@ def calculate_transcode_timeout(video_path, base_timeout=7200):
     duration = get_video_duration(video_path)
     
     if duration:
-        # Use 60x the video duration as timeout (assumes worst case 20x encoding + 3x safety margin)
-        # Minimum of 600 seconds (10 minutes) for very short videos
-        calculated_timeout = max(int(duration * 60), 600)
-        # Cap at 8 hours to prevent truly stuck processes
-        calculated_timeout = min(calculated_timeout, 28800)
+        calculated_timeout = _timeout_for_duration(duration)
         logger.debug(f"Calculated transcode timeout: {calculated_timeout}s for video duration {duration}s")
         return calculated_timeout
     else:
@@ -430,9 +785,15 @@ def create_audio_extract(source_path, out_path):
 
 def create_poster(video_path, out_path, second=0):
     s = time.time()
-    cmd = ['ffmpeg', '-v', 'quiet', '-y', '-i', str(video_path), '-ss', str(second), '-vframes', '1', '-vf', 'scale=iw:ih:force_original_aspect_ratio=decrease', str(out_path)]
+    # Written under a temporary name so an interrupted run never leaves a partial poster behind
+    out_path = Path(out_path)
+    tmp_path = out_path.with_name(f"{out_path.stem}.tmp{out_path.suffix}")
+    cmd = ['ffmpeg', '-v', 'quiet', '-y', '-i', str(video_path), '-ss', str(second), '-vframes', '1', '-vf', 'scale=iw:ih:force_original_aspect_ratio=decrease', str(tmp_path)]
     logger.debug(f"$ {' '.join(cmd)}")
-    sp.call(cmd)
+    if sp.call(cmd) == 0 and tmp_path.exists():
+        os.replace(tmp_path, out_path)
+    else:
+        tmp_path.unlink(missing_ok=True)
     e = time.time()
     logger.debug(f'Generated poster {str(out_path)} in {e-s}s')
 
@@ -448,11 +809,11 @@ def is_image_file(path: Path) -> bool:
     return path.suffix.lower() in SUPPORTED_IMAGE_EXTENSIONS
 
 
-def image_id(path: Path, mb: int = 16) -> str:
-    """Calculate a unique ID for an image using xxhash on the first 16 MB."""
-    with path.open('rb', 0) as f:
-        file_header = f.read(int(1024 * 1024 * mb))
-    return xxhash.xxh3_128_hexdigest(file_header)
+def image_id(path: Path, mb: int = 16, sparse: bool = False) -> str:
+    """Calculate a unique ID for an image using xxhash on the first 16 MB (or sparse_content_id if sparse)."""
+    if sparse:
+        return sparse_content_id(path)
+    return head_content_id(path, mb)
 
 
 def create_image_webp(src_path: Path, out_path: Path, quality: int = 90) -> bool:
@@ -529,21 +890,177 @@ def check_dav1d_available():
     return _dav1d_available_cache
 
 # Cache for the working encoder to avoid trying failed encoders repeatedly
-# Format: {'gpu': encoder_dict, 'cpu': encoder_dict}
+# Format: {'gpu/auto': encoder_dict, 'cpu/h264': encoder_dict, ...}, keyed by mode and encoder preference,
 # where encoder_dict contains 'name', 'video_codec', 'audio_codec', 'extra_args'
-_working_encoder_cache = {'gpu': None, 'cpu': None}
+_working_encoder_cache = {}
+
+# Every transcode runs in a new process, so detected encoders are also stored in the
+# data directory, keyed by the ffmpeg build they were detected with
+ENCODER_CACHE_FILE = "encoder_cache.json"
+_ENCODER_PROBE_TIMEOUT = 30
+# Present in the container when a GPU is passed through; a change re-runs GPU detection
+_NVIDIA_DEVICE = '/dev/nvidiactl'
+
+# Directory added to LD_LIBRARY_PATH so ffmpeg can load NVENC, remembered with the encoder
+_nvenc_library_dir = None
+
+# Version line of the installed ffmpeg ('' = could not run it)
+_ffmpeg_version_cache = None
 
 def clear_nvenc_cache():
     """Clear the NVENC availability cache to force a re-check."""
     global _nvenc_availability_cache
     _nvenc_availability_cache = {}
 
-def clear_encoder_cache():
-    """Clear the working encoder cache to force encoder re-detection."""
+def clear_encoder_cache(data_path=None):
+    """Clear the working encoder cache, in memory and on disk, to force encoder re-detection."""
     global _working_encoder_cache
-    _working_encoder_cache = {'gpu': None, 'cpu': None}
+    _working_encoder_cache = {}
+    cache_path = _encoder_cache_path(data_path)
+    if cache_path is not None:
+        try:
+            cache_path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as ex:
+            logger.warning(f"Could not remove encoder cache {cache_path}: {ex}")
     logger.info("Encoder cache cleared - will re-detect working encoders on next transcode")
 
+def ffmpeg_version():
+    """The version line of the installed ffmpeg, or None if it cannot be run. Result is cached."""
+    global _ffmpeg_version_cache
+    if _ffmpeg_version_cache is None:
+        try:
+            result = sp.run(['ffmpeg', '-version'], capture_output=True, text=True, timeout=10)
+            first_line = result.stdout.splitlines()[0] if result.returncode == 0 and result.stdout else ''
+            _ffmpeg_version_cache = first_line.split(' Copyright')[0].strip()
+        except Exception:
+            _ffmpeg_version_cache = ''
+    return _ffmpeg_version_cache or None
+
+def _data_directory(data_path=None):
+    data_dir = data_path or os.environ.get('DATA_DIRECTORY')
+    return Path(data_dir) if data_dir else None
+
+def _encoder_cache_path(data_path=None):
+    data_dir = _data_directory(data_path)
+    return data_dir / ENCODER_CACHE_FILE if data_dir else None
+
+def _read_encoder_cache(cache_path):
+    """Encoder entries detected with the installed ffmpeg; {} if there are none or they are from another build."""
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('ffmpeg') != ffmpeg_version():
+        return {}
+    return cache.get('encoders') or {}
+
+def _write_encoder_cache(cache_path, key, entry):
+    """Store entry under key, or remove key when entry is None, replacing the file atomically."""
+    version = ffmpeg_version()
+    if cache_path is None or version is None:
+        return
+    entries = _read_encoder_cache(cache_path)
+    if entry is None:
+        if entries.pop(key, None) is None:
+            return
+    else:
+        entries[key] = entry
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'ffmpeg': version, 'encoders': entries}, f, indent=2)
+        os.replace(tmp_path, cache_path)
+    except OSError as ex:
+        logger.warning(f"Could not write encoder cache {cache_path}: {ex}")
+        with contextlib.suppress(OSError):
+            tmp_path.unlink()
+
+def _add_library_path(library_dir):
+    global _nvenc_library_dir
+    current_ld_path = os.environ.get('LD_LIBRARY_PATH', '')
+    if library_dir not in current_ld_path.split(':'):
+        os.environ['LD_LIBRARY_PATH'] = f"{library_dir}:{current_ld_path}" if current_ld_path else library_dir
+        logger.debug(f"Added {library_dir} to LD_LIBRARY_PATH from the encoder cache")
+    _nvenc_library_dir = library_dir
+
+def probe_encoder(encoder):
+    """
+    Check that ffmpeg can encode with encoder by running it on half a second of a
+    generated test pattern, which takes a fraction of a second instead of a real transcode.
+    """
+    cmd = ['ffmpeg', '-hide_banner', '-v', 'error',
+           '-f', 'lavfi', '-i', 'testsrc2=size=320x240:rate=30',
+           '-f', 'lavfi', '-i', 'anullsrc=r=48000:cl=stereo',
+           '-t', '0.5', '-c:v', encoder['video_codec'], *encoder.get('extra_args', []),
+           '-c:a', encoder['audio_codec'], '-b:a', encoder.get('audio_bitrate', '128k'),
+           '-f', 'null', '-']
+    try:
+        result = sp.run(cmd, capture_output=True, text=True, timeout=_ENCODER_PROBE_TIMEOUT)
+    except Exception as ex:
+        logger.debug(f"{encoder['name']} probe failed: {ex}")
+        return False
+    if result.returncode != 0:
+        logger.debug(f"{encoder['name']} probe failed: {result.stderr.strip()[-500:]}")
+    return result.returncode == 0
+
+def working_encoder(use_gpu=False, encoder_preference='auto', data_path=None):
+    """
+    The encoder transcodes should start with, or None if no candidate passes its probe.
+
+    Candidates are probed in priority order once per ffmpeg build (and, for GPU
+    mode, per GPU device presence); the result is kept in data_path (default:
+    DATA_DIRECTORY) for every other transcode process until it fails.
+    """
+    key = f"{'gpu' if use_gpu else 'cpu'}/{encoder_preference}"
+    if _working_encoder_cache.get(key) is not None:
+        return _working_encoder_cache[key]
+
+    candidates = _get_encoder_candidates(use_gpu, encoder_preference)
+    by_name = {encoder['name']: encoder for encoder in candidates}
+    gpu_device = os.path.exists(_NVIDIA_DEVICE) if use_gpu else None
+    cache_path = _encoder_cache_path(data_path)
+    entry = _read_encoder_cache(cache_path).get(key) if cache_path is not None else None
+    if entry and entry.get('encoder') in by_name and entry.get('gpu_device') == gpu_device:
+        if entry.get('library_dir'):
+            _add_library_path(entry['library_dir'])
+        encoder = by_name[entry['encoder']]
+        logger.debug(f"Using cached {key} encoder: {encoder['name']}")
+        _working_encoder_cache[key] = encoder
+        return encoder
+
+    if use_gpu:
+        # Only worth diagnosing on detection; the outcome is cached with the encoder
+        _check_nvenc_setup()
+    logger.info(f"Detecting working {key} encoder for {ffmpeg_version() or 'ffmpeg'}...")
+    for encoder in candidates:
+        if probe_encoder(encoder):
+            logger.info(f"✓ {encoder['name']} works! Using it for all transcodes until it fails.")
+            remember_encoder(encoder, use_gpu, encoder_preference, data_path)
+            return encoder
+        logger.warning(f"✗ {encoder['name']} is not usable with this ffmpeg build")
+    logger.warning(f"No {key} encoder passed its probe; will try them on the video itself")
+    return None
+
+def remember_encoder(encoder, use_gpu=False, encoder_preference='auto', data_path=None):
+    """Use encoder for later transcodes in this and every other process."""
+    key = f"{'gpu' if use_gpu else 'cpu'}/{encoder_preference}"
+    _working_encoder_cache[key] = encoder
+    _write_encoder_cache(_encoder_cache_path(data_path), key, {
+        'encoder': encoder['name'],
+        'gpu_device': os.path.exists(_NVIDIA_DEVICE) if use_gpu else None,
+        'library_dir': _nvenc_library_dir if use_gpu else None,
+        'detected_at': datetime.utcnow().isoformat(),
+    })
+
+def forget_encoder(use_gpu=False, encoder_preference='auto', data_path=None):
+    """Drop the cached encoder after it failed so the next transcode detects one again."""
+    key = f"{'gpu' if use_gpu else 'cpu'}/{encoder_preference}"
+    _working_encoder_cache.pop(key, None)
+    _write_encoder_cache(_encoder_cache_path(data_path), key, None)
+
 def diagnose_nvenc_setup():
     """
     Diagnose NVENC setup issues and log helpful information.
@@ -644,6 +1161,95 @@ def check_nvenc_available(encoder=None):
         return False
 
 
+def _check_nvenc_setup():
+    """
+    Log why NVENC is not available to ffmpeg, adding the NVIDIA encode library
+    to LD_LIBRARY_PATH when that is what is missing.
+    """
+    global _nvenc_library_dir
+    if not check_nvenc_available():
+        logger.warning("GPU transcoding requested but NVENC not available in ffmpeg")
+        
+        # Run diagnostics to help user understand the issue
+        diag = diagnose_nvenc_setup()
+        
+        if diag['nvidia_smi_available']:
+            logger.warning("✓ GPU is accessible (nvidia-smi works)")
+            logger.warning("✗ But NVENC encoder is not available to ffmpeg")
+            logger.warning("")
+            
+            # Try to automatically fix the library path issue
+            if diag['libnvidia_encode_found'] and diag['library_paths'] and len(diag['library_paths']) > 0:
+                library_dir = str(Path(diag['library_paths'][0]).parent)
+                current_ld_path = os.environ.get('LD_LIBRARY_PATH', '')
+                current_paths = current_ld_path.split(':') if current_ld_path else []
+                
+                # Add the library directory to LD_LIBRARY_PATH if not already present
+                if library_dir not in current_paths:
+                    new_ld_path = f"{library_dir}:{current_ld_path}" if current_ld_path else library_dir
+                    os.environ['LD_LIBRARY_PATH'] = new_ld_path
+                    _nvenc_library_dir = library_dir
+                    logger.info(f"Automatically added {library_dir} to LD_LIBRARY_PATH")
+                    
+                    # Clear the cache and retry the check
+                    clear_nvenc_cache()
+                    
+                    if check_nvenc_available():
+                        logger.info("✓ NVENC is now available! Continuing with GPU transcoding")
+                        # Don't set use_gpu to False, let it continue
+                    else:
+                        logger.warning("✗ NVENC still not available after adding library path")
+                        logger.warning("Common causes on Unraid/Docker:")
+                        logger.warning("  1. NVIDIA driver libraries not mounted in container")
+                        logger.warning("     Solution: Add to docker run or docker-compose:")
+                        logger.warning("       --gpus all")
+                        logger.warning("       or")
+                        logger.warning("       runtime: nvidia")
+                        logger.warning("")
+                        logger.warning("  2. FFmpeg not compiled with NVENC support")
+                        logger.warning("     (This shouldn't happen with the official image)")
+                        logger.warning("")
+                        logger.warning("See: https://docs.nvidia.com/datacenter/cloud-native/container-toolkit/install-guide.html")
+                        logger.info("Will attempt GPU transcoding anyway and fall back to CPU if needed")
+                else:
+                    logger.warning(f"Library found at: {diag['library_paths'][0]}")
+                    logger.warning(f"But {library_dir} is already in LD_LIBRARY_PATH")
+                    logger.warning("Common causes on Unraid/Docker:")
+                    logger.warning("  1. NVIDIA driver libraries not mounted in container")
+                    logger.warning("     Solution: Add to docker run or docker-compose:")
+                    logger.warning("       --gpus all")
+                    logger.warning("       or")
+                    logger.warning("       runtime: nvidia")
+                    logger.warning("")
+                    logger.warning("  2. FFmpeg not compiled with NVENC support")
+                    logger.warning("     (This shouldn't happen with the official image)")
+                    logger.warning("")
+                    logger.warning("See: https://docs.nvidia.com/datacenter/cloud-native/container-toolkit/install-guide.html")
+                    logger.info("Will attempt GPU transcoding anyway and fall back to CPU if needed")
+            else:
+                logger.warning("Common causes on Unraid/Docker:")
+                logger.warning("  1. NVIDIA driver libraries not mounted in container")
+                logger.warning("     Solution: Add to docker run or docker-compose:")
+                logger.warning("       --gpus all")
+                logger.warning("       or")
+                logger.warning("       runtime: nvidia")
+                logger.warning("")
+                logger.warning("  2. Missing libnvidia-encode.so.1 library")
+                logger.warning("     ✗ Library not found in standard paths")
+                logger.warning("     Ensure NVIDIA Container Toolkit is installed on host")
+                logger.warning("")
+                logger.warning("See: https://docs.nvidia.com/datacenter/cloud-native/container-toolkit/install-guide.html")
+                logger.info("Will attempt GPU transcoding anyway and fall back to CPU if needed")
+        else:
+            logger.warning("Common causes:")
+            logger.warning("  1. NVIDIA drivers are not installed on the host")
+            logger.warning("  2. NVIDIA Container Toolkit is not installed")
+            logger.warning("  3. Docker is not configured with the nvidia runtime")
+            logger.warning("  4. The GPU does not support NVENC")
+            logger.warning("")
+            logger.warning("See: https://docs.nvidia.com/datacenter/cloud-native/container-toolkit/install-guide.html")
+            logger.info("Will attempt GPU transcoding anyway and fall back to CPU if needed")
+
 
 def transcode_video(video_path, out_path):
     s = time.time()
@@ -654,6 +1260,65 @@ def transcode_video(video_path, out_path):
     e = time.time()
     logger.debug(f'Transcoded {str(out_path)} in {e-s}s')
 
+# Sources browsers play as they are: 8-bit 4:2:0 H.264 in a profile every browser decodes
+_REMUX_PROFILES = ('Constrained Baseline', 'Baseline', 'Main', 'High')
+_REMUX_PIX_FMTS = ('yuv420p', 'yuvj420p')
+# How much taller than a rendition a source may be and still be copied in its place (e.g. 1088p for 1080p)
+REMUX_HEIGHT_TOLERANCE = 0.05
+# Audio codecs that are copied into web mp4s instead of being encoded again
+COPY_AUDIO_CODECS = ('aac', 'opus')
+
+def _first_stream(streams, codec_type):
+    return next((s for s in streams if s.get('codec_type') == codec_type), None)
+
+def can_remux(streams, height=None):
+    """
+    Whether the video stream of streams (ffprobe streams, as stored in VideoInfo.info)
+    can be copied into a web mp4 as is. With height, the source must also be at most
+    REMUX_HEIGHT_TOLERANCE taller than that rendition.
+    """
+    video = _first_stream(streams, 'video')
+    if video is None or video.get('codec_name') != 'h264':
+        return False
+    if video.get('profile') not in _REMUX_PROFILES or video.get('pix_fmt') not in _REMUX_PIX_FMTS:
+        return False
+    if height is not None and not 0 < int(video.get('height') or 0) <= height * (1 + REMUX_HEIGHT_TOLERANCE):
+        return False
+    return True
+
+def can_copy_audio(streams):
+    """Whether the audio of streams can be copied into a web mp4; True when there is no audio."""
+    audio = _first_stream(streams, 'audio')
+    return audio is None or audio.get('codec_name') in COPY_AUDIO_CODECS
+
+def remux_video(video_path, out_path, copy_audio=True, timeout_seconds=600):
+    """
+    Copy the video stream of video_path into an mp4 with the index at the front
+    (+faststart) so browsers can start playing before it has downloaded. Audio is
+    copied as well when copy_audio is set, otherwise encoded to AAC. Written to a
+    temp file and renamed into place. Returns True on success.
+    """
+    s = time.time()
+    tmp_path = out_path.parent / (out_path.stem + '.tmp.mp4')
+    cmd = ['ffmpeg', '-v', 'warning', '-y', '-i', str(video_path), '-map', '0:v:0', '-map', '0:a:0?', '-c:v', 'copy']
+    cmd.extend(['-c:a', 'copy'] if copy_audio else ['-c:a', 'aac', '-b:a', '128k'])
+    cmd.extend(['-movflags', '+faststart', str(tmp_path)])
+    logger.debug(f"$: {' '.join(cmd)}")
+    try:
+        result = sp.run(cmd, capture_output=True, text=True, timeout=timeout_seconds)
+    except sp.TimeoutExpired:
+        result = None
+        logger.warning(f"Remuxing {video_path} timed out after {timeout_seconds} seconds")
+    if result is None or result.returncode != 0:
+        if result is not None:
+            logger.warning(f"Remuxing {video_path} failed with exit code {result.returncode}: {result.stderr.strip()[-500:]}")
+        with contextlib.suppress(OSError):
+            tmp_path.unlink()
+        return False
+    tmp_path.rename(out_path)
+    logger.info(f"Remuxed {out_path} in {time.time()-s:.2f}s")
+    return True
+
 def _get_encoder_candidates(use_gpu=False, encoder_preference='auto'):
     """
     Get the list of encoder configurations to try in priority order.
@@ -707,12 +1372,14 @@ def _get_encoder_candidates(use_gpu=False, encoder_preference='auto'):
             return [h264_nvenc, av1_nvenc, h264_cpu, av1_cpu]
         return [h264_cpu, av1_cpu]
 
-def run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds=None, data_path=None):
+def run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds=None, data_path=None, on_progress=None):
     """
     Run an FFmpeg command with real-time progress tracking via -progress flag.
 
     If data_path is provided, reads the existing status file and updates it with
-    percent/speed. Progress is throttled to every 0.5 seconds to avoid I/O overhead.
+    percent/speed. If on_progress is provided, it is called with (percent,
+    eta_seconds) instead, for callers that aggregate several running jobs.
+    Progress is throttled to every 0.5 seconds to avoid I/O overhead.
     stderr is drained in a background thread to prevent pipe buffer deadlock and
     is logged at warning level if the process exits with a non-zero code.
     """
@@ -724,7 +1391,7 @@ def run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds=None, data_pat
     # an upload scan resetting total=0) from being silently preserved through the
     # read-modify-write that happens on every progress tick.
     status_snapshot = {}
-    if data_path:
+    if data_path and not on_progress:
         existing = read_transcoding_status(data_path)
         status_snapshot = {
             'current': existing.get('current', 0),
@@ -764,7 +1431,8 @@ def run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds=None, data_pat
             if key == 'out_time_us' and total_duration:
                 try:
                     current_us = int(value)
-                    current_seconds = current_us / 1_000_000
+                    # ffmpeg reports a negative out_time before the first frame is muxed
+                    current_seconds = max(0, current_us / 1_000_000)
                     percent = min(100, (current_seconds / total_duration) * 100)
                 except ValueError:
                     pass
@@ -778,13 +1446,18 @@ def run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds=None, data_pat
             elif key == 'progress':
                 # 'continue' or 'end' - good time to update status
                 now = time.time()
-                if now - last_update >= 0.5 and data_path and percent is not None:
+                if now - last_update >= 0.5 and (data_path or on_progress) and percent is not None:
                     # Calculate ETA: remaining time / encoding speed
                     eta_seconds = None
                     if speed and speed > 0 and total_duration:
                         remaining_seconds = total_duration - current_seconds
                         eta_seconds = remaining_seconds / speed
 
+                    if on_progress:
+                        on_progress(percent, eta_seconds)
+                        last_update = now
+                        continue
+
                     # Update status using the snapshot captured before ffmpeg started.
                     # This prevents a concurrent write (e.g. an upload scan resetting
                     # total=0 mid-transcode) from corrupting task count or PID.
@@ -816,7 +1489,12 @@ def run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds=None, data_pat
     return process
 
 
-def _build_transcode_command(video_path, out_path, height, encoder, input_decoder=None):
+def _audio_args(encoder, copy_audio=False):
+    if copy_audio:
+        return ['-c:a', 'copy']
+    return ['-c:a', encoder['audio_codec'], '-b:a', encoder.get('audio_bitrate', '128k')]
+
+def _build_transcode_command(video_path, out_path, height, encoder, input_decoder=None, threads=None, copy_audio=False):
     """Build an ffmpeg command for transcoding with the given encoder."""
     cmd = ['ffmpeg', '-v', 'warning', '-stats', '-y']
     if input_decoder:
@@ -829,17 +1507,310 @@ def _build_transcode_command(video_path, out_path, height, encoder, input_decode
         cmd.extend(encoder['extra_args'])
     
     cmd.extend(['-vf', f'scale=-2:{height}'])
-    cmd.extend(['-c:a', encoder['audio_codec'], '-b:a', encoder.get('audio_bitrate', '128k')])
+    cmd.extend(_audio_args(encoder, copy_audio))
+    if threads:
+        cmd.extend(['-threads', str(threads)])
     cmd.append(str(out_path))
     
     return cmd
 
+def _build_ladder_command(video_path, outputs, encoder, input_decoder=None, threads=None, copy_audio=False, audio=True):
+    """
+    Build one ffmpeg command that decodes the source once and writes every
+    (height, out_path) in outputs, splitting the decoded video into a scale
+    and encode branch per output. With audio=False the outputs are video only.
+    """
+    cmd = ['ffmpeg', '-v', 'warning', '-stats', '-y']
+    if input_decoder:
+        cmd.extend(['-c:v', input_decoder])
+    cmd.extend(['-i', str(video_path)])
+    branches = ''.join(f'[s{i}]' for i in range(len(outputs)))
+    graph = [f'[0:v:0]split={len(outputs)}{branches}']
+    graph.extend(f'[s{i}]scale=-2:{height}[v{i}]' for i, (height, _) in enumerate(outputs))
+    cmd.extend(['-filter_complex', ';'.join(graph)])
+    for i, (height, out_path) in enumerate(outputs):
+        cmd.extend(['-map', f'[v{i}]'])
+        if audio:
+            cmd.extend(['-map', '0:a:0?'])
+        cmd.extend(['-c:v', encoder['video_codec']])
+        cmd.extend(encoder.get('extra_args', []))
+        cmd.extend(_audio_args(encoder, copy_audio) if audio else ['-an'])
+        if threads:
+            cmd.extend(['-threads', str(threads)])
+        cmd.append(str(out_path))
+    return cmd
+
+def cpu_cores():
+    """CPU cores this process may run on (honours container cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def transcode_concurrency(configured=0, use_gpu=False):
+    """
+    Number of encodes to run at once: configured when set, otherwise one per
+    four cores, since libx264 stops scaling well beyond that on short clips.
+    NVENC sessions are limited per GPU, so GPU encoding defaults to one.
+    """
+    if configured and configured > 0:
+        return configured
+    if use_gpu:
+        return 1
+    return max(1, cpu_cores() // 4)
+
+def transcode_threads(concurrency):
+    """ffmpeg -threads per job so concurrent jobs add up to about one thread per core; None leaves ffmpeg's default."""
+    if concurrency <= 1:
+        return None
+    return max(1, cpu_cores() // concurrency)
+
+TRANSCODE_SLOT_DIR = "transcode_slots"
+
+@contextlib.contextmanager
+def transcode_slot(data_path: Path, slots: int, poll_interval: float = 1.0, cancel: threading.Event = None):
+    """
+    Hold one of slots encode slots for the duration of the block, waiting for
+    one to free up. Slots are flock()ed files in the data directory, so the cap
+    holds across the CLI and every gunicorn worker, and a slot is released by
+    the kernel when its holder dies. If cancel is set while waiting, the block
+    runs without a slot and gets None.
+    """
+    slot_dir = Path(data_path) / TRANSCODE_SLOT_DIR
+    slot_dir.mkdir(parents=True, exist_ok=True)
+    while True:
+        for i in range(max(1, slots)):
+            fd = os.open(slot_dir / f"slot-{i}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            try:
+                yield i
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+            return
+        if cancel is None:
+            time.sleep(poll_interval)
+        elif cancel.wait(poll_interval):
+            yield None
+            return
+
+# Segment-parallel encoding of long videos (TRANSCODE_SEGMENT_SECONDS)
+SEGMENT_DIR = "segments.tmp"
+_SEGMENT_ATTEMPTS = 3
+# How far the joined output may be from the source: its duration, and its audio/video offset
+_SEGMENT_DURATION_TOLERANCE = 1.0
+_SEGMENT_SYNC_TOLERANCE = 0.2
+
+def _stream_timing(path):
+    """{'video': (start, duration), 'audio': (start, duration)} of the first streams of path; a missing stream is None."""
+    try:
+        data = _run_ffprobe(path, timeout=60)
+    except Exception as ex:
+        logger.debug(f"Could not probe {path}: {ex}")
+        return {}
+    format_duration = float(data.get('format', {}).get('duration') or 0) or None
+
+    def timing(stream):
+        if stream is None:
+            return None
+        duration = stream.get('duration')
+        tag = (stream.get('tags') or {}).get('DURATION')
+        if duration is not None:
+            duration = float(duration)
+        elif tag:
+            h, m, sec = tag.split(':')
+            duration = int(h) * 3600 + int(m) * 60 + float(sec)
+        else:
+            duration = format_duration
+        return float(stream.get('start_time') or 0), duration
+
+    streams = data.get('streams', [])
+    return {'video': timing(_first_stream(streams, 'video')), 'audio': timing(_first_stream(streams, 'audio'))}
+
+def _verify_joined(source, output):
+    """Why output does not match source in duration or A/V sync, or None if it does."""
+    src, out = _stream_timing(source), _stream_timing(output)
+    if not src.get('video') or not out.get('video') or None in (src['video'][1], out['video'][1]):
+        return "could not read the video durations"
+    (src_start, src_duration), (out_start, out_duration) = src['video'], out['video']
+    if abs(out_duration - src_duration) > max(_SEGMENT_DURATION_TOLERANCE, src_duration * 0.001):
+        return f"video is {out_duration:.2f}s long, the source {src_duration:.2f}s"
+    if src.get('audio'):
+        if not out.get('audio'):
+            return "the audio stream is missing"
+        offset_drift = (out['audio'][0] - out_start) - (src['audio'][0] - src_start)
+        if abs(offset_drift) > _SEGMENT_SYNC_TOLERANCE:
+            return f"audio is {offset_drift:+.2f}s out of sync"
+    return None
+
+def _transcode_segmented(video_path, outputs, encoder, segment_seconds, slots=1, input_decoder=None, threads=None,
+                         copy_audio=False, data_path=None, on_progress=None):
+    """
+    Encode video_path to every (height, out_path, tmp_path) in outputs by splitting
+    its video stream at keyframes into segments of about segment_seconds, encoding
+    those in parallel and joining them with the concat demuxer. The audio is taken
+    once from the source when the segments are joined.
+
+    The caller's encode slot runs one segment at a time; up to slots - 1 more run
+    on slots that are free, so long videos use idle capacity without going over
+    the cap. A failed segment is retried on its own. Each joined output is checked
+    for duration and A/V sync against the source before it is written to its
+    tmp_path; the caller renames it into place. Returns True on success.
+    """
+    work_dir = outputs[0][1].parent / SEGMENT_DIR
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True)
+    try:
+        # Stream copy, so each segment starts at the first keyframe after its boundary
+        segment_list = work_dir / "segments.csv"
+        split_cmd = ['ffmpeg', '-v', 'warning', '-y', '-i', str(video_path), '-map', '0:v:0', '-c', 'copy',
+                     '-f', 'segment', '-segment_time', str(segment_seconds), '-reset_timestamps', '1',
+                     '-segment_list', str(segment_list), '-segment_list_type', 'csv', str(work_dir / "source-%05d.mkv")]
+        logger.debug(f"$: {' '.join(split_cmd)}")
+        result = sp.run(split_cmd, capture_output=True, text=True,
+                        timeout=_timeout_for_duration(get_video_duration(video_path) or segment_seconds))
+        if result.returncode != 0 or not segment_list.exists():
+            logger.warning(f"Could not split {video_path} into segments: {result.stderr.strip()[-500:]}")
+            return False
+        segments = []
+        with open(segment_list, 'r') as f:
+            for line in f:
+                name, start, end = line.strip().rsplit(',', 2)
+                segments.append((work_dir / name, max(0.0, float(end) - float(start))))
+        total = sum(duration for _, duration in segments) or 1.0
+        logger.info(f"Encoding {len(segments)} segments of about {segment_seconds}s with {encoder['name']}")
+
+        # Per-segment progress folded into one percentage for the status file
+        if on_progress is None and data_path:
+            status = read_transcoding_status(data_path)
+            on_progress = lambda percent, eta_seconds: write_transcoding_status(
+                data_path, status.get('current', 0), status.get('total', 0), status.get('current_video'),
+                status.get('pid'), percent, eta_seconds, status.get('resolution'))
+        encoded = [0.0] * len(segments)
+        progress_lock = threading.Lock()
+        started = time.time()
+        last_report = [0.0]
+
+        def report(i, percent, force=False):
+            with progress_lock:
+                encoded[i] = segments[i][1] * (percent or 0) / 100
+                now = time.time()
+                if on_progress is None or (not force and now - last_report[0] < 0.5):
+                    return
+                last_report[0] = now
+                fraction = min(1.0, sum(encoded) / total)
+            eta_seconds = (now - started) * (1 - fraction) / fraction if fraction > 0 else None
+            on_progress(fraction * 100, eta_seconds)
+
+        def encode(i):
+            source, duration = segments[i]
+            targets = [(height, work_dir / f"{height}p-{i:05d}.mp4") for height, _, _ in outputs]
+            cmd = _build_ladder_command(source, targets, encoder, input_decoder=input_decoder, threads=threads, audio=False)
+            try:
+                result = run_ffmpeg_with_progress(cmd, duration, _timeout_for_duration(duration),
+                                                  on_progress=lambda percent, _: report(i, percent))
+                ok = result.returncode == 0
+            except Exception as ex:
+                logger.warning(f"Segment {i + 1}/{len(segments)} failed: {ex}")
+                ok = False
+            report(i, 100 if ok else 0, force=True)
+            return ok
+
+        pending = queue.Queue()
+        for i in range(len(segments)):
+            pending.put(i)
+        attempts = [0] * len(segments)
+        finished = set()
+        failed = threading.Event()
+        done = threading.Event()
+
+        def work():
+            while not failed.is_set():
+                try:
+                    i = pending.get_nowait()
+                except queue.Empty:
+                    return
+                if encode(i):
+                    finished.add(i)
+                    continue
+                attempts[i] += 1
+                if attempts[i] >= _SEGMENT_ATTEMPTS:
+                    logger.warning(f"Segment {i + 1}/{len(segments)} failed {attempts[i]} times, giving up")
+                    failed.set()
+                    return
+                logger.info(f"Retrying segment {i + 1}/{len(segments)} (attempt {attempts[i] + 1} of {_SEGMENT_ATTEMPTS})")
+                pending.put(i)
+
+        def helper():
+            # Stops waiting for a slot once every segment has been handed out
+            with transcode_slot(_data_directory(data_path), slots, cancel=done) as slot:
+                if slot is not None:
+                    work()
+
+        helpers = min(slots, len(segments)) - 1 if _data_directory(data_path) else 0
+        with ThreadPoolExecutor(max_workers=max(1, helpers)) as pool:
+            for _ in range(helpers):
+                pool.submit(helper)
+            work()
+            done.set()
+        if len(finished) < len(segments):
+            return False
+
+        # Keep the source's offset between the first video and audio frames
+        timing = _stream_timing(video_path)
+        video_offset = 0.0
+        if timing.get('video') and timing.get('audio'):
+            video_offset = max(0.0, timing['video'][0] - timing['audio'][0])
+        for height, _, tmp_path in outputs:
+            concat_list = work_dir / f"{height}p.txt"
+            with open(concat_list, 'w') as f:
+                for i in range(len(segments)):
+                    segment = work_dir / f"{height}p-{i:05d}.mp4"
+                    f.write(f"file '{segment}'\n")
+            cmd = ['ffmpeg', '-v', 'warning', '-y']
+            if video_offset:
+                cmd.extend(['-itsoffset', f"{video_offset:.6f}"])
+            cmd.extend(['-f', 'concat', '-safe', '0', '-i', str(concat_list), '-i', str(video_path),
+                        '-map', '0:v:0', '-map', '1:a:0?', '-c:v', 'copy', *_audio_args(encoder, copy_audio),
+                        '-movflags', '+faststart', str(tmp_path)])
+            logger.debug(f"$: {' '.join(cmd)}")
+            result = sp.run(cmd, capture_output=True, text=True, timeout=_timeout_for_duration(total))
+            if result.returncode != 0:
+                logger.warning(f"Joining {height}p segments failed: {result.stderr.strip()[-500:]}")
+                return False
+            problem = _verify_joined(video_path, tmp_path)
+            if problem:
+                logger.warning(f"Joined {height}p output does not match the source: {problem}")
+                return False
+        return True
+    except (OSError, ValueError, sp.TimeoutExpired) as ex:
+        logger.warning(f"Segmented transcode of {video_path} failed: {ex}")
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
 def transcode_video_quality(video_path, out_path, height, use_gpu=False, timeout_seconds=None, encoder_preference='auto', data_path=None):
     """
     Transcode a video to a specific height (e.g., 720, 1080) while maintaining aspect ratio.
+    See transcode_video_ladder for the encoder fallback and return values.
+    """
+    return transcode_video_ladder(video_path, [(height, out_path)], use_gpu, timeout_seconds, encoder_preference, data_path)
+
+def transcode_video_ladder(video_path, targets, use_gpu=False, timeout_seconds=None, encoder_preference='auto', data_path=None, threads=None, on_progress=None, copy_audio=None,
+                           segment_seconds=0, slots=1):
+    """
+    Transcode a video to one or more heights while maintaining aspect ratio. The
+    source is validated and decoded once; with several targets a single ffmpeg
+    run splits the decoded frames and scales and encodes each output separately.
     
-    Tries encoders in priority order during actual transcoding, then caches the first
-    successful encoder for all subsequent transcodes until the application is restarted.
+    Starts with the encoder from working_encoder, which is detected once per ffmpeg
+    build and cached in the data directory. If it fails on this video the cache entry
+    is dropped and every candidate is tried on the video in priority order; the first
+    one that succeeds is cached instead.
     
     Fallback chain when GPU is enabled:
     1. AV1 with GPU (av1_nvenc) - RTX 40 series or newer
@@ -849,18 +1820,22 @@ def transcode_video_quality(video_path, out_path, height, use_gpu=False, timeout
     
     Args:
         video_path: Path to the source video
-        out_path: Path for the transcoded output
-        height: Target height in pixels (e.g., 720, 1080)
+        targets: List of (height, out_path) pairs, e.g. [(1080, ...), (720, ...)]
         use_gpu: Whether to use GPU acceleration (NVENC if available)
         timeout_seconds: Maximum time allowed for encoding (default: calculated based on video duration)
+        threads: ffmpeg -threads for each output (default: let ffmpeg decide)
+        on_progress: Called with (percent, eta_seconds) instead of writing the status file
+        copy_audio: Copy the audio stream instead of encoding it (default: when it is already AAC or Opus)
+        segment_seconds: Encode videos at least twice this long in parallel segments (0 = off),
+            see _transcode_segmented; falls back to a single ffmpeg run if that fails
+        slots: Encode slots the segments may share with other transcodes
     
     Returns:
         tuple: (success: bool, failure_reason: str or None)
-            - (True, None) if transcoding succeeded
+            - (True, None) if every output was written
             - (False, 'corruption') if source file appears corrupt
             - (False, 'encoders') if all encoders failed
     """
-    global _working_encoder_cache
     s = time.time()
     
     # Validate the source video file before attempting transcoding
@@ -872,6 +1847,8 @@ def transcode_video_quality(video_path, out_path, height, use_gpu=False, timeout
         return (False, 'corruption')
     if preferred_decoder:
         logger.debug(f"Using {preferred_decoder} as input decoder for this source file")
+    if copy_audio is None:
+        copy_audio = can_copy_audio(get_media_info(video_path) or [])
 
     # Get video duration for progress logging
     total_duration = get_video_duration(video_path) or 0
@@ -882,156 +1859,78 @@ def transcode_video_quality(video_path, out_path, height, use_gpu=False, timeout
 
     logger.debug(f"Using transcode timeout of {timeout_seconds}s ({timeout_seconds/60:.1f} minutes)")
     
-    # Determine output container based on codec
-    out_path_str = str(out_path)
-
-    # Write to a temp path during transcoding; only rename to the final path on
+    # Write to temp paths during transcoding; only rename to the final paths on
     # success. This ensures a partially-written file from a crashed ffmpeg process
     # is never picked up and served as a valid transcode output.
-    tmp_path = out_path.parent / (out_path.stem + '.tmp.mp4')
-    tmp_path_str = str(tmp_path)
-    if tmp_path.exists():
-        try:
-            tmp_path.unlink()
-            logger.debug(f"Cleaned up leftover temp file: {tmp_path_str}")
-        except OSError as ex:
-            logger.debug(f"Could not remove leftover temp file: {ex}")
+    outputs = [(height, out_path, out_path.parent / (out_path.stem + '.tmp.mp4')) for height, out_path in targets]
+    heights = '/'.join(f"{height}p" for height, _, _ in outputs)
 
-    mode = 'gpu' if use_gpu else 'cpu'
+    def _cleanup_tmp(what):
+        for _, _, tmp_path in outputs:
+            if tmp_path.exists():
+                try:
+                    tmp_path.unlink()
+                    logger.debug(f"Cleaned up {what} temp file: {tmp_path}")
+                except OSError as cleanup_ex:
+                    logger.debug(f"Could not clean up {what} temp file: {cleanup_ex}")
 
-    # Use cached encoder if available to avoid redundant encoder detection during bulk transcoding.
-    if _working_encoder_cache[mode] is not None:
-        encoder = _working_encoder_cache[mode]
-        logger.debug(f"Using cached {mode.upper()} encoder: {encoder['name']}")
+    def _finish():
+        for _, out_path, tmp_path in outputs:
+            tmp_path.rename(out_path)
+        logger.info(f"Transcoded {', '.join(str(out_path) for _, out_path, _ in outputs)} to {heights} in {time.time()-s:.2f}s")
 
+    def _build(encoder):
+        if len(outputs) == 1:
+            height, _, tmp_path = outputs[0]
+            return _build_transcode_command(video_path, tmp_path, height, encoder, input_decoder=preferred_decoder,
+                                            threads=threads, copy_audio=copy_audio)
+        return _build_ladder_command(video_path, [(height, tmp_path) for height, _, tmp_path in outputs], encoder,
+                                     input_decoder=preferred_decoder, threads=threads, copy_audio=copy_audio)
+
+    _cleanup_tmp('leftover')
+
+    mode = 'gpu' if use_gpu else 'cpu'
+
+    # Detected once per ffmpeg build and shared with every other transcode process
+    encoder = working_encoder(use_gpu, encoder_preference, data_path)
+    if encoder is not None and segment_seconds and total_duration >= 2 * segment_seconds:
+        logger.info(f"Transcoding video to {heights} in segments using {encoder['name']}")
+        if _transcode_segmented(video_path, outputs, encoder, segment_seconds, slots, preferred_decoder, threads,
+                                copy_audio, data_path, on_progress):
+            _finish()
+            return (True, None)
+        logger.warning("Segmented transcode failed, encoding the video in a single ffmpeg run instead")
+        _cleanup_tmp('failed')
+    if encoder is not None:
         # Build ffmpeg command using the cached encoder
-        logger.info(f"Transcoding video to {height}p using {encoder['name']}")
-        cmd = _build_transcode_command(video_path, tmp_path, height, encoder, input_decoder=preferred_decoder)
+        logger.info(f"Transcoding video to {heights} using {encoder['name']}")
+        cmd = _build(encoder)
 
         logger.debug(f"$: {' '.join(cmd)}")
 
         try:
-            result = run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds, data_path)
+            result = run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds, data_path, on_progress)
             if result.returncode == 0:
-                tmp_path.rename(out_path)
-                e = time.time()
-                logger.info(f'Transcoded {str(out_path)} to {height}p in {e-s:.2f}s')
+                _finish()
                 return (True, None)
             else:
                 # Cached encoder failed - clear cache and fall through to try all encoders
                 logger.warning(f"Cached encoder {encoder['name']} failed with exit code {result.returncode}")
                 logger.info("Clearing encoder cache and retrying with all available encoders...")
-                _working_encoder_cache[mode] = None
-                if tmp_path.exists():
-                    try:
-                        tmp_path.unlink()
-                    except OSError as cleanup_ex:
-                        logger.debug(f"Could not clean up temp file: {cleanup_ex}")
+                forget_encoder(use_gpu, encoder_preference, data_path)
+                _cleanup_tmp('failed')
         except sp.TimeoutExpired:
             logger.warning(f"Cached encoder {encoder['name']} timed out after {timeout_seconds} seconds")
             logger.info("Clearing encoder cache and retrying with all available encoders...")
-            _working_encoder_cache[mode] = None
+            forget_encoder(use_gpu, encoder_preference, data_path)
             # Clean up the process and any partial output
-            if tmp_path.exists():
-                try:
-                    tmp_path.unlink()
-                    logger.debug(f"Cleaned up timed out temp file: {tmp_path_str}")
-                except OSError as cleanup_ex:
-                    logger.debug(f"Could not clean up timed out temp file: {cleanup_ex}")
+            _cleanup_tmp('timed out')
         except Exception as ex:
             # Cached encoder failed - clear cache and fall through to try all encoders
             logger.warning(f"Cached encoder {encoder['name']} failed: {ex}")
             logger.info("Clearing encoder cache and retrying with all available encoders...")
-            _working_encoder_cache[mode] = None
-            if tmp_path.exists():
-                try:
-                    tmp_path.unlink()
-                except OSError as cleanup_ex:
-                    logger.debug(f"Could not clean up temp file: {cleanup_ex}")
-    
-    # No cached encoder - need to detect a working encoder
-    # Check if GPU is requested but NVENC is not available in ffmpeg
-    if use_gpu and not check_nvenc_available():
-        logger.warning("GPU transcoding requested but NVENC not available in ffmpeg")
-        
-        # Run diagnostics to help user understand the issue
-        diag = diagnose_nvenc_setup()
-        
-        if diag['nvidia_smi_available']:
-            logger.warning("✓ GPU is accessible (nvidia-smi works)")
-            logger.warning("✗ But NVENC encoder is not available to ffmpeg")
-            logger.warning("")
-            
-            # Try to automatically fix the library path issue
-            if diag['libnvidia_encode_found'] and diag['library_paths'] and len(diag['library_paths']) > 0:
-                library_dir = str(Path(diag['library_paths'][0]).parent)
-                current_ld_path = os.environ.get('LD_LIBRARY_PATH', '')
-                current_paths = current_ld_path.split(':') if current_ld_path else []
-                
-                # Add the library directory to LD_LIBRARY_PATH if not already present
-                if library_dir not in current_paths:
-                    new_ld_path = f"{library_dir}:{current_ld_path}" if current_ld_path else library_dir
-                    os.environ['LD_LIBRARY_PATH'] = new_ld_path
-                    logger.info(f"Automatically added {library_dir} to LD_LIBRARY_PATH")
-                    
-                    # Clear the cache and retry the check
-                    clear_nvenc_cache()
-                    
-                    if check_nvenc_available():
-                        logger.info("✓ NVENC is now available! Continuing with GPU transcoding")
-                        # Don't set use_gpu to False, let it continue
-                    else:
-                        logger.warning("✗ NVENC still not available after adding library path")
-                        logger.warning("Common causes on Unraid/Docker:")
-                        logger.warning("  1. NVIDIA driver libraries not mounted in container")
-                        logger.warning("     Solution: Add to docker run or docker-compose:")
-                        logger.warning("       --gpus all")
-                        logger.warning("       or")
-                        logger.warning("       runtime: nvidia")
-                        logger.warning("")
-                        logger.warning("  2. FFmpeg not compiled with NVENC support")
-                        logger.warning("     (This shouldn't happen with the official image)")
-                        logger.warning("")
-                        logger.warning("See: https://docs.nvidia.com/datacenter/cloud-native/container-toolkit/install-guide.html")
-                        logger.info("Will attempt GPU transcoding anyway and fall back to CPU if needed")
-                else:
-                    logger.warning(f"Library found at: {diag['library_paths'][0]}")
-                    logger.warning(f"But {library_dir} is already in LD_LIBRARY_PATH")
-                    logger.warning("Common causes on Unraid/Docker:")
-                    logger.warning("  1. NVIDIA driver libraries not mounted in container")
-                    logger.warning("     Solution: Add to docker run or docker-compose:")
-                    logger.warning("       --gpus all")
-                    logger.warning("       or")
-                    logger.warning("       runtime: nvidia")
-                    logger.warning("")
-                    logger.warning("  2. FFmpeg not compiled with NVENC support")
-                    logger.warning("     (This shouldn't happen with the official image)")
-                    logger.warning("")
-                    logger.warning("See: https://docs.nvidia.com/datacenter/cloud-native/container-toolkit/install-guide.html")
-                    logger.info("Will attempt GPU transcoding anyway and fall back to CPU if needed")
-            else:
-                logger.warning("Common causes on Unraid/Docker:")
-                logger.warning("  1. NVIDIA driver libraries not mounted in container")
-                logger.warning("     Solution: Add to docker run or docker-compose:")
-                logger.warning("       --gpus all")
-                logger.warning("       or")
-                logger.warning("       runtime: nvidia")
-                logger.warning("")
-                logger.warning("  2. Missing libnvidia-encode.so.1 library")
-                logger.warning("     ✗ Library not found in standard paths")
-                logger.warning("     Ensure NVIDIA Container Toolkit is installed on host")
-                logger.warning("")
-                logger.warning("See: https://docs.nvidia.com/datacenter/cloud-native/container-toolkit/install-guide.html")
-                logger.info("Will attempt GPU transcoding anyway and fall back to CPU if needed")
-        else:
-            logger.warning("Common causes:")
-            logger.warning("  1. NVIDIA drivers are not installed on the host")
-            logger.warning("  2. NVIDIA Container Toolkit is not installed")
-            logger.warning("  3. Docker is not configured with the nvidia runtime")
-            logger.warning("  4. The GPU does not support NVENC")
-            logger.warning("")
-            logger.warning("See: https://docs.nvidia.com/datacenter/cloud-native/container-toolkit/install-guide.html")
-            logger.info("Will attempt GPU transcoding anyway and fall back to CPU if needed")
+            forget_encoder(use_gpu, encoder_preference, data_path)
+            _cleanup_tmp('failed')
     
     # Try encoders in priority order with actual transcoding
     # When use_gpu=True, the candidate list includes GPU encoders first, then CPU encoders
@@ -1043,51 +1942,34 @@ def transcode_video_quality(video_path, out_path, height, use_gpu=False, timeout
     for encoder in encoders:
         logger.debug(f"Trying {encoder['name']}...")
 
-        # Build ffmpeg command targeting the temp path
-        cmd = _build_transcode_command(video_path, tmp_path, height, encoder, input_decoder=preferred_decoder)
+        # Build ffmpeg command targeting the temp paths
+        cmd = _build(encoder)
 
         logger.debug(f"$: {' '.join(cmd)}")
 
         try:
-            result = run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds, data_path)
+            result = run_ffmpeg_with_progress(cmd, total_duration, timeout_seconds, data_path, on_progress)
             if result.returncode == 0:
-                # Success! Move temp file to final location, cache encoder, and return.
-                tmp_path.rename(out_path)
-                logger.info(f"✓ {encoder['name']} works! Using it for all transcodes this session.")
-                _working_encoder_cache[mode] = encoder
-                e = time.time()
-                logger.info(f'Transcoded {str(out_path)} to {height}p in {e-s:.2f}s')
+                # Success! Move temp files to final location, cache encoder, and return.
+                _finish()
+                logger.info(f"✓ {encoder['name']} works! Using it for all transcodes until it fails.")
+                remember_encoder(encoder, use_gpu, encoder_preference, data_path)
                 return (True, None)
             else:
                 logger.warning(f"✗ {encoder['name']} failed with exit code {result.returncode}")
                 last_exception = Exception(f"Transcode failed with exit code {result.returncode}")
-                # Clean up temp file before trying next encoder
-                if tmp_path.exists():
-                    try:
-                        tmp_path.unlink()
-                        logger.debug(f"Cleaned up failed temp file: {tmp_path_str}")
-                    except OSError as cleanup_ex:
-                        logger.debug(f"Could not clean up failed temp file: {cleanup_ex}")
+                # Clean up temp files before trying next encoder
+                _cleanup_tmp('failed')
         except sp.TimeoutExpired:
             logger.warning(f"✗ {encoder['name']} timed out after {timeout_seconds} seconds")
             last_exception = Exception(f"Transcode timed out after {timeout_seconds} seconds")
-            # Clean up temp file before trying next encoder
-            if tmp_path.exists():
-                try:
-                    tmp_path.unlink()
-                    logger.debug(f"Cleaned up timed out temp file: {tmp_path_str}")
-                except OSError as cleanup_ex:
-                    logger.debug(f"Could not clean up timed out temp file: {cleanup_ex}")
+            # Clean up temp files before trying next encoder
+            _cleanup_tmp('timed out')
         except Exception as ex:
             logger.warning(f"✗ {encoder['name']} failed: {ex}")
             last_exception = ex
-            # Clean up temp file before trying next encoder
-            if tmp_path.exists():
-                try:
-                    tmp_path.unlink()
-                    logger.debug(f"Cleaned up failed temp file: {tmp_path_str}")
-                except OSError as cleanup_ex:
-                    logger.debug(f"Could not clean up failed temp file: {cleanup_ex}")
+            # Clean up temp files before trying next encoder
+            _cleanup_tmp('failed')
     
     # If we get here, no encoder worked
     error_msg = f"No working {mode.upper()} encoder found for video. Tried: {', '.join([e['name'] for e in encoders])}"
@@ -1140,7 +2022,138 @@ def seconds_to_dur_string(sec):
     else:
         return ':'.join([str(mins), str(s).zfill(2)])
 
-def detect_game_from_filename(filename: str, steamgriddb_api_key: str = None, path: str = None):
+class GameMatcher:
+    """
+    Fuzzy matcher over the local game list, built once and reused for every
+    video in a scan. Names are preprocessed up front and best matches are
+    remembered per query, so a folder of 500 clips scores its folder name once.
+    """
+
+    _MEMO_SIZE = 4096
+
+    def __init__(self, games):
+        from rapidfuzz import utils as fuzz_utils
+        self._process = fuzz_utils.default_process
+        # (id, name, steamgriddb_id) so matches outlive the session the games came from
+        self.games = [(g.id, g.name, g.steamgriddb_id) for g in games]
+        self.names = [self._process(g[1] or '') for g in self.games]
+        self._tokens = [frozenset(name.split()) for name in self.names]
+        self._index = {}
+        for i, tokens in enumerate(self._tokens):
+            for token in tokens:
+                self._index.setdefault(token, []).append(i)
+        # Least recently used queries are evicted first; the matcher is shared across threads
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    @classmethod
+    def from_db(cls):
+        from fireshare.models import GameMetadata
+        return cls(GameMetadata.query.all())
+
+    def __len__(self):
+        return len(self.games)
+
+    def _exact(self, query):
+        """
+        Index of the first game token_set_ratio scores 100 against query, or None.
+        That happens exactly when the token sets overlap and one contains the
+        other, so only games sharing a token with the query need checking.
+        """
+        tokens = frozenset(query.split())
+        candidates = sorted({i for token in tokens for i in self._index.get(token, ())})
+        for i in candidates:
+            if self._tokens[i] <= tokens or tokens <= self._tokens[i]:
+                return i
+        return None
+
+    def _remember(self, query, best):
+        with self._memo_lock:
+            self._memo[query] = best
+            self._memo.move_to_end(query)
+            while len(self._memo) > self._MEMO_SIZE:
+                self._memo.popitem(last=False)
+
+    def _best(self, query):
+        with self._memo_lock:
+            if query in self._memo:
+                self._memo.move_to_end(query)
+                return self._memo[query]
+        from rapidfuzz import fuzz, process
+        best = None
+        exact = self._exact(query)
+        if exact is not None:
+            best = (exact, 100.0)
+        else:
+            result = process.extractOne(query, self.names, scorer=fuzz.token_set_ratio)
+            if result and result[1] > 0:
+                best = (result[2], result[1])
+        self._remember(query, best)
+        return best
+
+    def match(self, query, score_cutoff=0):
+        """Best (game_id, game_name, steamgriddb_id, score) for query, or None below score_cutoff."""
+        query = self._process(query or '')
+        if not query or not self.games:
+            return None
+        best = self._best(query)
+        if best is None or best[1] < score_cutoff:
+            return None
+        return (*self.games[best[0]], best[1])
+
+
+_game_matcher = None
+_game_matcher_key = None
+_game_matcher_lock = threading.Lock()
+
+
+def get_game_matcher():
+    """
+    Shared GameMatcher for the local game list. It is rebuilt when the list
+    changes, including changes made by another process, so callers can hold on
+    to it for a whole scan.
+    """
+    global _game_matcher, _game_matcher_key
+    from sqlalchemy import func
+    from fireshare import db
+    from fireshare.models import GameMetadata
+    key = tuple(db.session.query(func.count(GameMetadata.id), func.max(GameMetadata.id),
+                                 func.max(GameMetadata.updated_at)).one())
+    with _game_matcher_lock:
+        if _game_matcher is None or _game_matcher_key != key:
+            _game_matcher = GameMatcher.from_db()
+            _game_matcher_key = key
+        return _game_matcher
+
+
+def invalidate_game_matcher():
+    """Drop the shared GameMatcher; call after adding, renaming or deleting games."""
+    global _game_matcher, _game_matcher_key
+    with _game_matcher_lock:
+        _game_matcher = None
+        _game_matcher_key = None
+
+
+def _clean_game_filename(filename: str) -> str:
+    clean_name = filename.lower()
+    # Remove common patterns: dates, numbers, "gameplay", etc.
+    clean_name = re.sub(r'\d{4}-\d{2}-\d{2}', '', clean_name)  # Remove dates like 2024-01-14
+    clean_name = re.sub(r'\d{8}', '', clean_name)  # Remove YYYYMMDD format
+    clean_name = re.sub(r'\b(gameplay|clip|highlights?|match|game|recording|video)\b', '', clean_name, flags=re.IGNORECASE)
+    clean_name = re.sub(r'[_\-]+', ' ', clean_name)  # Replace _ and - with spaces
+    clean_name = re.sub(r'\s+', ' ', clean_name)  # Normalize whitespace
+    return clean_name.strip()
+
+
+def _game_folder(path: str):
+    """Top-level folder of a relative path, or None for files at the root."""
+    if not path:
+        return None
+    parts = [part for part in path.replace('\\', '/').split('/') if part]
+    return parts[0] if len(parts) > 1 else None
+
+
+def detect_game_from_filename(filename: str, steamgriddb_api_key: str = None, path: str = None, matcher: GameMatcher = None):
     """
     Fuzzy match a video filename against existing games in database using RapidFuzz.
     Falls back to SteamGridDB search if no local match found.
@@ -1149,13 +2162,13 @@ def detect_game_from_filename(filename: str, steamgriddb_api_key: str = None, pa
         filename: Video filename without extension
         steamgriddb_api_key: Optional API key for SteamGridDB fallback
         path: Optional relative path (e.g. "Game Name/clip.mp4") - folder name is tried first
+        matcher: GameMatcher to reuse across calls; defaults to get_game_matcher()
 
     Returns:
         dict with 'game_id', 'game_name', 'steamgriddb_id', 'confidence', 'source' or None
     """
-    from rapidfuzz import fuzz, process
-    from fireshare.models import GameMetadata
-    import re
+    if matcher is None:
+        matcher = get_game_matcher()
 
     # Step 0: Try folder name first (highest confidence source)
     # Skip folder-based detection for upload folders (they're not game names)
@@ -1165,100 +2178,73 @@ def detect_game_from_filename(filename: str, steamgriddb_api_key: str = None, pa
         DEFAULT_CONFIG['app_config']['public_upload_folder_name'].lower(),
     }
 
-    if path:
-        normalized_path = path.replace('\\', '/')
-        parts = [part for part in normalized_path.split('/') if part]
-        if len(parts) > 1:  # Has at least one folder
-            folder_name = parts[0]  # Top-level folder
-
-            # Skip folder-based detection for upload folders
-            if folder_name.lower() not in upload_folders:
-                # Try matching folder name against local game database
-                games = GameMetadata.query.all()
-                if games:
-                    game_choices = [(game.name, game) for game in games]
-                    result = process.extractOne(
-                        folder_name,
-                        game_choices,
-                        scorer=fuzz.token_set_ratio,
-                        score_cutoff=80  # Higher threshold for folder match
-                    )
+    folder_name = _game_folder(path)
+    if folder_name:
+        # Skip folder-based detection for upload folders
+        if folder_name.lower() not in upload_folders:
+            # Try matching folder name against local game database
+            if len(matcher):
+                # Higher threshold for folder match
+                result = matcher.match(folder_name, score_cutoff=80)
+
+                if result:
+                    game_id, game_name, steamgriddb_id, score = result
+                    best_match = {
+                        'game_id': game_id,
+                        'game_name': game_name,
+                        'steamgriddb_id': steamgriddb_id,
+                        'confidence': score / 100,
+                        'source': 'folder_local'
+                    }
+                    logger.info(f"Folder-based game match: {best_match['game_name']} (confidence: {score:.0f}%)")
+                    return best_match
+
+            # Try SteamGridDB with folder name
+            if steamgriddb_api_key:
+                logger.debug(f"No local folder match, searching SteamGridDB for folder: '{folder_name}'")
+                from fireshare.steamgrid import SteamGridDBClient
+                client = SteamGridDBClient(steamgriddb_api_key)
 
-                    if result:
-                        matched_name, score, matched_game = result[0], result[1], result[2]
-                        best_match = {
-                            'game_id': matched_game.id,
-                            'game_name': matched_game.name,
-                            'steamgriddb_id': matched_game.steamgriddb_id,
-                            'confidence': score / 100,
-                            'source': 'folder_local'
+                try:
+                    results = client.search_games(folder_name)
+                    if results and len(results) > 0:
+                        top_result = results[0]
+                        # Use higher confidence for folder-based SteamGridDB match
+                        detected = {
+                            'game_id': None,
+                            'game_name': top_result.get('name'),
+                            'steamgriddb_id': top_result.get('id'),
+                            'confidence': 0.85,  # Higher than filename-based
+                            'source': 'folder_steamgriddb',
+                            'release_date': top_result.get('release_date')
                         }
-                        logger.info(f"Folder-based game match: {best_match['game_name']} (confidence: {score:.0f}%)")
-                        return best_match
-
-                # Try SteamGridDB with folder name
-                if steamgriddb_api_key:
-                    logger.debug(f"No local folder match, searching SteamGridDB for folder: '{folder_name}'")
-                    from fireshare.steamgrid import SteamGridDBClient
-                    client = SteamGridDBClient(steamgriddb_api_key)
-
-                    try:
-                        results = client.search_games(folder_name)
-                        if results and len(results) > 0:
-                            top_result = results[0]
-                            # Use higher confidence for folder-based SteamGridDB match
-                            detected = {
-                                'game_id': None,
-                                'game_name': top_result.get('name'),
-                                'steamgriddb_id': top_result.get('id'),
-                                'confidence': 0.85,  # Higher than filename-based
-                                'source': 'folder_steamgriddb',
-                                'release_date': top_result.get('release_date')
-                            }
-                            logger.info(f"Folder-based SteamGridDB match: {detected['game_name']} (id: {detected['steamgriddb_id']})")
-                            return detected
-                    except Exception as ex:
-                        logger.warning(f"SteamGridDB folder search failed: {ex}")
-            else:
-                logger.debug(f"Skipping folder-based detection for upload folder: '{folder_name}'")
+                        logger.info(f"Folder-based SteamGridDB match: {detected['game_name']} (id: {detected['steamgriddb_id']})")
+                        return detected
+                except Exception as ex:
+                    logger.warning(f"SteamGridDB folder search failed: {ex}")
+        else:
+            logger.debug(f"Skipping folder-based detection for upload folder: '{folder_name}'")
 
     # Clean filename for better matching
-    clean_name = filename.lower()
-    # Remove common patterns: dates, numbers, "gameplay", etc.
-    clean_name = re.sub(r'\d{4}-\d{2}-\d{2}', '', clean_name)  # Remove dates like 2024-01-14
-    clean_name = re.sub(r'\d{8}', '', clean_name)  # Remove YYYYMMDD format
-    clean_name = re.sub(r'\b(gameplay|clip|highlights?|match|game|recording|video)\b', '', clean_name, flags=re.IGNORECASE)
-    clean_name = re.sub(r'[_\-]+', ' ', clean_name)  # Replace _ and - with spaces
-    clean_name = re.sub(r'\s+', ' ', clean_name)  # Normalize whitespace
-    clean_name = clean_name.strip()
+    clean_name = _clean_game_filename(filename)
 
     if not clean_name:
         logger.debug("Filename cleaned to empty string, cannot detect game")
         return None
 
     # Step 1: Try local database first
-    games = GameMetadata.query.all()
-
-    if not games:
+    if not len(matcher):
         logger.debug("No games in database to match against")
     else:
-        # Create list of (game_name, game_object) tuples for rapidfuzz
-        game_choices = [(game.name, game) for game in games]
-
-        # Use token_set_ratio - ignores word order and extra words
-        result = process.extractOne(
-            clean_name,
-            game_choices,
-            scorer=fuzz.token_set_ratio,
-            score_cutoff=65  # Minimum confidence (0-100 scale)
-        )
+        # token_set_ratio ignores word order and extra words; 65 is the minimum confidence (0-100 scale)
+        result = matcher.match(clean_name, score_cutoff=65)
 
         if result:
-            matched_name, score, matched_game = result[0], result[1], result[2]
+            game_id, game_name, steamgriddb_id, score = result
             best_match = {
-                'game_id': matched_game.id,
-                'game_name': matched_game.name,
-                'steamgriddb_id': matched_game.steamgriddb_id,
+                'game_id': game_id,
+                'game_name': game_name,
+                'steamgriddb_id': steamgriddb_id,
                 'confidence': score / 100,  # Convert to 0-1 scale
                 'source': 'local'
             }
@@ -1361,10 +2347,10 @@ def _extract_date_from_metadata(file_path: Path):
         datetime object if a valid date was found in metadata, None otherwise
     """
     try:
-        cmd = f'ffprobe -v quiet -print_format json -show_entries format_tags {file_path}'
-        logger.debug(f"$ {cmd}")
-        data = json.loads(sp.check_output(cmd.split()).decode('utf-8'))
-        
+        data = probe_media(file_path)
+        if data is None:
+            return None
+
         tags = data.get('format', {}).get('tags', {})
         if not tags:
             return None
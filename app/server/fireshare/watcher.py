@@ -0,0 +1,216 @@
+"""
+Filesystem watcher used by `fireshare watch`.
+
+Reports files that were written, moved in or removed under the media
+directories so they can be ingested individually instead of waiting for the
+next full scan. Uses inotify on Linux and falls back to periodically
+comparing directory snapshots everywhere else (and on network mounts, which
+do not deliver inotify events).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from fireshare import logger
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ONLYDIR     = 0x01000000
+IN_ISDIR       = 0x40000000
+
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+               | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct('iIII')
+
+# PID lock held by the running `fireshare watch` process
+LOCK_FILE = "fireshare_watch.lock"
+
+WRITE = 'write'
+DELETE = 'delete'
+OVERFLOW = 'overflow'
+
+
+class InotifyWatcher:
+    """Recursive inotify watch over one or more directory trees."""
+
+    def __init__(self, roots):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}
+        for root in roots:
+            self._add_tree(Path(root))
+
+    def _add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f'inotify_add_watch failed for {directory}: {os.strerror(err)}')
+        self._dirs[wd] = directory
+
+    def _add_tree(self, root):
+        """Watch root and every directory below it; returns the files already present."""
+        found = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            self._add_watch(Path(dirpath))
+            found.extend(Path(dirpath) / f for f in filenames)
+        return found
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds and return a list of (kind, path) events."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            name = buf[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify event queue overflowed, a full scan is required")
+                events.append((OVERFLOW, None))
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files moved in together with a directory produce no events of their own
+                    try:
+                        events.extend((WRITE, f) for f in self._add_tree(path))
+                    except OSError as e:
+                        logger.warning(f"Unable to watch new directory {path}: {e}")
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    events.append((DELETE, path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                events.append((WRITE, path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                events.append((DELETE, path))
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Detects changes by comparing (size, mtime) snapshots of the watched trees."""
+
+    def __init__(self, roots, interval=30.0):
+        self._roots = [Path(r) for r in roots]
+        self._interval = interval
+        self._next = time.monotonic() + interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for root in self._roots:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def poll(self, timeout):
+        wait = self._next - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        if wait > 0:
+            time.sleep(wait)
+        self._next = time.monotonic() + self._interval
+        current = self._take_snapshot()
+        events = [(WRITE, Path(p)) for p, sig in current.items() if self._snapshot.get(p) != sig]
+        events.extend((DELETE, Path(p)) for p in self._snapshot if p not in current)
+        self._snapshot = current
+        return events
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots, mode='auto', poll_interval=30.0):
+    """
+    Build a watcher for roots. mode is 'inotify', 'poll' or 'auto'; 'auto'
+    uses inotify where available and falls back to polling otherwise.
+    """
+    if mode in ('auto', 'inotify') and sys.platform.startswith('linux'):
+        try:
+            watcher = InotifyWatcher(roots)
+            logger.info(f"Watching {', '.join(str(r) for r in roots)} with inotify")
+            return watcher
+        except (OSError, AttributeError) as e:
+            if mode == 'inotify':
+                raise
+            logger.warning(f"inotify unavailable ({e}), falling back to polling every {poll_interval:g}s")
+    elif mode == 'inotify':
+        raise OSError('inotify is only available on Linux')
+    else:
+        logger.info(f"Watching {', '.join(str(r) for r in roots)} by polling every {poll_interval:g}s")
+    return PollingWatcher(roots, poll_interval)
+
+
+def watch(watcher, on_write, on_delete, on_overflow=None, on_error=None, settle=5.0, should_stop=None):
+    """
+    Dispatch watcher events once each path has been quiet for settle seconds.
+
+    Repeated events for the same path restart its timer so a file is only
+    handed to on_write after it has finished being written. Writes are
+    dispatched before deletes so a move within the tree is seen as a move.
+    Handler exceptions are logged, passed to on_error and do not stop the loop.
+    """
+    pending = {}
+    while not (should_stop and should_stop()):
+        now = time.monotonic()
+        timeout = min([deadline for deadline, _ in pending.values()], default=now + 1.0) - now
+        for kind, path in watcher.poll(max(0.0, min(timeout, 1.0))):
+            if kind == OVERFLOW:
+                pending.clear()
+                if on_overflow:
+                    on_overflow()
+                continue
+            pending[path] = (time.monotonic() + settle, kind)
+
+        now = time.monotonic()
+        ready = sorted((kind != WRITE, str(path), path, kind)
+                       for path, (deadline, kind) in pending.items() if deadline <= now)
+        for _, _, path, kind in ready:
+            del pending[path]
+            handler = on_write if kind == WRITE else on_delete
+            try:
+                handler(path)
+            except Exception as e:
+                logger.error(f"Failed to handle {kind} event for {path}: {e}")
+                if on_error:
+                    on_error()
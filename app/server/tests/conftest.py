@@ -0,0 +1,103 @@
+import json
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StandIn:
+    """
+    HTTP server on localhost that records every request and answers with the
+    queued (status, headers, body) replies, then with default once they run out.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.replies = deque()
+        self.default = (200, {}, {})
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                with stand_in._lock:
+                    stand_in.requests.append({
+                        'method': self.command,
+                        'path': self.path,
+                        'headers': dict(self.headers),
+                        'json': json.loads(body) if body else None,
+                    })
+                    status, headers, payload = stand_in.replies.popleft() if stand_in.replies else stand_in.default
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _reply
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+
+    def reply(self, status, body=None, headers=None):
+        self.replies.append((status, headers or {}, {} if body is None else body))
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    for name in ('data', 'videos', 'processed'):
+        (tmp_path / name).mkdir()
+    monkeypatch.setenv('DATA_DIRECTORY', str(tmp_path / 'data'))
+    monkeypatch.setenv('VIDEO_DIRECTORY', str(tmp_path / 'videos'))
+    monkeypatch.setenv('PROCESSED_DIRECTORY', str(tmp_path / 'processed'))
+    monkeypatch.delenv('IMAGE_DIRECTORY', raising=False)
+
+    from fireshare import create_app, db
+    app = create_app(mode="worker")
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def add_video(app):
+    """Add a Video and VideoInfo with a source file in video_links; returns the source path."""
+    from fireshare import db
+    from fireshare.models import Video, VideoInfo
+    processed = app.config['PATHS']['processed']
+
+    def add(video_id, height=1080, codec='hevc', **info):
+        source = processed / 'video_links' / f"{video_id}.mp4"
+        source.write_bytes(b'not really a video')
+        streams = [{'codec_type': 'video', 'codec_name': codec, 'profile': 'High', 'pix_fmt': 'yuv420p',
+                    'width': height * 16 // 9, 'height': height}]
+        db.session.add(Video(video_id=video_id, extension='.mp4', path=f"{video_id}.mp4", available=True))
+        db.session.add(VideoInfo(video_id=video_id, title=video_id, height=height, width=height * 16 // 9,
+                                 info=json.dumps(streams), **info))
+        db.session.commit()
+        return source
+
+    return add
@@ -0,0 +1,17 @@
+import pytest
+
+from fireshare import cli, util
+from fireshare.models import ScanRun
+
+
+def test_failed_import_releases_scan_lock(app, monkeypatch):
+    data_path = app.config['PATHS']['data']
+
+    def fail(**kwargs):
+        raise RuntimeError("video directory went away")
+
+    monkeypatch.setattr(cli.scan_videos, 'callback', fail)
+    with pytest.raises(RuntimeError):
+        cli.cli.main(args=['bulk-import'], prog_name="fireshare", standalone_mode=False)
+    assert not util.lock_exists(data_path)
+    assert ScanRun.query.one().status == 'failed'
@@ -0,0 +1,40 @@
+import os
+
+from fireshare import cli
+from fireshare.models import CorruptVideo, TranscodeJob
+
+
+def test_corrupt_mark_clears_when_source_changes(app, add_video):
+    source = add_video('broken')
+    cli.mark_video_corrupt('broken', "moov atom not found", source_path=source)
+
+    # Skipped while the file is unchanged
+    assert cli.plan_transcodes() == 0
+    assert cli.get_all_corrupt_videos() == ['broken']
+
+    st = source.stat()
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert cli.plan_transcodes() == 2
+    assert CorruptVideo.query.count() == 0
+    assert {job.video_id for job in TranscodeJob.query} == {'broken'}
+
+
+def test_corrupt_mark_without_signature_gets_a_baseline(app, add_video):
+    source = add_video('old')
+    # Marked before sizes were recorded
+    cli.mark_video_corrupt('old', "decode error")
+    assert cli.plan_transcodes() == 0
+    row = CorruptVideo.query.one()
+    assert (row.size, row.mtime_ns) == (source.stat().st_size, source.stat().st_mtime_ns)
+
+    source.write_bytes(b'a replacement file')
+    assert cli.plan_transcodes() == 2
+    assert CorruptVideo.query.count() == 0
+
+
+def test_include_corrupt_plans_marked_videos(app, add_video):
+    source = add_video('broken')
+    cli.mark_video_corrupt('broken', "moov atom not found", source_path=source)
+    assert cli.plan_transcodes(include_corrupt=True) == 2
+    assert cli.get_all_corrupt_videos() == ['broken']
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+from rapidfuzz import fuzz, process, utils
+
+from fireshare.util import GameMatcher
+
+NAMES = ["Hollow Knight", "Elden Ring", "Rocket League", "Counter Strike 2", "Apex Legends", "Sea of Thieves"]
+
+
+def matcher():
+    return GameMatcher([SimpleNamespace(id=i, name=name, steamgriddb_id=100 + i) for i, name in enumerate(NAMES)])
+
+
+def test_best_match_agrees_with_extract_one():
+    m = matcher()
+    for query in ["hollow knight clip", "elden", "rocket leage", "counterstrike", "thieves of sea", "minecraft"]:
+        expected = process.extractOne(query, NAMES, scorer=fuzz.token_set_ratio, processor=utils.default_process)
+        game_id, name, steamgriddb_id, score = m.match(query)
+        assert score == expected[1]
+        assert (game_id, name, steamgriddb_id) == (expected[2], NAMES[expected[2]], 100 + expected[2])
+
+
+def test_score_cutoff():
+    assert matcher().match("elden ring", score_cutoff=80)[1] == "Elden Ring"
+    assert matcher().match("minecraft", score_cutoff=80) is None
+
+
+def test_memo_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(GameMatcher, '_MEMO_SIZE', 3)
+    m = matcher()
+    for query in ["elden", "apex", "rocket"]:
+        m.match(query)
+    m.match("elden")  # now the most recently used
+    m.match("hollow")
+    assert list(m._memo) == ["rocket", "elden", "hollow"]
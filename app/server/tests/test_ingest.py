@@ -0,0 +1,33 @@
+import threading
+
+from fireshare import db, ingest
+from fireshare.models import IngestJob
+
+
+def test_upload_scans_are_claimed_before_library_scans(app):
+    data_path = app.config['PATHS']['data']
+    server = ingest.IngestServer(app, data_path, threading.Event())
+    server.start()
+    try:
+        bulk = ingest.submit(data_path, 'bulk-import', [])
+        images = ingest.submit(data_path, 'scan-images', [])
+        upload = ingest.submit(data_path, 'scan-video', ['--path=uploads/clip.mp4'])
+        image = ingest.submit(data_path, 'scan-image', ['--path=uploads/shot.png'])
+    finally:
+        server.close()
+    assert None not in (bulk, images, upload, image)
+
+    claimed = [ingest.claim_next() for _ in range(4)]
+    assert [job[0] for job in claimed] == [upload, image, bulk, images]
+    assert claimed[0][1:] == ('scan-video', ['--path=uploads/clip.mp4'])
+    assert ingest.claim_next() is None
+
+
+def test_claim_next_skips_running_jobs(app):
+    db.session.add_all([IngestJob(command='scan-video', args='["--path=a.mp4"]', status='running'),
+                       IngestJob(command='bulk-import', args='[]')])
+    db.session.commit()
+    job_id, command, args = ingest.claim_next()
+    assert command == 'bulk-import'
+    assert db.session.get(IngestJob, job_id).status == 'running'
+    assert ingest.claim_next() is None
@@ -0,0 +1,136 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from fireshare import db, notify
+from fireshare.models import Notification
+
+
+def add(url, kind='discord', video_id='abc', status='pending', attempts=0, due=None):
+    video_url = f"https://clips.example.com/w/{video_id}"
+    payload = notify.discord_payload(video_url) if kind == 'discord' else {"content": video_url}
+    row = Notification(kind=kind, url=url, video_id=video_id, video_url=video_url, payload=json.dumps(payload),
+                       status=status, attempts=attempts, next_attempt_at=due or datetime.utcnow() - timedelta(seconds=1))
+    db.session.add(row)
+    db.session.commit()
+    return row.id
+
+
+def test_claim_leases_due_rows(app):
+    now = datetime.utcnow()
+    due = [add('http://hook', video_id=f"v{i}") for i in range(3)]
+    add('http://hook', video_id='later', due=now + notify._LEASE * 2)
+    add('http://hook', video_id='dead', status='dead')
+
+    claimed = notify._claim(now)
+    assert sorted(r.id for r in claimed) == due
+    assert {(r.status, r.next_attempt_at) for r in claimed} == {('sending', now + notify._LEASE)}
+
+    # Leased rows are not handed out again until the lease runs out
+    assert notify._claim(now + timedelta(seconds=1)) == []
+    reclaimed = notify._claim(now + notify._LEASE + timedelta(seconds=1))
+    assert sorted(r.id for r in reclaimed) == due
+
+
+def test_sent_rows_are_deleted(app, stand_in):
+    add(f"{stand_in.url}/hook", kind='generic')
+    counts = notify.dispatch_due(concurrency=2, digest_threshold=0)
+    assert counts == {'sent': 1, 'retrying': 0, 'dead': 0}
+    assert Notification.query.count() == 0
+    assert stand_in.requests[0]['json'] == {"content": "https://clips.example.com/w/abc"}
+
+
+def test_failures_back_off_exponentially(app, stand_in):
+    row_id = add(f"{stand_in.url}/hook")
+    waits = []
+    for _ in range(3):
+        stand_in.reply(500, {"message": "down"})
+        before = datetime.utcnow()
+        assert notify.dispatch_due(concurrency=1, digest_threshold=0)['retrying'] == 1
+        row = db.session.get(Notification, row_id)
+        assert row.status == 'pending'
+        assert row.last_error.startswith("HTTP 500")
+        waits.append(row.next_attempt_at - before)
+        # Make it due again for the next round
+        row.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+    for wait, expected in zip(waits, (30, 60, 120)):
+        assert timedelta(seconds=expected) <= wait < timedelta(seconds=expected + 5)
+    assert db.session.get(Notification, row_id).attempts == 3
+
+
+def test_backoff_is_capped(app, stand_in, monkeypatch):
+    monkeypatch.setattr(notify, 'MAX_ATTEMPTS', 20)
+    row_id = add(f"{stand_in.url}/hook", attempts=12)
+    stand_in.reply(503)
+    before = datetime.utcnow()
+    notify.dispatch_due(concurrency=1, digest_threshold=0)
+    row = db.session.get(Notification, row_id)
+    assert row.status == 'pending'
+    assert notify._BACKOFF_MAX <= row.next_attempt_at - before < notify._BACKOFF_MAX + timedelta(seconds=5)
+
+
+def test_retry_after_extends_backoff(app, stand_in):
+    row_id = add(f"{stand_in.url}/hook")
+    stand_in.reply(429, {"retry_after": 600})
+    before = datetime.utcnow()
+    notify.dispatch_due(concurrency=1, digest_threshold=0)
+    row = db.session.get(Notification, row_id)
+    assert row.status == 'pending'
+    assert timedelta(seconds=600) <= row.next_attempt_at - before < timedelta(seconds=605)
+
+
+@pytest.mark.parametrize("attempts, status", [(0, 404), (notify.MAX_ATTEMPTS - 1, 500)])
+def test_dead_letters(app, stand_in, attempts, status):
+    row_id = add(f"{stand_in.url}/hook", attempts=attempts)
+    stand_in.reply(status)
+    counts = notify.dispatch_due(concurrency=1, digest_threshold=0)
+    assert counts == {'sent': 0, 'retrying': 0, 'dead': 1}
+    row = db.session.get(Notification, row_id)
+    assert row.status == 'dead'
+    assert row.attempts == attempts + 1
+    # Dead rows are never claimed again
+    assert notify.dispatch_due(concurrency=1, digest_threshold=0) == {'sent': 0, 'retrying': 0, 'dead': 0}
+    assert len(stand_in.requests) == 1
+
+
+def test_digest_batches_discord_rows_per_webhook(app, stand_in):
+    for i in range(6):
+        add(f"{stand_in.url}/a", video_id=f"a{i}")
+    for i in range(2):
+        add(f"{stand_in.url}/b", video_id=f"b{i}")
+    add(f"{stand_in.url}/generic", kind='generic', video_id='g0')
+
+    counts = notify.dispatch_due(concurrency=4, digest_threshold=5)
+    assert counts == {'sent': 9, 'retrying': 0, 'dead': 0}
+    by_path = {}
+    for request in stand_in.requests:
+        by_path.setdefault(request['path'], []).append(request['json'])
+    # Six clips for one webhook reach the threshold and go out as one message
+    [digest] = by_path['/a']
+    assert digest['content'].splitlines() == ["6 new clips:"] + [f"https://clips.example.com/w/a{i}" for i in range(6)]
+    # Below the threshold, and for generic webhooks, every clip is its own message
+    assert len(by_path['/b']) == 2
+    assert by_path['/generic'] == [{"content": "https://clips.example.com/w/g0"}]
+
+
+def test_digest_stays_under_discord_limit(app, stand_in):
+    for i in range(60):
+        add(f"{stand_in.url}/a", video_id=f"{i:02d}" + "x" * 60)
+    assert notify.dispatch_due(concurrency=2, digest_threshold=5)['sent'] == 60
+    assert len(stand_in.requests) > 1
+    lines = []
+    for request in stand_in.requests:
+        content = request['json']['content']
+        assert len(content) <= notify._DISCORD_CONTENT_LIMIT
+        lines.extend(content.splitlines()[1:])
+    assert sorted(lines) == sorted(f"https://clips.example.com/w/{i:02d}" + "x" * 60 for i in range(60))
+
+
+def test_failed_digest_retries_every_row(app, stand_in):
+    ids = [add(f"{stand_in.url}/a", video_id=f"a{i}") for i in range(5)]
+    stand_in.reply(500)
+    assert notify.dispatch_due(concurrency=1, digest_threshold=5)['retrying'] == 5
+    assert len(stand_in.requests) == 1
+    assert {db.session.get(Notification, i).attempts for i in ids} == {1}
@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+
+# Seconds from interpreter start to the first query for a CLI command in
+# worker mode; most of it is importing Flask and SQLAlchemy
+WORKER_STARTUP_BUDGET = 1.0
+
+# Only the web server needs these
+WEB_ONLY_MODULES = ('flask_migrate', 'flask_login', 'flask_cors', 'fireshare.api', 'ldap', 'requests')
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import sqlalchemy as sa
+from fireshare import create_app, db
+app = create_app(mode=sys.argv[1])
+with app.app_context():
+    db.session.execute(sa.text("SELECT 1"))
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "modules": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+def _start(mode, tmp_path):
+    env = dict(os.environ,
+               DATA_DIRECTORY=str(tmp_path / 'data'),
+               VIDEO_DIRECTORY=str(tmp_path / 'videos'),
+               PROCESSED_DIRECTORY=str(tmp_path / 'processed'),
+               FS_LOGLEVEL='ERROR')
+    env.pop('IMAGE_DIRECTORY', None)
+    result = subprocess.run([sys.executable, '-c', _PROBE, mode, *WEB_ONLY_MODULES],
+                            env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_worker_mode_skips_web_only_imports(tmp_path):
+    assert _start('worker', tmp_path)['modules'] == []
+
+
+def test_worker_mode_starts_within_budget(tmp_path):
+    # The first run also creates the directories and config.json
+    _start('worker', tmp_path)
+    best = min(_start('worker', tmp_path)['seconds'] for _ in range(3))
+    assert best < WORKER_STARTUP_BUDGET, f"worker-mode create_app took {best:.2f}s"
+
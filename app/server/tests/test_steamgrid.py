@@ -0,0 +1,127 @@
+import json
+import time
+
+import pytest
+
+from fireshare import steamgrid
+from fireshare.steamgrid import SteamGridDBClient
+from fireshare.util import TokenBucket
+
+GAME = {"id": 1, "name": "Hollow Knight", "release_date": 1488499200}
+
+
+@pytest.fixture
+def client(stand_in, tmp_path, monkeypatch):
+    monkeypatch.setattr(SteamGridDBClient, 'BASE_URL', stand_in.url)
+    # A bucket this large never makes the tests wait
+    monkeypatch.setattr(steamgrid, '_rate_limiter', TokenBucket(1000, 1000))
+    return SteamGridDBClient("key", cache_dir=tmp_path / "cache")
+
+
+def test_found_results_are_cached(client, stand_in, tmp_path):
+    stand_in.default = (200, {}, {"success": True, "data": [GAME]})
+    assert client.search_games("Hollow Knight") == [GAME]
+    assert client.search_games("Hollow Knight") == [GAME]
+    assert len(stand_in.requests) == 1
+    assert stand_in.requests[0]['path'] == "/search/autocomplete/Hollow%20Knight"
+    assert stand_in.requests[0]['headers']['Authorization'] == "Bearer key"
+
+    # Other clients share the cache on disk
+    assert SteamGridDBClient("key", cache_dir=tmp_path / "cache").search_games("Hollow Knight") == [GAME]
+    assert len(stand_in.requests) == 1
+
+
+def test_query_is_one_path_segment(client, stand_in):
+    stand_in.default = (200, {}, {"success": True, "data": []})
+    client.search_games("AC/DC Live")
+    assert stand_in.requests[0]['path'] == "/search/autocomplete/AC%2FDC%20Live"
+
+
+@pytest.mark.parametrize("status, body", [
+    (200, {"success": True, "data": []}),
+    (200, {"success": False}),
+    (404, {"success": False, "errors": ["Game not found"]}),
+])
+def test_misses_are_cached(client, stand_in, status, body):
+    stand_in.reply(status, body)
+    assert client.get_game_by_id(7) is None
+    assert client.get_game_by_id(7) is None
+    assert len(stand_in.requests) == 1
+    [entry] = [json.loads(p.read_text()) for p in client.cache.directory.glob("*.json")]
+    assert entry['expires'] - time.time() == pytest.approx(SteamGridDBClient.NEGATIVE_TTL, abs=5)
+
+
+def test_server_errors_are_cached_briefly(client, stand_in):
+    stand_in.reply(500)
+    assert client.search_games("Celeste") == []
+    assert client.search_games("Celeste") == []
+    assert len(stand_in.requests) == 1
+    [entry] = [json.loads(p.read_text()) for p in client.cache.directory.glob("*.json")]
+    assert entry['expires'] - time.time() == pytest.approx(SteamGridDBClient.ERROR_TTL, abs=5)
+
+
+def test_rate_limited_requests_wait_for_retry_after(client, stand_in):
+    stand_in.reply(429, headers={"Retry-After": "3600"})
+    assert client.get_heroes(1) == []
+    assert client.get_heroes(1) == []
+    assert len(stand_in.requests) == 1
+    [entry] = [json.loads(p.read_text()) for p in client.cache.directory.glob("*.json")]
+    assert entry['expires'] - time.time() == pytest.approx(3600, abs=5)
+
+
+@pytest.mark.parametrize("status", [401, 403])
+def test_auth_errors_are_not_cached(client, stand_in, status):
+    stand_in.reply(status)
+    stand_in.reply(200, {"success": True, "data": GAME})
+    assert client.get_game_by_id(1) is None
+    # A fixed API key works on the next call
+    assert client.get_game_by_id(1) == GAME
+    assert len(stand_in.requests) == 2
+
+
+def test_expired_entries_are_fetched_again(client, stand_in):
+    stand_in.default = (200, {}, {"success": True, "data": GAME})
+    client.get_game_by_id(1)
+    [path] = client.cache.directory.glob("*.json")
+    entry = json.loads(path.read_text())
+    entry['expires'] = time.time() - 1
+    path.write_text(json.dumps(entry))
+    assert client.get_game_by_id(1) == GAME
+    assert len(stand_in.requests) == 2
+
+
+def test_asset_listings_are_cached_whole(client, stand_in):
+    logos = [{"id": i, "url": f"https://cdn/{i}.png", "thumb": f"https://cdn/{i}_t.png"} for i in range(5)]
+    stand_in.default = (200, {}, {"success": True, "data": logos})
+    assert client.get_logos(1, limit=1) == logos[:1]
+    assert client.get_logos(1, limit=3) == logos[:3]
+    assert len(stand_in.requests) == 1
+
+
+def test_requests_are_rate_limited(client, stand_in, monkeypatch):
+    monkeypatch.setattr(steamgrid, '_rate_limiter', TokenBucket(20, 2))
+    stand_in.default = (200, {}, {"success": True, "data": GAME})
+    started = time.monotonic()
+    for game_id in range(12):
+        client.get_game_by_id(game_id)
+    # Two go out at once, the other ten wait for the bucket at 20 per second
+    assert time.monotonic() - started >= 0.45
+    assert len(stand_in.requests) == 12
+    # Cache hits do not take from the bucket
+    started = time.monotonic()
+    for game_id in range(12):
+        client.get_game_by_id(game_id)
+    assert time.monotonic() - started < 0.2
+    assert len(stand_in.requests) == 12
+
+
+def test_connection_errors_are_cached_briefly(stand_in, tmp_path, monkeypatch):
+    url = stand_in.url
+    stand_in.close()
+    monkeypatch.setattr(SteamGridDBClient, 'BASE_URL', url)
+    monkeypatch.setattr(steamgrid, '_rate_limiter', TokenBucket(1000, 1000))
+    client = SteamGridDBClient("key", cache_dir=tmp_path / "cache")
+    assert client.search_games("Celeste") == []
+    [entry] = [json.loads(p.read_text()) for p in client.cache.directory.glob("*.json")]
+    assert entry['value'] is None
+    assert entry['expires'] - time.time() == pytest.approx(SteamGridDBClient.ERROR_TTL, abs=5)
@@ -0,0 +1,95 @@
+import threading
+
+from fireshare import cli, db
+from fireshare.models import TranscodeJob, VideoInfo
+
+
+def queued(status='pending'):
+    return sorted((job.video_id, job.height, job.kind, job.priority)
+                  for job in TranscodeJob.query.filter_by(status=status))
+
+
+def test_planner_queues_only_missing_renditions(app, add_video):
+    add_video('tall')
+    add_video('short', height=720)
+    derived = app.config['PATHS']['processed'] / 'derived' / 'tall'
+    derived.mkdir(parents=True)
+    (derived / 'tall-720p.mp4').write_bytes(b'')
+
+    assert cli.plan_transcodes() == 2
+    # 1080p is not taller than either source, 720p of 'tall' is on disk and 'short' is 720p itself
+    assert queued() == [('short', 480, 'transcode', 0), ('tall', 480, 'transcode', 0)]
+    # The rendition found on disk is flagged so library-wide plans skip it from now on
+    assert VideoInfo.query.filter_by(video_id='tall').one().has_720p is True
+
+    # Planning again queues nothing new
+    assert cli.plan_transcodes() == 0
+    assert len(queued()) == 2
+
+
+def test_planner_trusts_flags_library_wide(app, add_video):
+    add_video('done', has_720p=True, has_480p=True)
+    add_video('new', height=720)
+    assert cli.plan_transcodes() == 1
+    assert queued() == [('new', 480, 'transcode', 0)]
+    # A single-video plan checks the disk instead, so a flagged rendition with no file is queued
+    assert cli.plan_transcodes(['done'], cli.TRANSCODE_PRIORITY_MANUAL) == 2
+
+
+def test_h264_sources_at_the_rendition_height_are_remuxed(app, add_video):
+    add_video('web', height=1088, codec='h264')
+    cli.plan_transcodes(['web'])
+    assert queued() == [('web', 480, 'transcode', 0), ('web', 720, 'transcode', 0), ('web', 1080, 'remux', 0)]
+
+
+def test_upload_is_claimed_before_backlog(app, add_video):
+    add_video('backlog')
+    add_video('upload')
+    cli.plan_transcodes()
+    TranscodeJob.query.filter_by(video_id='upload').delete()
+    db.session.commit()
+    cli.plan_transcodes(['upload'], cli.TRANSCODE_PRIORITY_UPLOAD)
+
+    claimed = cli.claim_transcode_jobs()
+    # Every rendition of the upload is claimed together, tallest first
+    assert [(job.video_id, job.height) for job in claimed] == [('upload', 720), ('upload', 480)]
+    assert [(job.video_id, job.height) for job in cli.claim_transcode_jobs()] == [('backlog', 720), ('backlog', 480)]
+    assert cli.claim_transcode_jobs() == []
+
+
+def test_replanning_raises_queued_priority(app, add_video):
+    add_video('clip')
+    cli.plan_transcodes()
+    assert cli.plan_transcodes(['clip'], cli.TRANSCODE_PRIORITY_UPLOAD) == 0
+    assert {job.priority for job in TranscodeJob.query} == {cli.TRANSCODE_PRIORITY_UPLOAD}
+
+
+def test_concurrent_claimers_never_share_a_row(app, add_video):
+    for i in range(40):
+        add_video(f"v{i:02d}")
+    cli.plan_transcodes()
+    total = TranscodeJob.query.count()
+    claims = [[] for _ in range(4)]
+    errors = []
+
+    def claimer(out):
+        try:
+            with app.app_context():
+                while True:
+                    jobs = cli.claim_transcode_jobs(group=False)
+                    if not jobs:
+                        return
+                    out.extend(job.id for job in jobs)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=claimer, args=(out,)) for out in claims]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    ids = [i for out in claims for i in out]
+    assert len(ids) == len(set(ids)) == total
+    assert TranscodeJob.query.filter_by(status='running').count() == total
@@ -0,0 +1,35 @@
+"""add file_index table
+
+Revision ID: o0j1k2l3m4n5
+Revises: n9i0j1k2l3m4
+Create Date: 2026-05-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'o0j1k2l3m4n5'
+down_revision = 'n9i0j1k2l3m4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('file_index',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=8), nullable=False),
+        sa.Column('path', sa.String(length=2048), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+        sa.Column('inode', sa.BigInteger(), nullable=False),
+        sa.Column('content_id', sa.String(length=32), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('kind', 'path')
+    )
+    op.create_index('ix_file_index_content_id', 'file_index', ['content_id'])
+
+
+def downgrade():
+    op.drop_index('ix_file_index_content_id', table_name='file_index')
+    op.drop_table('file_index')
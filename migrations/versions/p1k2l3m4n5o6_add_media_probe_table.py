@@ -0,0 +1,32 @@
+"""add media_probe table
+
+Revision ID: p1k2l3m4n5o6
+Revises: o0j1k2l3m4n5
+Create Date: 2026-05-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'p1k2l3m4n5o6'
+down_revision = 'o0j1k2l3m4n5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('media_probe',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('video_id', sa.String(length=32), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('probed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_media_probe_video_id', 'media_probe', ['video_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_media_probe_video_id', table_name='media_probe')
+    op.drop_table('media_probe')
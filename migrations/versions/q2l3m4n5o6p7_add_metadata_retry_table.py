@@ -0,0 +1,36 @@
+"""add metadata_retry table
+
+Revision ID: q2l3m4n5o6p7
+Revises: p1k2l3m4n5o6
+Create Date: 2026-05-14 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'q2l3m4n5o6p7'
+down_revision = 'p1k2l3m4n5o6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('metadata_retry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('video_id', sa.String(length=32), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('mtime_ns', sa.BigInteger(), nullable=True),
+        sa.Column('last_error', sa.String(length=512), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_metadata_retry_video_id', 'metadata_retry', ['video_id'], unique=True)
+    op.create_index('ix_metadata_retry_next_attempt_at', 'metadata_retry', ['next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('ix_metadata_retry_next_attempt_at', table_name='metadata_retry')
+    op.drop_index('ix_metadata_retry_video_id', table_name='metadata_retry')
+    op.drop_table('metadata_retry')
@@ -0,0 +1,34 @@
+"""add ingest_job table
+
+Revision ID: r3m4n5o6p7q8
+Revises: q2l3m4n5o6p7
+Create Date: 2026-05-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'r3m4n5o6p7q8'
+down_revision = 'q2l3m4n5o6p7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ingest_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('command', sa.String(length=32), nullable=False),
+        sa.Column('args', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('error', sa.String(length=512), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ingest_job_status', 'ingest_job', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_ingest_job_status', table_name='ingest_job')
+    op.drop_table('ingest_job')
@@ -0,0 +1,27 @@
+"""add video_info.password_hash column
+
+Revision ID: s4n5o6p7q8r9
+Revises: r3m4n5o6p7q8
+Create Date: 2026-05-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 's4n5o6p7q8r9'
+down_revision = 'r3m4n5o6p7q8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Older installs already have the column from the startup schema probe in create_app()
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('video_info')}
+    if 'password_hash' not in columns:
+        with op.batch_alter_table('video_info') as batch_op:
+            batch_op.add_column(sa.Column('password_hash', sa.String(length=256), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('video_info') as batch_op:
+        batch_op.drop_column('password_hash')
@@ -0,0 +1,41 @@
+"""add notification table
+
+Revision ID: t5o6p7q8r9s0
+Revises: s4n5o6p7q8r9
+Create Date: 2026-05-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 't5o6p7q8r9s0'
+down_revision = 's4n5o6p7q8r9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('url', sa.String(length=2048), nullable=False),
+        sa.Column('video_id', sa.String(length=32), nullable=True),
+        sa.Column('video_url', sa.String(length=2048), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.String(length=512), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notification_video_id', 'notification', ['video_id'])
+    op.create_index('ix_notification_status', 'notification', ['status'])
+    op.create_index('ix_notification_next_attempt_at', 'notification', ['next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_next_attempt_at', table_name='notification')
+    op.drop_index('ix_notification_status', table_name='notification')
+    op.drop_index('ix_notification_video_id', table_name='notification')
+    op.drop_table('notification')
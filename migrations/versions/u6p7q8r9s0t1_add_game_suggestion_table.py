@@ -0,0 +1,142 @@
+"""add game_suggestion table
+
+Revision ID: u6p7q8r9s0t1
+Revises: t5o6p7q8r9s0
+Create Date: 2026-05-19 00:00:00.000000
+
+"""
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+revision = 'u6p7q8r9s0t1'
+down_revision = 't5o6p7q8r9s0'
+branch_labels = None
+depends_on = None
+
+SUGGESTIONS_FILE = 'game_suggestions.json'
+
+logger = logging.getLogger('alembic.env')
+
+game_suggestion = sa.table('game_suggestion',
+    sa.column('video_id', sa.String),
+    sa.column('folder_path', sa.String),
+    sa.column('game_id', sa.Integer),
+    sa.column('game_name', sa.String),
+    sa.column('steamgriddb_id', sa.Integer),
+    sa.column('confidence', sa.Float),
+    sa.column('source', sa.String),
+    sa.column('release_date', sa.String),
+    sa.column('video_ids', sa.Text),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _suggestions_file():
+    return Path(current_app.config.get('DATA_DIRECTORY', '/data')) / SUGGESTIONS_FILE
+
+
+def _row(suggestion, now, video_id=None, folder_path=None):
+    def as_int(value):
+        try:
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+    try:
+        confidence = float(suggestion.get('confidence')) if suggestion.get('confidence') is not None else None
+    except (TypeError, ValueError):
+        confidence = None
+    release_date = suggestion.get('release_date')
+    return {
+        'video_id': video_id,
+        'folder_path': folder_path,
+        'game_id': as_int(suggestion.get('game_id')),
+        'game_name': suggestion.get('game_name'),
+        'steamgriddb_id': as_int(suggestion.get('steamgriddb_id')),
+        'confidence': confidence,
+        'source': suggestion.get('source'),
+        'release_date': str(release_date) if release_date is not None else None,
+        'video_ids': json.dumps(suggestion.get('video_ids') or []) if folder_path is not None else None,
+        'created_at': now,
+    }
+
+
+def upgrade():
+    op.create_table('game_suggestion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('video_id', sa.String(length=32), nullable=True),
+        sa.Column('folder_path', sa.String(length=1024), nullable=True),
+        sa.Column('game_id', sa.Integer(), nullable=True),
+        sa.Column('game_name', sa.String(length=256), nullable=True),
+        sa.Column('steamgriddb_id', sa.Integer(), nullable=True),
+        sa.Column('confidence', sa.Float(), nullable=True),
+        sa.Column('source', sa.String(length=32), nullable=True),
+        sa.Column('release_date', sa.String(length=64), nullable=True),
+        sa.Column('video_ids', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_game_suggestion_video_id', 'game_suggestion', ['video_id'], unique=True)
+    op.create_index('ix_game_suggestion_folder_path', 'game_suggestion', ['folder_path'], unique=True)
+
+    # Import the suggestions file this table replaces
+    suggestions_file = _suggestions_file()
+    if not suggestions_file.exists():
+        return
+    try:
+        with open(suggestions_file) as f:
+            suggestions = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Skipping import of {suggestions_file}: {e}")
+        return
+    if not isinstance(suggestions, dict):
+        suggestions = {}
+    now = datetime.utcnow()
+    rows = []
+    for folder_path, suggestion in (suggestions.pop('_folders', None) or {}).items():
+        if isinstance(suggestion, dict):
+            rows.append(_row(suggestion, now, folder_path=folder_path))
+    for video_id, suggestion in suggestions.items():
+        if isinstance(suggestion, dict):
+            rows.append(_row(suggestion, now, video_id=video_id))
+    if rows:
+        op.bulk_insert(game_suggestion, rows)
+    # The file is left in place so a failed upgrade can simply be re-run
+    logger.info(f"Imported {len(rows)} game suggestion(s) from {suggestions_file}")
+
+
+def downgrade():
+    # Write the suggestions back to the file older versions read
+    conn = op.get_bind()
+    suggestions = {}
+    folders = {}
+    for row in conn.execute(sa.select(game_suggestion)).mappings():
+        suggestion = {
+            'game_id': row['game_id'],
+            'game_name': row['game_name'],
+            'steamgriddb_id': row['steamgriddb_id'],
+            'confidence': row['confidence'],
+            'source': row['source'],
+        }
+        if row['release_date']:
+            suggestion['release_date'] = row['release_date']
+        if row['folder_path'] is not None:
+            suggestion['video_ids'] = json.loads(row['video_ids'] or '[]')
+            suggestion['video_count'] = len(suggestion['video_ids'])
+            folders[row['folder_path']] = suggestion
+        elif row['video_id'] is not None:
+            suggestions[row['video_id']] = suggestion
+    if folders:
+        suggestions['_folders'] = folders
+    if suggestions:
+        with open(_suggestions_file(), 'w') as f:
+            json.dump(suggestions, f)
+
+    op.drop_index('ix_game_suggestion_folder_path', table_name='game_suggestion')
+    op.drop_index('ix_game_suggestion_video_id', table_name='game_suggestion')
+    op.drop_table('game_suggestion')
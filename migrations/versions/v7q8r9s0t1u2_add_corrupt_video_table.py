@@ -0,0 +1,83 @@
+"""add corrupt_video table
+
+Revision ID: v7q8r9s0t1u2
+Revises: u6p7q8r9s0t1
+Create Date: 2026-05-20 00:00:00.000000
+
+"""
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+revision = 'v7q8r9s0t1u2'
+down_revision = 'u6p7q8r9s0t1'
+branch_labels = None
+depends_on = None
+
+CORRUPT_FILE = 'corrupt_videos.json'
+
+logger = logging.getLogger('alembic.env')
+
+corrupt_video = sa.table('corrupt_video',
+    sa.column('video_id', sa.String),
+    sa.column('reason', sa.String),
+    sa.column('probed_at', sa.DateTime),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _corrupt_file():
+    return Path(current_app.config.get('DATA_DIRECTORY', '/data')) / CORRUPT_FILE
+
+
+def upgrade():
+    op.create_table('corrupt_video',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('video_id', sa.String(length=32), nullable=False),
+        sa.Column('reason', sa.String(length=512), nullable=True),
+        sa.Column('probed_at', sa.DateTime(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('mtime_ns', sa.BigInteger(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_corrupt_video_video_id', 'corrupt_video', ['video_id'], unique=True)
+
+    # Import the list file this table replaces. The file did not record the
+    # source's size or mtime; the next transcode run fills them in.
+    corrupt_file = _corrupt_file()
+    if not corrupt_file.exists():
+        return
+    try:
+        with open(corrupt_file) as f:
+            video_ids = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Skipping import of {corrupt_file}: {e}")
+        return
+    if not isinstance(video_ids, list):
+        video_ids = []
+    now = datetime.utcnow()
+    video_ids = [vid for vid in dict.fromkeys(video_ids) if isinstance(vid, str)]
+    if video_ids:
+        op.bulk_insert(corrupt_video, [
+            {'video_id': vid, 'reason': None, 'probed_at': now, 'created_at': now} for vid in video_ids
+        ])
+    # The file is left in place so a failed upgrade can simply be re-run
+    logger.info(f"Imported {len(video_ids)} corrupt video(s) from {corrupt_file}")
+
+
+def downgrade():
+    # Write the list back to the file older versions read
+    conn = op.get_bind()
+    video_ids = [row[0] for row in conn.execute(sa.select(corrupt_video.c.video_id))]
+    if video_ids or _corrupt_file().exists():
+        with open(_corrupt_file(), 'w') as f:
+            json.dump(video_ids, f)
+
+    op.drop_index('ix_corrupt_video_video_id', table_name='corrupt_video')
+    op.drop_table('corrupt_video')
@@ -0,0 +1,44 @@
+"""add scan_run table
+
+Revision ID: w8r9s0t1u2v3
+Revises: v7q8r9s0t1u2
+Create Date: 2026-05-21 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'w8r9s0t1u2v3'
+down_revision = 'v7q8r9s0t1u2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scan_run',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('command', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('total_seconds', sa.Float(), nullable=True),
+        sa.Column('walk_seconds', sa.Float(), nullable=True),
+        sa.Column('hash_seconds', sa.Float(), nullable=True),
+        sa.Column('probe_seconds', sa.Float(), nullable=True),
+        sa.Column('reconcile_seconds', sa.Float(), nullable=True),
+        sa.Column('poster_seconds', sa.Float(), nullable=True),
+        sa.Column('transcode_seconds', sa.Float(), nullable=True),
+        sa.Column('files_seen', sa.Integer(), nullable=True),
+        sa.Column('files_hashed', sa.Integer(), nullable=True),
+        sa.Column('files_skipped', sa.Integer(), nullable=True),
+        sa.Column('files_new', sa.Integer(), nullable=True),
+        sa.Column('bytes_read', sa.BigInteger(), nullable=True),
+        sa.Column('error', sa.String(length=512), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_scan_run_started_at', 'scan_run', ['started_at'])
+
+
+def downgrade():
+    op.drop_index('ix_scan_run_started_at', table_name='scan_run')
+    op.drop_table('scan_run')
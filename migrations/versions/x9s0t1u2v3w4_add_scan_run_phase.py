@@ -0,0 +1,26 @@
+"""add scan_run.phase and scan_run.resumed_from columns
+
+Revision ID: x9s0t1u2v3w4
+Revises: w8r9s0t1u2v3
+Create Date: 2026-05-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'x9s0t1u2v3w4'
+down_revision = 'w8r9s0t1u2v3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scan_run') as batch_op:
+        batch_op.add_column(sa.Column('phase', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('resumed_from', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scan_run') as batch_op:
+        batch_op.drop_column('resumed_from')
+        batch_op.drop_column('phase')
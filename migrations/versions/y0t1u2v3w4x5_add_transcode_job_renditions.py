@@ -0,0 +1,36 @@
+"""add transcode_job.height, kind and priority columns
+
+Revision ID: y0t1u2v3w4x5
+Revises: x9s0t1u2v3w4
+Create Date: 2026-05-23 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'y0t1u2v3w4x5'
+down_revision = 'x9s0t1u2v3w4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transcode_job') as batch_op:
+        batch_op.add_column(sa.Column('height', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('kind', sa.String(length=16), nullable=False, server_default='transcode'))
+        batch_op.add_column(sa.Column('priority', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_transcode_job_priority', ['priority'])
+    # Queued rows from before this revision ask for a whole video (or the
+    # library when video_id is NULL) and are expanded into renditions when run
+    op.execute("UPDATE transcode_job SET kind = 'plan'")
+
+
+def downgrade():
+    # Older versions treat every row as a whole-video request
+    op.execute("DELETE FROM transcode_job WHERE kind = 'transcode' AND id NOT IN "
+               "(SELECT MIN(id) FROM transcode_job WHERE kind = 'transcode' GROUP BY video_id)")
+    with op.batch_alter_table('transcode_job') as batch_op:
+        batch_op.drop_index('ix_transcode_job_priority')
+        batch_op.drop_column('priority')
+        batch_op.drop_column('kind')
+        batch_op.drop_column('height')